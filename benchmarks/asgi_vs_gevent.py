@@ -0,0 +1,128 @@
+"""
+File: 公开扫码接口压测，对比 gunicorn gevent(WSGI) 与 uvicorn(ASGI) 两种部署
+
+模拟慢速移动网络：每个客户端先建立连接，请求体分段发送并在段之间停顿，
+整个请求期间连接保持打开，统计每种部署在大量并发慢连接下的延迟、吞吐和失败数。
+只依赖标准库，可以在任意机器上运行。
+
+用法:
+    # 终端1：现有gevent部署
+    gunicorn innrg.wsgi:application -c gunicorn.conf.py --bind 127.0.0.1:8000 \
+        --pid /tmp/gevent.pid --access-logfile - --error-logfile -
+    # 终端2：ASGI部署
+    gunicorn innrg.asgi:application -c gunicorn-asgi.conf.py --bind 127.0.0.1:8001 \
+        --pid /tmp/asgi.pid --access-logfile - --error-logfile -
+    # 终端3：压测
+    python benchmarks/asgi_vs_gevent.py \
+        --target gevent=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001 \
+        --access-code <有效访问码> --qrcode-id <已出货的二维码ID> --concurrency 2000
+
+并发数较大时先调高文件描述符上限，例如 ulimit -n 65535
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def slow_post(host, port, path, payload, chunks, chunk_delay, timeout):
+    """分段发送一个POST请求，返回(状态码, 耗时秒)"""
+    body = json.dumps(payload).encode()
+    head = (
+        f"POST {path} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode()
+
+    started = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(head)
+        await writer.drain()
+        step = max(1, len(body) // chunks)
+        for offset in range(0, len(body), step):
+            await asyncio.sleep(chunk_delay)
+            writer.write(body[offset:offset + step])
+            await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status_code = int(status_line.split()[1]) if status_line else 0
+    return status_code, time.perf_counter() - started
+
+
+async def run_endpoint(base_url, path, payload, args):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    latencies, failures = [], 0
+
+    async def client():
+        nonlocal failures
+        for _ in range(args.requests_per_client):
+            try:
+                status_code, elapsed = await slow_post(host, port, path, payload, args.chunks,
+                                                       args.chunk_delay, args.timeout)
+            except (OSError, asyncio.TimeoutError):
+                failures += 1
+                continue
+            if status_code >= 500 or status_code == 0:
+                failures += 1
+            else:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'failures': failures,
+        'rps': len(latencies) / wall if wall else 0.0,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ASGI 与 gevent 部署的慢连接并发压测')
+    parser.add_argument('--target', action='append', required=True,
+                        help='名称=地址，例如 gevent=http://127.0.0.1:8000，可重复')
+    parser.add_argument('--access-code', required=True)
+    parser.add_argument('--qrcode-id', required=True)
+    parser.add_argument('--concurrency', type=int, default=1000, help='同时打开的客户端连接数')
+    parser.add_argument('--requests-per-client', type=int, default=3)
+    parser.add_argument('--chunks', type=int, default=4, help='请求体分几段发送')
+    parser.add_argument('--chunk-delay', type=float, default=0.25, help='每段之间的停顿(秒)')
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    endpoints = [
+        ('/api/code_api', {'access_code': args.access_code}),
+        ('/api/wr_api', {'access_code': args.access_code, 'qrcode_id': args.qrcode_id}),
+    ]
+
+    header = f"{'target':<10}{'endpoint':<18}{'ok':>8}{'fail':>7}{'rps':>9}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for target in args.target:
+        name, base_url = target.split('=', 1)
+        for path, payload in endpoints:
+            result = asyncio.run(run_endpoint(base_url, path, payload, args))
+            print(f"{name:<10}{path:<18}{result['requests']:>8}{result['failures']:>7}{result['rps']:>9.1f}"
+                  f"{result['p50']:>9.1f}{result['p95']:>9.1f}{result['p99']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# ASGI部署配置：公开扫码接口使用原生异步视图，单个进程即可保持大量慢速移动端连接
+# 启动: gunicorn innrg.asgi:application -c gunicorn-asgi.conf.py
+
+# 绑定的ip与端口
+bind = "0.0.0.0:8001"
+
+# 工作进程数，每个进程是一个事件循环
+workers = 2
+
+# 工作模式
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# 启用异步视图
+raw_env = ['ASYNC_PUBLIC_VIEWS=true']
+
+# 进程文件
+pidfile = '/var/run/gunicorn-asgi.pid'
+
+# 访问日志和错误日志
+accesslog = '/var/log/gunicorn/asgi-access.log'
+errorlog = '/var/log/gunicorn/asgi-error.log'
+
+# 日志级别
+loglevel = 'info'
+
+# 设置超时时间
+timeout = 30
+
+# 设置最大请求数
+max_requests = 5000
+
+# 设置最大请求抖动值
+max_requests_jitter = 500
+
+# 设置进程名称
+proc_name = 'innrg_gunicorn_asgi'
+
+
+def post_worker_init(worker):
+    # worker启动后加载二维码存在性过滤器
+    from productApp.utils.qrcode_filter import qrcode_filter
+    qrcode_filter.warm_up()
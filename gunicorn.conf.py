@@ -40,3 +40,9 @@ limit_request_line = 1024
 limit_request_fields = 50
 # 单个请求头的最大大小
 limit_request_field_size = 4095
+
+
+def post_worker_init(worker):
+    # worker启动后加载二维码存在性过滤器
+    from productApp.utils.qrcode_filter import qrcode_filter
+    qrcode_filter.warm_up()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 import environ
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -53,6 +54,9 @@ else:
     SECURE_SSL_REDIRECT = True  # 重定向HTTP到HTTPS
     SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
+# 激活接口通过 Idempotency-Key 请求头传递幂等键
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -126,6 +130,53 @@ else:
     STATIC_ROOT = '/app/static'
     MEDIA_URL = '/media/'
 
+# Cache
+# 生产环境通过REDIS_URL使用redis，多个gunicorn worker共享同一份缓存；未配置时退回进程内缓存
+REDIS_URL = env('REDIS_URL', default=None)
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# 扫码查询产品信息的缓存时间(秒)
+PRODUCT_CACHE_TIMEOUT = env.int('PRODUCT_CACHE_TIMEOUT', default=600)
+
+# 访问码进程内缓存的最长刷新间隔(秒)，正常情况下修改访问码会立即通知所有进程
+ACCESS_CODE_REFRESH_INTERVAL = env.int('ACCESS_CODE_REFRESH_INTERVAL', default=300)
+
+# ASGI部署时设为true，公开扫码接口(wr_api, code_api, activate-product)使用原生异步视图
+ASYNC_PUBLIC_VIEWS = env.bool('ASYNC_PUBLIC_VIEWS', default=False)
+
+# 公开扫码接口令牌桶限流：capacity为允许的突发请求数，refill_rate为每秒补充的令牌数
+SCAN_THROTTLE_RATES = {
+    'ip': {'capacity': env.int('SCAN_THROTTLE_IP_CAPACITY', default=60),
+           'refill_rate': env.float('SCAN_THROTTLE_IP_RATE', default=1)},
+    'access_code': {'capacity': env.int('SCAN_THROTTLE_CODE_CAPACITY', default=600),
+                    'refill_rate': env.float('SCAN_THROTTLE_CODE_RATE', default=20)},
+}
+
+# 二维码ID存在性过滤器(布隆过滤器)，不存在的二维码不查询数据库直接拒绝
+# 新增二维码后通过共享缓存中的版本号通知其他worker，进程内缓存无法共享，所以默认只在配置了redis时启用
+QRCODE_FILTER_ENABLED = env.bool('QRCODE_FILTER_ENABLED', default=bool(REDIS_URL))
+# 过滤器全量重建间隔(秒)，用于清除已删除的二维码；重建在后台线程中进行，期间继续使用旧的过滤器
+QRCODE_FILTER_REBUILD_INTERVAL = env.int('QRCODE_FILTER_REBUILD_INTERVAL', default=3600)
+
+# 二维码标签：二维码内容模板(如 https://example.com/api/wr?id={qrcode_id})，为空时只编码二维码ID
+QR_LABEL_URL_TEMPLATE = env('QR_LABEL_URL_TEMPLATE', default='')
+# 后台下载标签时的渲染进程数，进程在web worker中启动，最多2个
+QR_LABEL_WORKERS = env.int('QR_LABEL_WORKERS', default=2)
+# 后台一次最多下载的标签数，更多的请使用 generate_qr_labels 管理命令生成
+QR_LABEL_ADMIN_LIMIT = env.int('QR_LABEL_ADMIN_LIMIT', default=5000)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -178,7 +229,10 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    # 应用前面的反向代理层数(nginx为1)，限流按 X-Forwarded-For 中由代理追加的客户端IP识别，
+    # 不使用客户端自己填写的部分；直接对外提供服务时设为0，只使用REMOTE_ADDR
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=1),
 }
 
 # JWT configuration
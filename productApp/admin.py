@@ -1,8 +1,16 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, WechatProfile, ProductType, Product, OperationRecord, RepairRecord, AccessCode, Attachment
+from .models import (
+    User, WechatProfile, ProductType, Product, OperationRecord, RepairRecord, AccessCode, Attachment, Job, CodeBlock,
+    warranty_active_q
+)
 from django.contrib.contenttypes.admin import GenericTabularInline
 from django import forms
+from .utils.access_code import invalidate_access_codes
+from .utils.product_cache import invalidate_products
+from .utils.product_import import QrcodeReader, CSV, detect_format
+from .services import import_products
+from . import jobs
 
 # 修改django管理的名字
 admin.site.site_header = '产品管理系统'
@@ -46,20 +54,75 @@ class ProductTypeAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('-created_at',)
 
+    def delete_queryset(self, request, queryset):
+        # 批量删除不会调用模型的delete，需要手动清除级联删除的产品缓存
+        invalidate_products(Product.objects.filter(product_type__in=queryset).values_list('qrcode_id', flat=True))
+        super().delete_queryset(request, queryset)
+
 
 from django.shortcuts import render, redirect
 from django.urls import path
 from django.contrib import messages
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .utils.qr_labels import stream_label_zip
+
+# 后台下载标签时最多启动的渲染进程数
+ADMIN_LABEL_MAX_WORKERS = 2
+
+class WarrantyStateFilter(admin.SimpleListFilter):
+    title = '保修状态'
+    parameter_name = 'under_warranty'
+
+    def lookups(self, request, model_admin):
+        return (('1', '在保修期内'), ('0', '不在保修期内'))
+
+    def queryset(self, request, queryset):
+        if self.value() == '1':
+            return queryset.filter(warranty_active_q())
+        if self.value() == '0':
+            return queryset.exclude(warranty_active_q())
+        return queryset
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('qrcode_id', 'product_type', 'agent', 'name', 'status', 'shipping_date', 'activation_date',
                     'is_under_warranty')
-    list_filter = ('status', 'product_type', 'shipping_date', 'activation_date')
-    search_fields = ('qrcode_id', 'product_type__name', 'agent__username', 'name', 'phone', 'email')
+    list_filter = ('status', WarrantyStateFilter, 'product_type', 'shipping_date', 'activation_date')
+    # ilike 在Postgres上使用三元组索引(productApp.search)
+    search_fields = ('qrcode_id__ilike', 'product_type__name', 'agent__username__ilike', 'name__ilike',
+                     'phone__ilike', 'email__ilike')
     readonly_fields = ('created_at', 'updated_at', 'warranty_start_date', 'warranty_end_date')
     ordering = ('-created_at',)
     change_list_template = 'admin/productApp/product/change_list.html'
+    actions = ['download_labels']
+
+    def delete_queryset(self, request, queryset):
+        # 批量删除不会调用模型的delete，需要手动清除扫码缓存
+        invalidate_products(queryset.values_list('qrcode_id', flat=True))
+        super().delete_queryset(request, queryset)
+
+    @admin.action(description='下载二维码标签(ZIP)')
+    def download_labels(self, request, queryset):
+        """
+        在进程池中渲染选中产品的标签，边渲染边下载
+        进程池在web worker中启动，限制进程数和标签数，大批量请使用 generate_qr_labels 管理命令
+        """
+        count = queryset.count()
+        if count > settings.QR_LABEL_ADMIN_LIMIT:
+            self.message_user(request, f'选中了{count}个产品，后台一次最多下载{settings.QR_LABEL_ADMIN_LIMIT}个标签，'
+                                       f'请使用 python manage.py generate_qr_labels 生成', messages.ERROR)
+            return None
+        qrcode_ids = queryset.order_by('id').values_list('qrcode_id', flat=True).iterator(chunk_size=5000)
+        response = StreamingHttpResponse(
+            stream_label_zip(qrcode_ids, url_template=settings.QR_LABEL_URL_TEMPLATE or None,
+                             workers=max(1, min(settings.QR_LABEL_WORKERS, ADMIN_LABEL_MAX_WORKERS))),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="qr-labels-{timezone.now():%Y%m%d%H%M%S}.zip"'
+        return response
 
     def get_urls(self):
         urls = super().get_urls()
@@ -70,52 +133,55 @@ class ProductAdmin(admin.ModelAdmin):
 
     def bulk_create_view(self, request):
         if request.method == 'POST':
-            qrcode_ids = request.POST.get('qrcode_ids', '').strip().split('\n')
             product_type_id = request.POST.get('product_type')
             factory_remark = request.POST.get('factory_remark', '').strip()
+            upload = request.FILES.get('qrcode_file')
+            max_length = Product._meta.get_field('qrcode_id').max_length
+
+            # 文本框每行一个二维码ID，上传文件支持CSV/NDJSON
+            readers = [QrcodeReader(request.POST.get('qrcode_ids', '').splitlines(), CSV, max_length)]
+            if upload:
+                readers.append(QrcodeReader(upload, detect_format(upload.content_type, upload.name) or CSV,
+                                            max_length))
 
-            if not qrcode_ids or not product_type_id:
-                messages.error(request, '请提供二维码ID列表和产品类型')
+            if not product_type_id or not (request.POST.get('qrcode_ids', '').strip() or upload):
+                messages.error(request, '请提供二维码ID列表或文件，以及产品类型')
                 return redirect('.')
 
             try:
                 product_type = ProductType.objects.get(id=product_type_id)
-                created_count = 0
-                skipped_count = 0
-                error_qrcodes = []
-
-                for qrcode_id in qrcode_ids:
-                    qrcode_id = qrcode_id.strip()
-                    if not qrcode_id:
-                        continue
-
-                    # 检查是否已存在相同的qrcode_id
-                    if Product.objects.filter(qrcode_id=qrcode_id).exists():
-                        skipped_count += 1
-                        error_qrcodes.append(f"{qrcode_id} (已存在)")
-                        continue
-
-                    try:
-                        Product.objects.create(
-                            qrcode_id=qrcode_id,
-                            product_type=product_type,
-                            factory_remark=factory_remark
-                        )
-                        created_count += 1
-                    except Exception as e:
-                        error_qrcodes.append(f"{qrcode_id} ({str(e)})")
-
-                if created_count > 0:
-                    messages.success(request, f'成功创建 {created_count} 个产品')
-                if skipped_count > 0:
-                    messages.warning(request, f'跳过 {skipped_count} 个已存在的产品')
-                if error_qrcodes:
-                    messages.error(request, f'以下ID创建失败：{", ".join(error_qrcodes)}')
-
-            except ProductType.DoesNotExist:
+            except (ProductType.DoesNotExist, ValueError):
                 messages.error(request, '无效的产品类型')
-            except Exception as e:
-                messages.error(request, f'创建产品时发生错误：{str(e)}')
+                return redirect('.')
+
+            qrcode_ids = (qrcode_id for reader in readers for qrcode_id in reader)
+            operator = f"user-{request.user.username}"
+            if request.POST.get('background'):
+                qrcode_ids = list(qrcode_ids)
+                invalid = [item for reader in readers for item in reader.invalid]
+                job = jobs.enqueue('import_products', {
+                    'product_type_id': product_type.id,
+                    'remark': factory_remark,
+                    'operator': operator,
+                    'qrcode_ids': qrcode_ids,
+                    'invalid': invalid,
+                }, user=request.user, total=len(qrcode_ids))
+                messages.success(request, f'已提交后台任务 #{job.id}，共 {len(qrcode_ids)} 个二维码')
+                return redirect('admin:productApp_job_change', job.id)
+
+            # 一次IN查询排除已存在的二维码，分批插入并批量写入操作记录
+            result = import_products(qrcode_ids, product_type, factory_remark, operator=operator)
+            invalid = [item for reader in readers for item in reader.invalid]
+
+            if result['created']:
+                messages.success(request, f'成功创建 {result["created"]} 个产品')
+            if result['duplicates']:
+                messages.warning(request, f'跳过 {len(result["duplicates"])} 个已存在的产品：'
+                                          f'{", ".join(result["duplicates"][:50])}')
+            if invalid:
+                messages.error(request, '以下行无效：' + ", ".join(
+                    f'第{item["line"]}行 {item["value"]}' for item in invalid[:50]
+                ))
 
             return redirect('admin:productApp_product_changelist')
 
@@ -145,10 +211,15 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # 保修状态由数据库计算，可以按该列排序
+        return super().get_queryset(request).with_warranty_state()
+
     def is_under_warranty(self, obj):
-        return obj.is_under_warranty()
+        return obj.under_warranty
     is_under_warranty.short_description = '在保修期内'
     is_under_warranty.boolean = True
+    is_under_warranty.admin_order_field = 'under_warranty'
 
 
 @admin.register(OperationRecord)
@@ -186,7 +257,7 @@ class AttachmentInline(GenericTabularInline):
     
     def get_fields(self, request, obj=None):
         """根据是否是新建记录调整字段顺序"""
-        if obj and obj.attachments:  # 如果是编辑已有记录且已有文件
+        if obj and obj.attachments.exists():  # 如果是编辑已有记录且已有文件
             return ('name', 'file_url', 'upload_file', 'file_type', 'description')
         return ('name', 'upload_file', 'file_type', 'description')
 
@@ -212,10 +283,11 @@ class AttachmentAdmin(admin.ModelAdmin):
 class RepairRecordAdmin(admin.ModelAdmin):
     list_display = ('product', 'name', 'phone', 'technician', 'status', 'repair_date', 'created_at')
     list_filter = ('status', 'repair_date', 'created_at')
-    search_fields = ('product__qrcode_id', 'name', 'phone', 'email', 'technician__username', 
-                    'repair_reason', 'repair_solution')
+    search_fields = ('product__qrcode_id__ilike', 'name__ilike', 'phone__ilike', 'email__ilike',
+                     'technician__username__ilike', 'repair_reason__ilike', 'repair_solution__ilike')
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('-created_at',)
+    list_select_related = ('product', 'technician')
     inlines = [AttachmentInline]
     
     def get_readonly_fields(self, request, obj=None):
@@ -244,9 +316,36 @@ class RepairRecordAdmin(admin.ModelAdmin):
 
 @admin.register(AccessCode)
 class AccessCodeAdmin(admin.ModelAdmin):
-    list_display = ('code', 'is_active', 'validity_period', 'created_at')
+    list_display = ('code', 'is_active', 'validity_period', 'expires_at', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('code', 'is_active')
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
 
+    def delete_queryset(self, request, queryset):
+        # 批量删除不会调用模型的delete，需要手动通知刷新访问码
+        super().delete_queryset(request, queryset)
+        invalidate_access_codes()
+
+    @admin.display(description='过期时间')
+    def expires_at(self, obj):
+        return obj.expires_at
+
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job_type', 'status', 'total', 'processed', 'attempts', 'created_by', 'created_at',
+                    'finished_at')
+    list_filter = ('job_type', 'status')
+    readonly_fields = ('job_type', 'params', 'total', 'processed', 'result', 'error', 'attempts', 'created_by',
+                       'created_at', 'started_at', 'heartbeat_at', 'finished_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(CodeBlock)
+class CodeBlockAdmin(admin.ModelAdmin):
+    list_display = ('prefix', 'node', 'code_length', 'issued', 'created_at', 'updated_at')
+    search_fields = ('prefix', 'node')
+    readonly_fields = ('issued', 'created_at', 'updated_at')
+    ordering = ('-created_at',)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ProductappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'productApp'
+
+    def ready(self):
+        # 注册 ilike 查询，后台和接口的搜索都会用到
+        from . import search  # noqa: F401
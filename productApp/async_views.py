@@ -0,0 +1,133 @@
+"""
+公开扫码/激活接口的原生异步实现，在ASGI部署(ASYNC_PUBLIC_VIEWS=true)时替换同名的同步视图
+读操作使用Django异步ORM，激活涉及事务，通过sync_to_async复用同步实现
+"""
+import functools
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from rest_framework.throttling import BaseThrottle
+
+from .models import Product
+from .serializers import ProductActivationSerializer
+from .utils.access_code import access_code_validator
+from .utils.product_cache import aget_cached_product, aset_cached_product
+from .utils.qrcode_filter import qrcode_filter
+from .throttling import acheck_scan_rate
+from .views import (
+    PRODUCT_SCAN_FIELDS, build_product_info, process_activation, get_idempotency_key
+)
+
+INVALID_ACCESS_CODE = {'status': 'error', 'message': '无效的访问码', 'message_en': 'Invalid access code'}
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def parse_request_data(request):
+    """解析JSON或表单请求体，JSON格式错误返回None"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def scan_throttled(view):
+    """异步视图的扫码限流，与同步视图的ScanBurstThrottle共用令牌桶"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        data = parse_request_data(request) or {}
+        access_code = request.GET.get('access_code') or data.get('access_code')
+        wait = await acheck_scan_rate(BaseThrottle().get_ident(request), access_code)
+        if wait is not None:
+            response = json_response({
+                'detail': f'Request was throttled. Expected available in {math.ceil(wait)} seconds.'
+            }, status=429)
+            response.headers['Retry-After'] = str(math.ceil(wait))
+            return response
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def extract_qrcode_id(qrcode_id):
+    if qrcode_id and "http" in qrcode_id:
+        # 如果是URL则提取qrcode_id参数值
+        qrcode_id = qrcode_id.split('/')[-1].split('=')[-1]
+    return qrcode_id
+
+
+async def aload_product_snapshot(qrcode_id):
+    """load_product_snapshot的异步版本"""
+    if not qrcode_id or len(qrcode_id) > Product._meta.get_field('qrcode_id').max_length:
+        return None
+    if not await qrcode_filter.amight_exist(qrcode_id):
+        return None
+    snapshot = await aget_cached_product(qrcode_id)
+    if snapshot is None:
+        snapshot = await Product.objects.filter(qrcode_id=qrcode_id).values(*PRODUCT_SCAN_FIELDS).afirst()
+        if snapshot is None:
+            return None
+        await aset_cached_product(qrcode_id, snapshot)
+    return snapshot
+
+
+async def get_product_info(qrcode_id):
+    """获取产品信息"""
+    return build_product_info(await aload_product_snapshot(qrcode_id))
+
+
+@csrf_exempt
+@require_POST
+@scan_throttled
+async def warranty_registration_api(request):
+    data = parse_request_data(request)
+    if data is None:
+        return json_response({'status': 'error', 'message': '请求格式错误', 'message_en': 'Malformed request'},
+                             status=400)
+    if not await access_code_validator.ais_valid(data.get('access_code')):
+        return json_response(INVALID_ACCESS_CODE)
+
+    response = await get_product_info(extract_qrcode_id(data.get('qrcode_id')))
+    return json_response(response, status=200 if response['status'] == 'success' else 400)
+
+
+@csrf_exempt
+@require_POST
+@scan_throttled
+async def check_code_api(request):
+    data = parse_request_data(request) or {}
+    if await access_code_validator.ais_valid(data.get('access_code')):
+        return json_response({'status': 'success'})
+    return json_response(INVALID_ACCESS_CODE)
+
+
+@csrf_exempt
+@require_POST
+@scan_throttled
+async def activate_product(request):
+    """产品激活API"""
+    serializer = ProductActivationSerializer(data=parse_request_data(request) or {})
+    if not serializer.is_valid():
+        return json_response({
+            'status': 'error',
+            'message': '输入数据验证失败',
+            'message_en': 'Input data validation failed',
+            'errors': serializer.errors
+        }, status=400)
+
+    # 激活是单条条件UPDATE加操作记录的事务，通过sync_to_async执行
+    status_code, data = await sync_to_async(process_activation)(
+        serializer.validated_data,
+        operator=f"client-{serializer.validated_data['name']}",
+        idempotency_key=get_idempotency_key(request, serializer.validated_data)
+    )
+    return json_response(data, status=status_code)
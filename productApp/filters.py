@@ -0,0 +1,63 @@
+"""
+File: 列表筛选
+保修状态相关的筛选直接使用 warranty_end_date 上的条件，可以使用索引(见 product_warranty_end_idx)
+"""
+from datetime import timedelta
+
+import django_filters
+from django import forms
+from django.utils import timezone
+
+from .models import Product, warranty_active_q
+
+
+class DaysField(forms.RegexField):
+    """天数，如 30 或 30d"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('error_messages', {'invalid': '请输入天数，如 30d'})
+        super().__init__(r'^\s*\d{1,5}\s*[dD]?\s*$', *args, **kwargs)
+
+    def clean(self, value):
+        value = super().clean(value)
+        return int(value.strip().rstrip('dD')) if value else None
+
+
+class DaysFilter(django_filters.Filter):
+    field_class = DaysField
+
+
+class StableOrderingFilter(django_filters.OrderingFilter):
+    """排序字段相同时按 id 倒序，分页结果稳定"""
+
+    def filter(self, qs, value):
+        qs = super().filter(qs, value)
+        if value:
+            qs = qs.order_by(*qs.query.order_by, '-id')
+        return qs
+
+
+class ProductFilter(django_filters.FilterSet):
+    under_warranty = django_filters.BooleanFilter(method='filter_under_warranty', label='在保修期内')
+    warranty_expires_within = DaysFilter(method='filter_warranty_expires_within', label='保修在多少天内到期')
+    ordering = StableOrderingFilter(fields=(
+        ('created_at', 'created_at'),
+        ('warranty_end_date', 'warranty_end_date'),
+        ('under_warranty', 'under_warranty'),
+    ))
+
+    class Meta:
+        model = Product
+        fields = ['qrcode_id', 'product_type', 'status', 'agent']
+
+    def filter_under_warranty(self, queryset, name, value):
+        if value is None:
+            return queryset
+        return queryset.filter(warranty_active_q()) if value else queryset.exclude(warranty_active_q())
+
+    def filter_warranty_expires_within(self, queryset, name, value):
+        """仍在保修期内，且在 value 天内到期"""
+        if value is None:
+            return queryset
+        now = timezone.now()
+        return queryset.filter(warranty_active_q(now), warranty_end_date__lte=now + timedelta(days=value))
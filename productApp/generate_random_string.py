@@ -1,8 +1,13 @@
+"""
+独立脚本：生成随机二维码ID并输出标签ZIP(每个二维码一张PNG + manifest.csv)
+不需要Django和数据库，只依赖 qrcode 和 pillow，在项目根目录运行：
+    python -m productApp.generate_random_string 100 labels.zip
+在项目中请使用管理命令 python manage.py allocate_codes 和 python manage.py generate_qr_labels
+"""
 import secrets
-import qrcode
-import csv
-from io import BytesIO
-import os
+import sys
+
+from productApp.utils.qr_labels import stream_label_zip
 
 # 定义字符集，排除容易混淆的字符
 CHARSET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
@@ -11,48 +16,22 @@ CHARSET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
 def generate_random_string(length=8):
     return ''.join(secrets.choice(CHARSET) for _ in range(length))
 
-# 生成二维码并保存为图片
-def generate_qr_code(data, file_name):
-    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
-    qr.add_data(data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format="PNG")
-    return buffer
-
-# 将数据写入CSV文件
-def save_to_csv(data, filename):
-    with open(filename, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(['String', 'QR Code'])
-        for item in data:
-            writer.writerow([item['string'], item['qr_code']])
+# 生成不重复的随机字符串(不检查数据库，入库前请使用 python manage.py allocate_codes)
+def generate_unique_strings(count, length=8):
+    strings = set()
+    while len(strings) < count:
+        strings.add(generate_random_string(length))
+    return list(strings)
 
 # 主函数
 def main():
-    data = []
-    num_strings = 10  # 生成10个随机字符串
+    num_strings = int(sys.argv[1]) if len(sys.argv) > 1 else 10  # 默认生成10个随机字符串
+    output = sys.argv[2] if len(sys.argv) > 2 else 'labels.zip'
 
-    for _ in range(num_strings):
-        random_string = generate_random_string()
-        print(f"Generated String: {random_string}")
-        
-        # 生成二维码
-        qr_code_buffer = generate_qr_code(random_string, f"{random_string}.png")
-        
-        # 保存二维码图片
-        qr_code_path = f"{random_string}.png"
-        with open(qr_code_path, 'wb') as f:
-            f.write(qr_code_buffer.getvalue())
-        
-        # 保存到数据列表
-        data.append({'string': random_string, 'qr_code': qr_code_path})
-    
-    # 保存到CSV文件
-    save_to_csv(data, 'output.csv')
-    print(f"Data saved to {os.path.abspath('output.csv')}")
+    with open(output, 'wb') as file:
+        for chunk in stream_label_zip(generate_unique_strings(num_strings)):
+            file.write(chunk)
+    print(f"Labels saved to {output}")
 
 if __name__ == "__main__":
     main()
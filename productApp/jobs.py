@@ -0,0 +1,134 @@
+"""
+后台任务：耗时的批量操作写入Job表后请求立即返回，由 run_jobs 进程领取执行，
+不受gunicorn请求超时和worker回收的影响。
+多个 run_jobs 进程通过 SELECT ... FOR UPDATE SKIP LOCKED 领取任务，同一任务只会被一个进程执行。
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Job, ProductType, User
+from .services import import_products, import_report, ship_products, ship_manifest
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_CACHE_KEY = 'job:progress:{job_id}'
+# 执行中的任务超过该时间没有心跳(更新进度)，视为执行进程已退出，允许重新领取
+STALE_AFTER = timedelta(minutes=30)
+# 最多执行次数，批量导入和发货可以安全重试(已处理的会被跳过)
+MAX_ATTEMPTS = 3
+
+JOB_HANDLERS = {}
+
+
+def job_handler(job_type):
+    """注册任务处理函数，处理函数参数为 (job, progress)，返回值保存为任务结果"""
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def enqueue(job_type, params, user=None, total=0):
+    """提交后台任务"""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f'未知的任务类型: {job_type}')
+    return Job.objects.create(job_type=job_type, params=params, created_by=user, total=total)
+
+
+def set_progress(job_id, processed):
+    """进度写入共享缓存，同时刷新心跳时间，长时间执行的任务不会被当作超时重新领取"""
+    cache.set(PROGRESS_CACHE_KEY.format(job_id=job_id), processed, int(STALE_AFTER.total_seconds()))
+    Job.objects.filter(id=job_id, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+
+
+def get_progress(job):
+    """已处理数量，执行中的任务从共享缓存读取"""
+    if job.status == Job.RUNNING:
+        return cache.get(PROGRESS_CACHE_KEY.format(job_id=job.id), job.processed)
+    return job.processed
+
+
+def claim_next_job():
+    """领取一个等待执行(或执行超时)的任务，没有任务时返回None"""
+    stale_before = timezone.now() - STALE_AFTER
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Job.PENDING) | Q(status=Job.RUNNING, heartbeat_at__lt=stale_before)
+        ).order_by('id').first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at', 'attempts'])
+    return job
+
+
+def run_job(job):
+    """
+    执行任务并保存结果，异常时记录错误信息
+    执行期间任务被其他进程重新领取(attempts已变化)时不保存结果，避免覆盖新的执行
+    """
+    try:
+        handler = JOB_HANDLERS.get(job.job_type)
+        if handler is None:
+            raise ValueError(f'未知的任务类型: {job.job_type}')
+        if job.attempts > MAX_ATTEMPTS:
+            raise RuntimeError(f'超过最大执行次数 {MAX_ATTEMPTS}')
+        job.result = handler(job, lambda processed: set_progress(job.id, processed))
+    except Exception:
+        logger.exception('后台任务 %s 执行失败', job.id)
+        job.status = Job.FAILED
+        job.error = traceback.format_exc()
+    else:
+        job.status = Job.SUCCEEDED
+        job.processed = job.total
+    job.finished_at = timezone.now()
+    saved = Job.objects.filter(id=job.id, attempts=job.attempts).update(
+        status=job.status, result=job.result, error=job.error, processed=job.processed, finished_at=job.finished_at
+    )
+    if not saved:
+        logger.warning('后台任务 %s 已被其他进程重新领取，不保存本次执行结果', job.id)
+        job.refresh_from_db()
+        return job
+    cache.delete(PROGRESS_CACHE_KEY.format(job_id=job.id))
+    return job
+
+
+@job_handler('import_products')
+def import_products_job(job, progress):
+    params = job.params
+    product_type = ProductType.objects.get(id=params['product_type_id'])
+    result = import_products(params['qrcode_ids'], product_type, params.get('remark', ''),
+                             operator=params['operator'], progress=progress)
+    return import_report(result, params.get('invalid', []))
+
+
+@job_handler('ship_products')
+def ship_products_job(job, progress):
+    params = job.params
+    agent = User.objects.get(id=params['agent_id'], user_type=User.AGENT)
+    shipping_date = parse_datetime(params['shipping_date']) if params.get('shipping_date') else timezone.now()
+    return ship_products(params['qrcode_ids'], agent, shipping_date, operator=params['operator'],
+                         progress=progress)
+
+
+@job_handler('ship_manifest')
+def ship_manifest_job(job, progress):
+    """按出货清单发货，结果包括各类行数和按行号排序的逐行结果"""
+    params = job.params
+    results, counts = [], {'shipped': 0, 'skipped': 0, 'error': 0}
+    for item in ship_manifest(params['rows'], operator=params['operator']):
+        results.append(item)
+        counts[item['result']] += 1
+        if len(results) % 1000 == 0:
+            progress(len(results))
+    results.sort(key=lambda item: item['line'])
+    return {**counts, 'results': results}
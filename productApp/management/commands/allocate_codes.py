@@ -0,0 +1,71 @@
+"""
+批量生成不重复的二维码ID
+
+每个生产节点使用自己的号段(唯一前缀)，多个节点可以同时生成；每批只用一次IN查询排除已存在的二维码。
+
+用法:
+    # 生成10万个二维码并直接创建产品
+    python manage.py allocate_codes --count 100000 --node line-1 --create --product-type 1 -o codes.csv
+    # 只输出二维码，不入库
+    python manage.py allocate_codes --count 5000 --node line-2 > codes.csv
+"""
+import csv
+import socket
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productApp.models import ProductType
+from productApp.services import allocate_codes, import_products, reserve_code_block
+from productApp.utils.codes import CODE_LENGTH
+
+# 每轮生成并入库的数量
+ROUND_SIZE = 100000
+
+
+class Command(BaseCommand):
+    help = '使用预留号段批量生成不重复的二维码ID，可以同时创建产品'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, required=True, help='生成数量')
+        parser.add_argument('--node', default=socket.gethostname(), help='生产节点名称，同一节点复用同一号段')
+        parser.add_argument('--length', type=int, default=CODE_LENGTH, help='二维码长度')
+        parser.add_argument('--no-block', action='store_true', help='不使用号段前缀，完全随机')
+        parser.add_argument('--create', action='store_true', help='同时创建产品')
+        parser.add_argument('--product-type', type=int, help='创建产品时的产品类型')
+        parser.add_argument('--remark', default='', help='创建产品时的厂家备注')
+        parser.add_argument('-o', '--output', default='-', help='输出CSV文件，默认输出到标准输出')
+
+    def handle(self, *args, **options):
+        product_type = None
+        if options['create']:
+            if not options['product_type']:
+                raise CommandError('创建产品时需要指定 --product-type')
+            try:
+                product_type = ProductType.objects.get(id=options['product_type'])
+            except ProductType.DoesNotExist:
+                raise CommandError('无效的产品类型')
+
+        block = None if options['no_block'] else reserve_code_block(options['node'], options['length'])
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='')
+        writer = csv.writer(output)
+        writer.writerow(['qrcode_id'])
+        # 未入库时需要记住已生成的二维码，避免后面的批次重复
+        issued = set()
+        remaining = options['count']
+        try:
+            while remaining > 0:
+                codes = allocate_codes(min(ROUND_SIZE, remaining), block=block, length=options['length'],
+                                       exclude=issued)
+                if product_type:
+                    import_products(codes, product_type, options['remark'], operator=f"node-{options['node']}")
+                else:
+                    issued.update(codes)
+                writer.writerows([code] for code in codes)
+                remaining -= len(codes)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        where = f"号段 {block.prefix}" if block else '随机'
+        self.stderr.write(self.style.SUCCESS(f"已生成 {options['count']} 个二维码({where})"))
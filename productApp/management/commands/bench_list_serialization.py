@@ -0,0 +1,106 @@
+"""
+列表接口序列化的微基准测试：ModelSerializer + JSONRenderer 与 values() 快速序列化 + orjson 的每秒行数对比
+
+在独立的测试数据库中生成产品、操作记录和维修记录，每种记录分别用两种方式序列化同样的行(包括查询数据库)，
+取多次运行中最快的一次，并检查两种方式输出的JSON逐字节一致。
+
+用法:
+    python manage.py bench_list_serialization
+    python manage.py bench_list_serialization --rows 50000 --repeat 5
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from productApp.models import User, Product, ProductType, OperationRecord, RepairRecord
+from productApp.renderers import ORJSONRenderer, orjson
+from productApp.serializers import (
+    ProductSerializer, OperationRecordSerializer, RepairRecordSerializer, ProductFastSerializer,
+    OperationRecordFastSerializer, RepairRecordFastSerializer
+)
+
+
+class Command(BaseCommand):
+    help = '列表接口序列化方式的每秒行数基准测试'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='每种记录序列化的行数')
+        parser.add_argument('--repeat', type=int, default=3, help='每种方式运行的次数，取最快的一次')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write(self.style.WARNING('未安装orjson，快速序列化使用JSONRenderer渲染'))
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.seed(options['rows'])
+            results = self.run(options['rows'], options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'列表':<16}{'ModelSerializer 行/秒':>24}{'快速序列化 行/秒':>20}{'加速':>8}")
+        for name, (before, after) in results.items():
+            self.stdout.write(f'{name:<16}{before:>24,.0f}{after:>20,.0f}{after / before:>7.1f}x')
+
+    def seed(self, count):
+        agent = User.objects.create_user(username='bench-agent', password='bench', user_type=User.AGENT)
+        technician = User.objects.create_user(username='bench-tech', password='bench', user_type=User.EMPLOYEE)
+        product_type = ProductType.objects.create(name='基准产品', model_number='BENCH-LIST')
+        now = timezone.now()
+        products = Product.objects.bulk_create([
+            Product(
+                qrcode_id=f'L{index:09d}', product_type=product_type, agent=agent, status=3,
+                name=f'客户{index}', phone=f'138{index:08d}', email=f'customer{index}@example.com',
+                shipping_date=now - timedelta(days=30), activation_date=now, warranty_start_date=now,
+                warranty_end_date=now + timedelta(days=365)
+            ) for index in range(count)
+        ], batch_size=5000)
+        OperationRecord.objects.bulk_create([
+            OperationRecord(product=product, operator='bench', operation_type=3,
+                            description=f'产品被客户 {product.name} 激活') for product in products
+        ], batch_size=5000)
+        RepairRecord.objects.bulk_create([
+            RepairRecord(product=product, technician=technician, repair_reason='无法开机', status=2)
+            for product in products
+        ], batch_size=5000)
+
+    def run(self, rows, repeat):
+        cases = {
+            'products': (Product.objects.with_warranty_state().select_related('product_type', 'agent'),
+                         ProductSerializer, ProductFastSerializer),
+            'operation-records': (OperationRecord.objects.select_related('product'),
+                                  OperationRecordSerializer, OperationRecordFastSerializer),
+            'repair-records': (RepairRecord.objects.select_related('product', 'technician')
+                               .prefetch_related('attachments'), RepairRecordSerializer, RepairRecordFastSerializer),
+        }
+        results = {}
+        for name, (queryset, serializer_class, fast_serializer_class) in cases.items():
+            queryset = queryset.order_by('-created_at', '-id')
+
+            def model_serializer():
+                return JSONRenderer().render(serializer_class(queryset[:rows], many=True).data)
+
+            def fast_serializer():
+                serializer = fast_serializer_class()
+                return ORJSONRenderer().render(serializer.serialize(serializer.prepare(queryset)[:rows]))
+
+            before, expected = self.best(model_serializer, repeat)
+            after, output = self.best(fast_serializer, repeat)
+            if output != expected:
+                raise CommandError(f'{name}: 快速序列化的输出与 {serializer_class.__name__} 不一致')
+            results[name] = (rows / before, rows / after)
+        return results
+
+    def best(self, func, repeat):
+        timings, output = [], None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = func()
+            timings.append(time.perf_counter() - started)
+        return min(timings), output
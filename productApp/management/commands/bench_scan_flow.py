@@ -0,0 +1,255 @@
+"""
+客户扫码流程的延迟基准测试：扫码页面 -> 查询产品 -> 校验访问码 -> 激活
+
+在独立的测试数据库中生成约100万个产品，通过Django测试客户端依次请求
+warranty_registration(GET/POST)、warranty_registration_api、check_code_api、activate_product，
+统计每个接口的p50/p95/p99延迟和SQL查询数，并与 benchmarks/baselines/ 中保存的基线对比。
+
+用法:
+    python manage.py bench_scan_flow                      # 运行并与基线对比
+    python manage.py bench_scan_flow --save-baseline      # 运行并保存为新的基线
+    python manage.py bench_scan_flow --products 100000 --requests 200 --keepdb
+"""
+import json
+import logging
+import platform
+import random
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, \
+    teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from productApp.models import AccessCode, Product, ProductType
+
+BASELINE_DIR = Path(settings.BASE_DIR) / 'benchmarks' / 'baselines'
+ACCESS_CODE = 'BENCH2025'
+# 使用独立的进程内缓存，不清空也不写入线上共享的redis(产品缓存、限流、幂等键、二维码过滤器快照等)
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench-scan-flow',
+    }
+}
+# 压测时不限流
+UNLIMITED_RATES = {
+    'ip': {'capacity': 10 ** 9, 'refill_rate': 10 ** 9},
+    'access_code': {'capacity': 10 ** 9, 'refill_rate': 10 ** 9},
+}
+
+
+def seeded_qrcode_id(index):
+    return f'B{index:09d}'
+
+
+def seeded_status(index):
+    """状态分布：10%已生成，60%已出货，30%已激活"""
+    bucket = index % 10
+    if bucket == 0:
+        return 1
+    return 2 if bucket <= 6 else 3
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = '客户扫码流程(扫码/登记/激活)的延迟和SQL查询数基准测试'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000000, help='生成的产品数量')
+        parser.add_argument('--requests', type=int, default=500, help='每个接口的请求次数')
+        parser.add_argument('--warmup', type=int, default=20, help='每个接口正式计时前的预热请求数')
+        parser.add_argument('--seed', type=int, default=2025)
+        parser.add_argument('--keepdb', action='store_true', help='保留测试数据库，下次运行跳过生成数据')
+        parser.add_argument('--baseline', default='scan_flow',
+                            help='基线名称，保存为 benchmarks/baselines/<名称>-<数据库>.json')
+        parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+        parser.add_argument('--max-regression', type=float, default=None,
+                            help='p95延迟相对基线变慢超过该百分比或查询数增加时返回失败')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb']
+        )
+        try:
+            # 单进程运行，进程内缓存中的过滤器版本号不需要跨进程共享，与基线一样启用过滤器
+            with override_settings(SCAN_THROTTLE_RATES=UNLIMITED_RATES, CACHES=BENCH_CACHES,
+                                   QRCODE_FILTER_ENABLED=True):
+                self.seed(options['products'])
+                results = self.run(options['requests'], options['warmup'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        baseline_path = BASELINE_DIR / f"{options['baseline']}-{connection.vendor}.json"
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+        self.report(results, baseline)
+
+        if options['save_baseline']:
+            BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({
+                'products': options['products'],
+                'requests': options['requests'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'machine': platform.platform(),
+                'created_at': timezone.now().isoformat(timespec='seconds'),
+                'endpoints': results,
+            }, indent=2, ensure_ascii=False) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'基线已保存到 {baseline_path}'))
+        elif baseline and options['max_regression'] is not None:
+            regressions = self.regressions(results, baseline, options['max_regression'])
+            if regressions:
+                raise CommandError('性能回退: ' + '; '.join(regressions))
+
+    def seed(self, count):
+        """生成产品数据，已存在足够数据(--keepdb)时跳过"""
+        AccessCode.objects.get_or_create(code=ACCESS_CODE, defaults={'is_active': True})
+        existing = Product.objects.count()
+        if existing >= count:
+            self.stdout.write(f'使用已有的 {existing} 个产品')
+            return
+
+        product_types = [
+            ProductType.objects.get_or_create(
+                model_number=f'BENCH-{index}',
+                defaults={'name': f'基准产品{index}', 'warranty_period': 365 * (index + 1)}
+            )[0] for index in range(3)
+        ]
+        now = timezone.now()
+        started = time.perf_counter()
+        # 通过基础管理器写入，不经过 ProductQuerySet.bulk_create 注册二维码(通知其他进程刷新过滤器)，
+        # 第一次扫码时过滤器从测试数据库构建
+        manager = Product._base_manager
+        batch = []
+        for index in range(existing, count):
+            status = seeded_status(index)
+            product = Product(qrcode_id=seeded_qrcode_id(index), status=status,
+                              product_type=product_types[index % len(product_types)])
+            if status == 3:
+                product.activation_date = product.warranty_start_date = now - timedelta(days=index % 700)
+                product.warranty_end_date = product.activation_date + timedelta(days=365)
+                product.name = f'客户{index}'
+                product.phone = f'138{index:08d}'
+                product.email = f'customer{index}@example.com'
+            batch.append(product)
+            if len(batch) == 10000:
+                manager.bulk_create(batch)
+                batch = []
+        if batch:
+            manager.bulk_create(batch)
+        self.stdout.write(f'生成 {count - existing} 个产品，耗时 {time.perf_counter() - started:.1f}s')
+
+    def sample_codes(self, status, count):
+        """按状态随机抽取二维码ID"""
+        return list(Product.objects.filter(status=status).order_by('?').values_list('qrcode_id', flat=True)[:count])
+
+    def scenarios(self, total):
+        """每个接口的请求序列，activate_product每次使用不同的已出货产品"""
+        shipped = self.sample_codes(2, total * 2)
+        activated = self.sample_codes(3, total)
+        if len(shipped) < total * 2:
+            raise CommandError('已出货产品不足，请增加 --products 或去掉 --keepdb 重新生成数据')
+        scan_codes = shipped[total:] + activated
+        to_activate = iter(shipped[:total])
+        page_url = reverse('productApp:warranty')
+
+        def scan_code():
+            return self.rng.choice(scan_codes)
+
+        def unknown_code():
+            return f'X{self.rng.randrange(10 ** 9):09d}'
+
+        def activation():
+            return {
+                'qrcode_id': next(to_activate), 'name': '基准客户', 'phone': '13800000000',
+                'email': 'bench@example.com', 'city': '深圳', 'country': '中国', 'installer': '安装队',
+            }
+
+        return [
+            ('wr GET', lambda client: client.get(page_url, {'access_code': ACCESS_CODE, 'id': scan_code()})),
+            ('wr POST', lambda client: client.post(page_url, {'qrcode_id': scan_code()},
+                                                   content_type='application/json')),
+            ('wr_api', lambda client: client.post(reverse('productApp:warranty_api'),
+                                                  {'access_code': ACCESS_CODE, 'qrcode_id': scan_code()},
+                                                  content_type='application/json')),
+            ('wr_api unknown', lambda client: client.post(reverse('productApp:warranty_api'),
+                                                          {'access_code': ACCESS_CODE, 'qrcode_id': unknown_code()},
+                                                          content_type='application/json')),
+            ('code_api', lambda client: client.post(reverse('productApp:check_code_api'),
+                                                    {'access_code': ACCESS_CODE},
+                                                    content_type='application/json')),
+            ('activate_product', lambda client: client.post(reverse('productApp:activate_product'), activation(),
+                                                            content_type='application/json')),
+        ]
+
+    def run(self, requests, warmup):
+        # 不存在的二维码返回400，不输出每条请求的警告日志
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        # 只清空上面的独立缓存
+        cache.clear()
+        client = Client()
+        results = {}
+        for name, send in self.scenarios(requests + warmup):
+            latencies, queries = [], []
+            for iteration in range(requests + warmup):
+                # 查询日志有长度上限，写满后无法按请求统计
+                reset_queries()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = send(client)
+                    elapsed = time.perf_counter() - started
+                if response.status_code >= 500:
+                    raise CommandError(f'{name} 返回 {response.status_code}')
+                if iteration >= warmup:
+                    latencies.append(elapsed * 1000)
+                    queries.append(len(captured))
+            results[name] = {
+                'p50_ms': round(percentile(latencies, 50), 3),
+                'p95_ms': round(percentile(latencies, 95), 3),
+                'p99_ms': round(percentile(latencies, 99), 3),
+                'queries_avg': round(statistics.mean(queries), 2),
+                'queries_max': max(queries),
+            }
+        return results
+
+    def report(self, results, baseline):
+        base = baseline['endpoints'] if baseline else {}
+        header = f"{'endpoint':<18}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'queries':>9}{'max':>5}{'p95 vs base':>14}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, result in results.items():
+            change = ''
+            if name in base and base[name]['p95_ms']:
+                change = f"{(result['p95_ms'] / base[name]['p95_ms'] - 1) * 100:+.1f}%"
+            self.stdout.write(
+                f"{name:<18}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                f"{result['queries_avg']:>9.2f}{result['queries_max']:>5}{change:>14}"
+            )
+
+    def regressions(self, results, baseline, max_regression):
+        regressions = []
+        for name, result in results.items():
+            base = baseline['endpoints'].get(name)
+            if base is None:
+                continue
+            if result['p95_ms'] > base['p95_ms'] * (1 + max_regression / 100):
+                regressions.append(f"{name} p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+            if result['queries_max'] > base['queries_max']:
+                regressions.append(f"{name} 查询数 {base['queries_max']} -> {result['queries_max']}")
+        return regressions
@@ -0,0 +1,109 @@
+"""
+检查常用的筛选/查找语句是否使用了对应的索引(EXPLAIN)
+
+在独立的测试数据库中生成产品、操作记录和维修记录并收集统计信息(ANALYZE)，
+对每个查询执行 EXPLAIN，检查执行计划中是否出现预期的索引，有未使用的索引时返回失败。
+
+用法:
+    python manage.py explain_indexes
+    python manage.py explain_indexes --products 100000 --verbose     # 同时输出完整的执行计划
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models.functions import Lower
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from productApp.models import User, Product, ProductType, OperationRecord, RepairRecord, warranty_active_q
+
+
+class Command(BaseCommand):
+    help = '用EXPLAIN检查常用查询是否使用了对应的索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000, help='生成的产品数量')
+        parser.add_argument('--verbose', action='store_true', help='输出完整的执行计划')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.seed(options['products'])
+            results = self.explain(options['verbose'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        unused = [name for name, index, used in results if not used]
+        if unused:
+            raise CommandError('以下查询没有使用预期的索引: ' + ', '.join(unused))
+        self.stdout.write(self.style.SUCCESS(f'全部 {len(results)} 个查询都使用了预期的索引'))
+
+    def seed(self, count):
+        started = time.perf_counter()
+        agents = [
+            User(username=f'explain-agent-{index}', user_type=User.AGENT) for index in range(50)
+        ]
+        User.objects.bulk_create(agents)
+        agents = list(User.objects.filter(user_type=User.AGENT))
+        product_type = ProductType.objects.create(name='索引检查', model_number='EXPLAIN')
+        now = timezone.now()
+        # 已激活的产品保修到期时间分布在前后三年内
+        products = Product.objects.bulk_create([
+            Product(
+                qrcode_id=f'E{index:09d}', product_type=product_type, status=index % 5 + 1,
+                agent=agents[index % len(agents)] if index % 5 else None,
+                name=f'客户{index}', phone=f'138{index:08d}', email=f'Customer{index}@Example.com',
+                warranty_start_date=now - timedelta(days=1095) if index % 5 == 2 else None,
+                warranty_end_date=now + timedelta(days=index % 2190 - 1095) if index % 5 == 2 else None
+            ) for index in range(count)
+        ], batch_size=5000)
+        OperationRecord.objects.bulk_create([
+            OperationRecord(product=product, operator='explain', operation_type=operation_type)
+            for product in products for operation_type in (1, 2)
+        ], batch_size=5000)
+        RepairRecord.objects.bulk_create([
+            RepairRecord(product=product, repair_reason='无法开机') for product in products[::10]
+        ], batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(f'生成 {count} 个产品，耗时 {time.perf_counter() - started:.1f}s')
+
+    def queries(self):
+        """(说明, 预期使用的索引, 查询)"""
+        agent = User.objects.filter(user_type=User.AGENT).first()
+        product = Product.objects.order_by('id')[100]
+        now = timezone.now()
+        return [
+            ('代理商的产品按状态筛选', 'product_agent_status_idx',
+             Product.objects.filter(agent=agent, status=3)),
+            ('已出货产品列表', 'product_shipped_created_idx',
+             Product.objects.filter(status=2).order_by('-created_at', '-id')[:20]),
+            ('按邮箱查询保修', 'product_email_lower_idx',
+             Product.objects.alias(email_lower=Lower('email')).filter(email_lower='customer100@example.com')),
+            ('按电话查询保修', 'product_phone_idx',
+             Product.objects.filter(phone=product.phone)),
+            ('产品的操作记录', 'oprecord_product_created_idx',
+             OperationRecord.objects.filter(product=product).order_by('-created_at')),
+            ('产品的维修记录', 'repair_product_created_idx',
+             RepairRecord.objects.filter(product=product).order_by('-created_at')),
+            ('维修记录列表', 'repair_created_id_idx',
+             RepairRecord.objects.order_by('-created_at', '-id')[:20]),
+            ('保修即将到期的产品', 'product_warranty_end_idx',
+             Product.objects.filter(warranty_active_q(now), warranty_end_date__lte=now + timedelta(days=30))),
+        ]
+
+    def explain(self, verbose):
+        results = []
+        for name, index, queryset in self.queries():
+            plan = queryset.explain()
+            used = index in plan
+            style = self.style.SUCCESS if used else self.style.ERROR
+            self.stdout.write(style(f"{'✓' if used else '✗'} {name:<16}{index}"))
+            if verbose or not used:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+            results.append((name, index, used))
+        return results
@@ -0,0 +1,61 @@
+"""
+批量生成二维码标签ZIP(每个二维码一张PNG + manifest.csv)，在多个进程中并行渲染
+
+用法:
+    # 已有产品，可按产品类型/状态筛选
+    python manage.py generate_qr_labels --product-type 1 --status 1 -o labels.zip
+    # 指定二维码ID文件(每行一个，CSV或NDJSON)
+    python manage.py generate_qr_labels --qrcode-file codes.csv -o labels.zip
+    # 二维码内容编码为扫码地址
+    python manage.py generate_qr_labels --status 1 --url-template "https://example.com/api/wr?id={qrcode_id}"
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productApp.models import Product
+from productApp.utils.product_import import QrcodeReader, CSV, detect_format
+from productApp.utils.qr_labels import DEFAULT_BATCH_SIZE, stream_label_zip
+
+
+class Command(BaseCommand):
+    help = '批量生成二维码标签PNG并打包为ZIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-o', '--output', default='-', help='输出文件，默认输出到标准输出')
+        parser.add_argument('--qrcode-file', help='二维码ID文件(CSV/NDJSON)，不指定时从产品表读取')
+        parser.add_argument('--product-type', type=int, help='按产品类型筛选')
+        parser.add_argument('--status', type=int, help='按产品状态筛选')
+        parser.add_argument('--url-template', help='二维码内容模板，如 https://example.com/api/wr?id={qrcode_id}')
+        parser.add_argument('--workers', type=int, default=None, help='渲染进程数，默认为CPU核数')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每个进程任务渲染的标签数')
+        parser.add_argument('--box-size', type=int, default=10, help='二维码每个模块的像素数')
+
+    def qrcode_ids(self, options):
+        if options['qrcode_file']:
+            fmt = detect_format(file_name=options['qrcode_file']) or CSV
+            with open(options['qrcode_file'], 'rb') as file:
+                yield from QrcodeReader(file, fmt, Product._meta.get_field('qrcode_id').max_length)
+            return
+        products = Product.objects.order_by('id')
+        if options['product_type']:
+            products = products.filter(product_type_id=options['product_type'])
+        if options['status']:
+            products = products.filter(status=options['status'])
+        yield from products.values_list('qrcode_id', flat=True).iterator(chunk_size=5000)
+
+    def handle(self, *args, **options):
+        if options['output'] == '-' and sys.stdout.isatty():
+            raise CommandError('请使用 -o 指定输出文件')
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for chunk in stream_label_zip(
+                self.qrcode_ids(options), url_template=options['url_template'], workers=options['workers'],
+                batch_size=options['batch_size'], box_size=options['box_size']
+            ):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        if options['output'] != '-':
+            self.stderr.write(self.style.SUCCESS(f"标签已保存到 {options['output']}"))
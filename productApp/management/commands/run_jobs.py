@@ -0,0 +1,48 @@
+"""
+后台任务执行进程，可以同时启动多个
+
+用法:
+    python manage.py run_jobs              # 持续运行，没有任务时每隔 --interval 秒检查一次
+    python manage.py run_jobs --once       # 执行完当前所有等待的任务后退出
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from productApp.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = '领取并执行后台任务(批量导入、批量发货等)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='没有等待的任务时退出')
+        parser.add_argument('--interval', type=float, default=2, help='没有任务时的检查间隔(秒)')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        # 收到停止信号时执行完当前任务再退出
+        previous = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            self.work(options['once'], options['interval'])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def work(self, once, interval):
+        while not self.stopping:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    break
+                time.sleep(interval)
+                continue
+            self.stdout.write(f'开始执行任务 {job}')
+            job = run_job(job)
+            self.stdout.write(f'任务结束 {job}')
+
+    def stop(self, signum, frame):
+        self.stopping = True
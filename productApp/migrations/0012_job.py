@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productApp', '0011_attachment_file_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(max_length=50, verbose_name='任务类型')),
+                ('params', models.JSONField(default=dict, verbose_name='任务参数')),
+                ('status', models.IntegerField(choices=[(1, '等待执行'), (2, '执行中'), (3, '已完成'), (4, '失败')], db_index=True, default=1, verbose_name='状态')),
+                ('total', models.IntegerField(default=0, verbose_name='总数')),
+                ('processed', models.IntegerField(default=0, verbose_name='已处理数')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='执行结果')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='错误信息')),
+                ('attempts', models.IntegerField(default=0, verbose_name='执行次数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productApp', '0012_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=4, unique=True, verbose_name='前缀')),
+                ('node', models.CharField(db_index=True, max_length=50, verbose_name='生产节点')),
+                ('code_length', models.IntegerField(default=8, verbose_name='二维码长度')),
+                ('issued', models.BigIntegerField(default=0, verbose_name='已生成数量')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '二维码号段',
+                'verbose_name_plural': '二维码号段',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
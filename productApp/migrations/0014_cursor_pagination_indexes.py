@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productApp', '0013_codeblock'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='operationrecord',
+            index=models.Index(fields=['-created_at', '-id'], name='productApp__created_1a8d21_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], name='productApp__created_e98f3b_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+"""
+Postgres: 启用 pg_trgm 扩展，为搜索的文本列建立三元组 GIN 索引，ILIKE '%关键字%' 不再全表扫描。
+使用 CONCURRENTLY 建索引，不锁表；其他数据库跳过。
+"""
+from django.db import migrations
+
+# (表, 列)
+TRIGRAM_COLUMNS = [
+    ('productApp_product', 'qrcode_id'),
+    ('productApp_product', 'name'),
+    ('productApp_product', 'phone'),
+    ('productApp_product', 'email'),
+    ('productApp_repairrecord', 'repair_reason'),
+    ('productApp_repairrecord', 'repair_solution'),
+    ('productApp_repairrecord', 'name'),
+    ('productApp_repairrecord', 'phone'),
+    ('productApp_repairrecord', 'email'),
+    ('productApp_user', 'username'),
+]
+
+
+def index_name(table, column):
+    return f'{table.lower()}_{column}_trgm'
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in TRIGRAM_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{index_name(table, column)}" '
+            f'ON "{table}" USING gin ("{column}" gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_COLUMNS:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name(table, column)}"')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('productApp', '0014_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
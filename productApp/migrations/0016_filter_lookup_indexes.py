@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-18 20:57
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productApp', '0015_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='operationrecord',
+            index=models.Index(fields=['product', '-created_at'], name='oprecord_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['agent', 'status'], name='product_agent_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status', 2)), fields=['-created_at', '-id'], name='product_shipped_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='product_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['phone'], name='product_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repairrecord',
+            index=models.Index(fields=['-created_at', '-id'], name='repair_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repairrecord',
+            index=models.Index(fields=['product', '-created_at'], name='repair_product_created_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productApp', '0016_filter_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['warranty_end_date'], name='product_warranty_end_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-18 21:42
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_started_at(apps, schema_editor):
+    # 执行中的任务以开始时间作为心跳时间，执行进程已退出的仍可以被重新领取
+    Job = apps.get_model('productApp', 'Job')
+    Job.objects.filter(heartbeat_at__isnull=True).update(heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productApp', '0017_warranty_end_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='心跳时间'),
+        ),
+        migrations.RunPython(copy_started_at, migrations.RunPython.noop),
+    ]
@@ -4,12 +4,17 @@ import os
 from django.conf import settings
 
 from .utils.qiniu_tools import QiNiuStorage
+from .utils.product_cache import invalidate_products
+from .utils.access_code import invalidate_access_codes
+from .utils.qrcode_filter import register_qrcodes
 from django.db import models
+from django.db.models import Q, Case, When, Value, BooleanField
+from django.db.models.functions import Lower, Now
 from django.contrib.auth.models import AbstractUser
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
-from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 
 
 def generate_uuid_filename(filename):
@@ -18,6 +23,24 @@ def generate_uuid_filename(filename):
     return f"{uuid.uuid4().hex[:8]}.{ext}"
 
 
+def is_within_warranty(warranty_start_date, warranty_end_date):
+    """根据保修起止日期判断当前是否在保修期内"""
+    if not warranty_start_date or not warranty_end_date:
+        return False
+
+    now = timezone.now()
+    # 确保 warranty_end_date 也是 timezone-aware
+    if timezone.is_naive(warranty_end_date):
+        warranty_end_date = timezone.make_aware(warranty_end_date)
+
+    return now <= warranty_end_date
+
+
+def warranty_active_q(now=None):
+    """在保修期内的查询条件，与 is_within_warranty 一致，使用 warranty_end_date 上的索引"""
+    return Q(warranty_start_date__isnull=False, warranty_end_date__gte=now or Now())
+
+
 # Create your models here.
 class User(AbstractUser):
     AGENT = 1
@@ -78,6 +101,31 @@ class ProductType(models.Model):
     def __str__(self):
         return f"{self.name} ({self.model_number})"
 
+    def save(self, *args, **kwargs):
+        # 扫码缓存中包含产品类型名称和保修期，修改后清除该类型下所有产品的缓存
+        if not self._state.adding:
+            invalidate_products(self.products.values_list('qrcode_id', flat=True))
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # 级联删除的产品不会调用产品的delete
+        invalidate_products(self.products.values_list('qrcode_id', flat=True))
+        return super().delete(*args, **kwargs)
+
+
+class ProductQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        # 新增的二维码ID加入存在性过滤器
+        register_qrcodes([obj.qrcode_id for obj in objs])
+        return objs
+
+    def with_warranty_state(self):
+        """由数据库计算保修状态 under_warranty，可以用于筛选和排序"""
+        return self.annotate(under_warranty=Case(
+            When(warranty_active_q(), then=Value(True)), default=Value(False), output_field=BooleanField()
+        ))
+
 
 class Product(models.Model):
     """产品二维码表"""
@@ -116,27 +164,52 @@ class Product(models.Model):
     # 厂家备注
     factory_remark = models.TextField(null=True, blank=True, verbose_name='厂家备注')
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = '产品'
         verbose_name_plural = '产品'
         ordering = ['-created_at']
+        indexes = [
+            # 游标分页按 (created_at, id) 倒序
+            models.Index(fields=['-created_at', '-id']),
+            # 代理商的产品按状态筛选
+            models.Index(fields=['agent', 'status'], name='product_agent_status_idx'),
+            # 已出货待激活的产品列表，只索引状态为"已出货"的行
+            models.Index(fields=['-created_at', '-id'], condition=Q(status=2), name='product_shipped_created_idx'),
+            # 保修查询按客户邮箱(不区分大小写)和电话查找
+            models.Index(Lower('email'), name='product_email_lower_idx'),
+            models.Index(fields=['phone'], name='product_phone_idx'),
+            # 按保修状态、保修到期时间筛选和排序
+            models.Index(fields=['warranty_end_date'], name='product_warranty_end_idx'),
+        ]
 
     def __str__(self):
         return f"{self.qrcode_id}"
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录加载时的二维码ID，修改二维码ID后需要同时清除旧的缓存
+        instance._loaded_qrcode_id = instance.__dict__.get('qrcode_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_products({self.qrcode_id, getattr(self, '_loaded_qrcode_id', None)})
+        if self.qrcode_id != getattr(self, '_loaded_qrcode_id', None):
+            register_qrcodes([self.qrcode_id])
+        self._loaded_qrcode_id = self.qrcode_id
+
+    def delete(self, *args, **kwargs):
+        invalidate_products([self.qrcode_id])
+        return super().delete(*args, **kwargs)
+
     def is_under_warranty(self):
-        """检查产品是否在保修期内"""
-        if not self.warranty_start_date or not self.warranty_end_date:
-            return False
-
-        now = timezone.now()
-        # 确保 warranty_end_date 也是 timezone-aware
-        if timezone.is_naive(self.warranty_end_date):
-            warranty_end = timezone.make_aware(self.warranty_end_date)
-        else:
-            warranty_end = self.warranty_end_date
-
-        return now <= warranty_end
+        """检查产品是否在保修期内，查询时用 with_warranty_state() 计算过的直接使用"""
+        if 'under_warranty' in self.__dict__:
+            return self.under_warranty
+        return is_within_warranty(self.warranty_start_date, self.warranty_end_date)
     
     def activate(self):
         """激活产品"""
@@ -167,6 +240,21 @@ class AccessCode(models.Model):
     def __str__(self):
         return f"{self.code}"
 
+    @property
+    def expires_at(self):
+        """过期时间，长期有效返回None"""
+        if self.validity_period < 0 or not self.created_at:
+            return None
+        return self.created_at + timedelta(days=self.validity_period)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_access_codes()
+
+    def delete(self, *args, **kwargs):
+        invalidate_access_codes()
+        return super().delete(*args, **kwargs)
+
 
 class OperationRecord(models.Model):
     """操作记录表"""
@@ -189,6 +277,12 @@ class OperationRecord(models.Model):
         verbose_name = '操作记录'
         verbose_name_plural = '操作记录'
         ordering = ['-created_at']
+        indexes = [
+            # 游标分页按 (created_at, id) 倒序
+            models.Index(fields=['-created_at', '-id']),
+            # 按产品查看操作记录
+            models.Index(fields=['product', '-created_at'], name='oprecord_product_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.qrcode_id} - {self.get_operation_type_display()}"
@@ -276,6 +370,9 @@ class RepairRecord(models.Model):
     address = models.CharField(max_length=127, null=True, blank=True, verbose_name='客户地址')
     country = models.CharField(max_length=50, null=True, blank=True, verbose_name='客户国家/省份')
     email = models.EmailField(null=True, blank=True, verbose_name='客户邮箱')
+    # 与此维修记录关联的所有附件，列表中可以用 prefetch_related('attachments') 一次查出
+    # 删除维修记录(包括删除产品时级联删除)会同时删除这些附件记录，七牛上的文件不会删除
+    attachments = GenericRelation(Attachment, related_query_name='repair_record')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
 
@@ -283,12 +380,70 @@ class RepairRecord(models.Model):
         verbose_name = '维修记录'
         verbose_name_plural = '维修记录'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='repair_created_id_idx'),
+            # 按产品查看维修记录
+            models.Index(fields=['product', '-created_at'], name='repair_product_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.qrcode_id} - {self.get_status_display()}"
-    
-    @property
-    def attachments(self):
-        """获取与此维修记录关联的所有附件"""
-        ct = ContentType.objects.get_for_model(self)
-        return Attachment.objects.filter(content_type=ct, object_id=self.id)
+
+
+class Job(models.Model):
+    """后台任务表，批量操作放入任务表后由 run_jobs 进程执行"""
+    PENDING = 1
+    RUNNING = 2
+    SUCCEEDED = 3
+    FAILED = 4
+    STATUS_CHOICES = [
+        (PENDING, '等待执行'),
+        (RUNNING, '执行中'),
+        (SUCCEEDED, '已完成'),
+        (FAILED, '失败')
+    ]
+
+    job_type = models.CharField(max_length=50, verbose_name='任务类型')
+    params = models.JSONField(default=dict, verbose_name='任务参数')
+    status = models.IntegerField(choices=STATUS_CHOICES, default=PENDING, db_index=True, verbose_name='状态')
+    total = models.IntegerField(default=0, verbose_name='总数')
+    processed = models.IntegerField(default=0, verbose_name='已处理数')
+    result = models.JSONField(null=True, blank=True, verbose_name='执行结果')
+    error = models.TextField(null=True, blank=True, verbose_name='错误信息')
+    attempts = models.IntegerField(default=0, verbose_name='执行次数')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs',
+                                   verbose_name='创建人')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    # 执行进程每次更新进度时刷新，超时未刷新的任务视为执行进程已退出
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name='心跳时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='结束时间')
+
+    class Meta:
+        verbose_name = '后台任务'
+        verbose_name_plural = '后台任务'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.job_type} #{self.id} - {self.get_status_display()}"
+
+
+class CodeBlock(models.Model):
+    """
+    二维码号段：每个号段是一个唯一前缀，分配给一个生产节点，
+    不同节点生成的二维码前缀不同，可以同时生成而不会互相重复
+    """
+    prefix = models.CharField(max_length=4, unique=True, verbose_name='前缀')
+    node = models.CharField(max_length=50, db_index=True, verbose_name='生产节点')
+    code_length = models.IntegerField(default=8, verbose_name='二维码长度')
+    issued = models.BigIntegerField(default=0, verbose_name='已生成数量')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+
+    class Meta:
+        verbose_name = '二维码号段'
+        verbose_name_plural = '二维码号段'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.prefix} ({self.node})"
@@ -0,0 +1,133 @@
+"""
+File: 分页
+默认仍使用页码分页；请求带 ?pagination=cursor 或 ?cursor= 时改用按 (created_at, id) 的游标分页，
+每页只查询 page_size + 1 行，不执行COUNT，也没有OFFSET，翻到多深都是同样的速度；
+游标分页只能按创建时间倒序，同时指定 ?ordering= 时返回400
+"""
+import base64
+import binascii
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class CreatedAtCursorPagination:
+    """
+    按 (created_at, id) 倒序的游标分页，和模型的 ordering = ['-created_at'] 一致，id 用于区分同一时间创建的行
+    游标为最后一行(或第一行)的 created_at 和 id，需要 (created_at, id) 上的索引
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 10
+    max_page_size = 500
+    invalid_cursor_message = '无效的游标'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by('created_at', 'id')
+            if position:
+                queryset = queryset.filter(
+                    Q(created_at__gt=position[0]) | Q(created_at=position[0], id__gt=position[1])
+                )
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+            if position:
+                queryset = queryset.filter(
+                    Q(created_at__lt=position[0]) | Q(created_at=position[0], id__lt=position[1])
+                )
+
+        # 多取一行判断是否还有下一页
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True,
+                                 cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        """游标格式：base64("<方向>:<created_at微秒时间戳>:<id>")，方向 n 为下一页、p 为上一页"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            direction, timestamp, pk = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split(':')
+            created_at = EPOCH + timedelta(microseconds=int(timestamp))
+            if direction not in ('n', 'p'):
+                raise ValueError(direction)
+            return (created_at, int(pk)), direction == 'p'
+        except (TypeError, ValueError, UnicodeError, binascii.Error, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, direction):
+        # 行可以是模型实例，也可以是 values() 返回的dict
+        created_at, pk = (row['created_at'], row['id']) if isinstance(row, dict) else (row.created_at, row.pk)
+        timestamp = (created_at - EPOCH) // timedelta(microseconds=1)
+        cursor = base64.urlsafe_b64encode(f'{direction}:{timestamp}:{pk}'.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], 'n')
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], 'p')
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """默认页码分页(兼容已有客户端)，请求 ?pagination=cursor 或带 cursor 参数时使用游标分页"""
+    cursor_pagination_class = CreatedAtCursorPagination
+    ordering_conflict_message = '游标分页固定按创建时间倒序，不能同时使用ordering参数'
+
+    def wants_cursor(self, request):
+        return (request.query_params.get('pagination') == 'cursor'
+                or self.cursor_pagination_class.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = self.cursor_pagination_class() if self.wants_cursor(request) else None
+        if self.cursor_paginator:
+            # 游标依赖 (created_at, id) 的顺序，不能静默忽略其他排序
+            if request.query_params.get(api_settings.ORDERING_PARAM):
+                raise ValidationError({api_settings.ORDERING_PARAM: [self.ordering_conflict_message]})
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
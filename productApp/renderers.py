@@ -0,0 +1,34 @@
+"""
+File: orjson渲染器
+输出与DRF的JSONRenderer(紧凑格式、不转义非ASCII字符)逐字节一致(浮点数的指数写法除外，如1e16)，
+orjson不支持的数据和未安装orjson时退回JSONRenderer
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    def __init__(self):
+        # 日期时间等交给DRF的JSONEncoder处理，保证格式一致
+        self.default = JSONEncoder().default
+
+    def use_orjson(self, accepted_media_type, renderer_context):
+        return (orjson is not None and api_settings.COMPACT_JSON and api_settings.UNICODE_JSON
+                and not self.get_indent(accepted_media_type, renderer_context or {}))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not self.use_orjson(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            # 非字符串的键、超出64位的整数等
+            return super().render(data, accepted_media_type, renderer_context)
+        # 与JSONRenderer一致，转义JavaScript中不合法的行分隔符
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
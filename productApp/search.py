@@ -0,0 +1,33 @@
+"""
+File: 模糊搜索
+Postgres上用 ILIKE 查询，可以使用 pg_trgm 的 GIN 索引(见迁移 0015_trigram_search_indexes)；
+Django自带的 icontains 在Postgres上生成 UPPER(列) LIKE UPPER(...)，用不到列上的三元组索引。
+其他数据库(开发环境的SQLite)退回 icontains，结果相同。
+"""
+from django.db.models import CharField, TextField
+from django.db.models.lookups import IContains
+from rest_framework import filters
+
+
+@CharField.register_lookup
+@TextField.register_lookup
+class ILike(IContains):
+    """不区分大小写的包含匹配：field__ilike='abc'"""
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', (*lhs_params, *rhs_params)
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    """search_fields 中不带前缀的字段使用 ilike 查询，在Postgres上使用三元组索引"""
+
+    def construct_search(self, field_name, queryset):
+        if field_name[0] in self.lookup_prefixes:
+            return super().construct_search(field_name, queryset)
+        return f'{field_name}__ilike'
@@ -1,8 +1,39 @@
-from rest_framework import serializers
-from .models import User, WechatProfile, ProductType, Product, OperationRecord, RepairRecord, Attachment
+from operator import itemgetter
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .models import (
+    User, WechatProfile, ProductType, Product, OperationRecord, RepairRecord, Attachment, Job
+)
 from django.contrib.contenttypes.models import ContentType
 
 
+def requested_fields(request):
+    """
+    解析GET请求的 ?fields=a,b(只输出这些字段) 和 ?expand=x,y(把关联字段展开为嵌套对象)
+    :return: {'fields': 字段列表，未指定时为None, 'expand': 字段列表}
+    """
+    def parse(name):
+        value = request.GET.get(name, '') if request is not None and request.method == 'GET' else ''
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return {'fields': parse('fields') or None, 'expand': parse('expand')}
+
+
+class DynamicFieldsMixin:
+    """ModelSerializer 支持 ?fields= 和 ?expand=，可展开的字段在 expandable_fields 中声明"""
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        for name in requested['expand']:
+            if name in self.expandable_fields:
+                self.fields[name] = self.expandable_fields[name](read_only=True)
+        if requested['fields'] is not None:
+            for name in set(self.fields) - set(requested['fields']):
+                self.fields.pop(name)
+
+
 class WechatProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = WechatProfile
@@ -55,7 +86,24 @@ class ProductTypeSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class UserBriefSerializer(serializers.ModelSerializer):
+    """?expand= 展开的代理商、技术人员"""
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'phone']
+
+
+class ProductBriefSerializer(serializers.ModelSerializer):
+    """?expand= 展开的产品"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'qrcode_id', 'product_type', 'status', 'status_display', 'warranty_start_date',
+                  'warranty_end_date']
+
+
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_type_name = serializers.ReadOnlyField(source='product_type.name')
     agent_name = serializers.ReadOnlyField(source='agent.username', allow_null=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -69,6 +117,8 @@ class ProductSerializer(serializers.ModelSerializer):
                  'under_warranty', 'created_at', 'updated_at', 'factory_remark', 'installer']
         read_only_fields = ['created_at', 'updated_at', 'warranty_start_date', 'warranty_end_date']
     
+    expandable_fields = {'product_type': ProductTypeSerializer, 'agent': UserBriefSerializer}
+
     def get_under_warranty(self, obj):
         return obj.is_under_warranty()
 
@@ -82,7 +132,15 @@ class ProductCreateSerializer(serializers.ModelSerializer):
 class ProductBulkCreateSerializer(serializers.Serializer):
     product_type_id = serializers.IntegerField()
     remark = serializers.CharField(max_length=255, required=False, allow_blank=True)
-    qrcode_ids = serializers.ListField(child=serializers.CharField(max_length=100))
+    # 与数据库列的长度一致，超长的二维码ID在校验时拒绝，而不是写入时报错
+    qrcode_ids = serializers.ListField(
+        child=serializers.CharField(max_length=Product._meta.get_field('qrcode_id').max_length)
+    )
+
+
+class ProductImportSerializer(serializers.Serializer):
+    product_type_id = serializers.IntegerField()
+    remark = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
 
 
 class ProductShippingSerializer(serializers.Serializer):
@@ -99,6 +157,8 @@ class ProductActivationSerializer(serializers.Serializer):
     city = serializers.CharField(max_length=50, required=False, allow_blank=True)
     country = serializers.CharField(max_length=50, required=False, allow_blank=True)
     installer = serializers.CharField(max_length=255)
+    # 幂等键，也可以通过请求头 Idempotency-Key 传递
+    idempotency_key = serializers.CharField(max_length=64, required=False)
 
     def validate(self, data):
         """
@@ -109,7 +169,14 @@ class ProductActivationSerializer(serializers.Serializer):
         return data
     
 
-class OperationRecordSerializer(serializers.ModelSerializer):
+class ProductBulkActivationSerializer(ProductActivationSerializer):
+    """批量激活：同一客户和安装人员信息，多个二维码ID"""
+    qrcode_id = None
+    idempotency_key = None
+    qrcode_ids = serializers.ListField(child=serializers.CharField(max_length=100), allow_empty=False)
+
+
+class OperationRecordSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_qrcode = serializers.ReadOnlyField(source='product.qrcode_id')
     operation_type_display = serializers.CharField(source='get_operation_type_display', read_only=True)
     
@@ -119,6 +186,32 @@ class OperationRecordSerializer(serializers.ModelSerializer):
                  'operation_type', 'operation_type_display', 'description', 'created_at']
         read_only_fields = ['created_at']
 
+    expandable_fields = {'product': ProductBriefSerializer}
+
+
+class JobSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    processed = serializers.SerializerMethodField()
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'job_type', 'status', 'status_display', 'total', 'processed', 'progress',
+                  'result', 'error', 'attempts', 'created_at', 'started_at', 'heartbeat_at',
+                  'finished_at']
+
+    def get_processed(self, obj):
+        from .jobs import get_progress
+        return get_progress(obj)
+
+    def get_progress(self, obj):
+        """完成百分比"""
+        if obj.status == Job.SUCCEEDED:
+            return 100
+        if not obj.total:
+            return 0
+        return min(100, round(self.get_processed(obj) * 100 / obj.total, 1))
+
 
 class AttachmentSerializer(serializers.ModelSerializer):
     file_type_display = serializers.CharField(source='get_file_type_display', read_only=True)
@@ -154,7 +247,7 @@ class AttachmentCreateSerializer(serializers.ModelSerializer):
         return data
 
 
-class RepairRecordSerializer(serializers.ModelSerializer):
+class RepairRecordSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_qrcode = serializers.ReadOnlyField(source='product.qrcode_id')
     technician_name = serializers.ReadOnlyField(source='technician.username', allow_null=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -167,6 +260,8 @@ class RepairRecordSerializer(serializers.ModelSerializer):
                  'repair_date', 'status', 'status_display', 'attachments', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
+    expandable_fields = {'product': ProductBriefSerializer, 'technician': UserBriefSerializer}
+
 
 class RepairRecordCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -205,4 +300,311 @@ class WarrantyCheckSerializer(serializers.Serializer):
         """
         if not any(data.values()):
             raise serializers.ValidationError("至少需要提供二维码ID、客户邮箱或电话中的一个")
-        return data
\ No newline at end of file
+        return data
+
+
+class WarrantyBatchCheckSerializer(serializers.Serializer):
+    qrcode_ids = serializers.ListField(child=serializers.CharField(max_length=100), required=False,
+                                      default=list, max_length=1000)
+    customer_emails = serializers.ListField(child=serializers.EmailField(), required=False,
+                                            default=list, max_length=1000)
+    customer_phones = serializers.ListField(child=serializers.CharField(max_length=20), required=False,
+                                            default=list, max_length=1000)
+
+    def validate(self, data):
+        """
+        检查至少提供了一个查询参数
+        """
+        if not any(data.values()):
+            raise serializers.ValidationError("至少需要提供二维码ID、客户邮箱或电话中的一个")
+        return data
+
+
+# 快速序列化中不输出该字段(与 ModelSerializer 跳过关联为空的 source 一致)
+SKIP = object()
+
+
+class FastField:
+    """快速序列化的一个输出字段：需要的列(values()的列名)和从一行取值的函数"""
+
+    def __init__(self, *columns):
+        self.columns = columns
+
+    def get_columns(self):
+        return self.columns
+
+    def bind(self, serializer, prefix):
+        return self.getter(serializer, *[prefix + column for column in self.columns])
+
+    def getter(self, serializer, key):
+        return itemgetter(key)
+
+
+class FastDateTime(FastField):
+    def getter(self, serializer, key):
+        format_datetime = serializer.format_datetime
+        return lambda row: format_datetime(row[key])
+
+
+class FastChoice(FastField):
+    """choices的显示名，对应 get_<字段>_display"""
+
+    def __init__(self, column, choices):
+        super().__init__(column)
+        self.labels = dict(choices)
+
+    def getter(self, serializer, key):
+        labels = self.labels
+        return lambda row: labels.get(row[key], row[key])
+
+
+class FastComputed(FastField):
+    """由多个列计算：func(*列的值)"""
+
+    def __init__(self, func, *columns):
+        super().__init__(*columns)
+        self.func = func
+
+    def getter(self, serializer, *keys):
+        func = self.func
+        return lambda row: func(*[row[key] for key in keys])
+
+
+class FastNested(FastField):
+    """?expand= 展开的关联对象，通过JOIN在同一行取出，外键为空时输出None"""
+
+    def __init__(self, relation, serializer_class):
+        super().__init__(relation)
+        self.relation = relation
+        self.serializer_class = serializer_class
+
+    def get_columns(self):
+        return (self.relation, *[f'{self.relation}__{column}' for column in self.serializer_class().columns])
+
+    def bind(self, serializer, prefix):
+        key = prefix + self.relation
+        nested = self.serializer_class(prefix=f'{key}__')
+        return lambda row: None if row[key] is None else nested.to_representation(row)
+
+
+class FastListSerializer:
+    """
+    列表接口的只读快速序列化：values() 一次取出需要的列(包括关联表的列)，choices的显示名预先算好，
+    逐行直接拼成dict，不创建模型实例，也不经过每个字段的序列化流程。
+    输出与对应的 ModelSerializer 完全一致(字段顺序、空值、日期格式)。
+    子类在 fields 中按 ModelSerializer 的顺序声明每个输出字段需要的列，expandable 声明 ?expand= 可展开的字段；
+    只请求部分字段(?fields=)时只查询这些字段需要的列和关联表
+    """
+    fields = {}
+    expandable = {}
+
+    def __init__(self, fields=None, expand=(), prefix=''):
+        self.datetime_field = serializers.DateTimeField()
+        self.timezone = self.datetime_field.default_timezone()
+        self.iso_8601 = api_settings.DATETIME_FORMAT.lower() == ISO_8601
+
+        specs = {name: self.expandable[name] if name in expand and name in self.expandable else spec
+                 for name, spec in self.fields.items()}
+        if fields is not None:
+            specs = {name: spec for name, spec in specs.items() if name in fields}
+        self.selected = list(specs)
+        self.columns = list(dict.fromkeys(column for spec in specs.values() for column in spec.get_columns()))
+        self.getters = [(name, spec.bind(self, prefix)) for name, spec in specs.items()]
+
+    def format_datetime(self, value):
+        """与 DateTimeField 的输出一致(转换到当前时区，UTC时以Z结尾)，常见情况不经过字段的完整流程"""
+        if value is None:
+            return None
+        if not self.iso_8601 or self.timezone is None or value.tzinfo is None:
+            return self.datetime_field.to_representation(value)
+        value = value.astimezone(self.timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    def prepare(self, queryset):
+        """列表查询，分页需要的 id、created_at 总是取出"""
+        return queryset.prefetch_related(None).values(*dict.fromkeys(['id', 'created_at', *self.columns]))
+
+    def narrow(self, queryset):
+        """详情等使用模型实例的查询：只取需要的列，只JOIN需要的表"""
+        relations = {column.split('__')[0] for column in self.columns if '__' in column}
+        columns = [column for column in self.columns if column not in queryset.query.annotations]
+        return queryset.select_related(None).select_related(*relations).only(*columns)
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+    def to_representation(self, row):
+        data = {}
+        for name, getter in self.getters:
+            value = getter(row)
+            if value is not SKIP:
+                data[name] = value
+        return data
+
+
+class ProductTypeFastSerializer(FastListSerializer):
+    """与 ProductTypeSerializer 的输出一致"""
+    fields = {
+        'id': FastField('id'),
+        'name': FastField('name'),
+        'model_number': FastField('model_number'),
+        'specifications': FastField('specifications'),
+        'description': FastField('description'),
+        'warranty_period': FastField('warranty_period'),
+        'created_at': FastDateTime('created_at'),
+        'updated_at': FastDateTime('updated_at'),
+    }
+
+
+class UserBriefFastSerializer(FastListSerializer):
+    """与 UserBriefSerializer 的输出一致"""
+    fields = {
+        'id': FastField('id'),
+        'username': FastField('username'),
+        'email': FastField('email'),
+        'phone': FastField('phone'),
+    }
+
+
+class ProductBriefFastSerializer(FastListSerializer):
+    """与 ProductBriefSerializer 的输出一致"""
+    fields = {
+        'id': FastField('id'),
+        'qrcode_id': FastField('qrcode_id'),
+        'product_type': FastField('product_type'),
+        'status': FastField('status'),
+        'status_display': FastChoice('status', Product.STATUS_CHOICES),
+        'warranty_start_date': FastDateTime('warranty_start_date'),
+        'warranty_end_date': FastDateTime('warranty_end_date'),
+    }
+
+
+class ProductFastSerializer(FastListSerializer):
+    """与 ProductSerializer 的输出一致"""
+    fields = {
+        'id': FastField('id'),
+        'qrcode_id': FastField('qrcode_id'),
+        'product_type': FastField('product_type'),
+        # 没有产品类型时 ProductSerializer 不输出 product_type_name
+        'product_type_name': FastComputed(lambda pk, name: SKIP if pk is None else name,
+                                          'product_type', 'product_type__name'),
+        'agent': FastField('agent'),
+        'agent_name': FastField('agent__username'),
+        'shipping_date': FastDateTime('shipping_date'),
+        'activation_date': FastDateTime('activation_date'),
+        'name': FastField('name'),
+        'phone': FastField('phone'),
+        'email': FastField('email'),
+        'city': FastField('city'),
+        'country': FastField('country'),
+        'warranty_start_date': FastDateTime('warranty_start_date'),
+        'warranty_end_date': FastDateTime('warranty_end_date'),
+        'status': FastField('status'),
+        'status_display': FastChoice('status', Product.STATUS_CHOICES),
+        # 由数据库计算，见 ProductQuerySet.with_warranty_state
+        'under_warranty': FastField('under_warranty'),
+        'created_at': FastDateTime('created_at'),
+        'updated_at': FastDateTime('updated_at'),
+        'factory_remark': FastField('factory_remark'),
+        'installer': FastField('installer'),
+    }
+    expandable = {
+        'product_type': FastNested('product_type', ProductTypeFastSerializer),
+        'agent': FastNested('agent', UserBriefFastSerializer),
+    }
+
+    def with_warranty_state(self, queryset):
+        if 'under_warranty' in self.columns and 'under_warranty' not in queryset.query.annotations:
+            queryset = queryset.with_warranty_state()
+        return queryset
+
+    def prepare(self, queryset):
+        return super().prepare(self.with_warranty_state(queryset))
+
+    def narrow(self, queryset):
+        return super().narrow(self.with_warranty_state(queryset))
+
+
+class OperationRecordFastSerializer(FastListSerializer):
+    """与 OperationRecordSerializer 的输出一致"""
+    fields = {
+        'id': FastField('id'),
+        'product': FastField('product'),
+        'product_qrcode': FastField('product__qrcode_id'),
+        'operator': FastField('operator'),
+        'operation_type': FastField('operation_type'),
+        'operation_type_display': FastChoice('operation_type', OperationRecord.OPERATION_CHOICES),
+        'description': FastField('description'),
+        'created_at': FastDateTime('created_at'),
+    }
+    expandable = {
+        'product': FastNested('product', ProductBriefFastSerializer),
+    }
+
+
+class FastAttachments(FastField):
+    """维修记录的附件，由 RepairRecordFastSerializer.serialize 一次查出"""
+
+    def getter(self, serializer, key):
+        return lambda row: serializer.attachments[row[key]]
+
+
+class RepairRecordFastSerializer(FastListSerializer):
+    """与 RepairRecordSerializer 的输出一致，一页的附件用一条查询取出"""
+    fields = {
+        'id': FastField('id'),
+        'product': FastField('product'),
+        'product_qrcode': FastField('product__qrcode_id'),
+        'name': FastField('name'),
+        'phone': FastField('phone'),
+        'email': FastField('email'),
+        'address': FastField('address'),
+        'country': FastField('country'),
+        'technician': FastField('technician'),
+        'technician_name': FastField('technician__username'),
+        'repair_reason': FastField('repair_reason'),
+        'repair_solution': FastField('repair_solution'),
+        'repair_date': FastDateTime('repair_date'),
+        'status': FastField('status'),
+        'status_display': FastChoice('status', RepairRecord.STATUS_CHOICES),
+        'attachments': FastAttachments('id'),
+        'created_at': FastDateTime('created_at'),
+        'updated_at': FastDateTime('updated_at'),
+    }
+    expandable = {
+        'product': FastNested('product', ProductBriefFastSerializer),
+        'technician': FastNested('technician', UserBriefFastSerializer),
+    }
+    attachment_columns = ('id', 'object_id', 'name', 'file_url', 'file_type', 'description', 'created_at',
+                          'updated_at')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file_type_labels = dict(Attachment.FILE_TYPE_CHOICES)
+
+    def narrow(self, queryset):
+        queryset = super().narrow(queryset)
+        return queryset if 'attachments' in self.selected else queryset.prefetch_related(None)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        self.attachments = {row['id']: [] for row in rows}
+        if rows and 'attachments' in self.selected:
+            for attachment in Attachment.objects.filter(
+                content_type=ContentType.objects.get_for_model(RepairRecord), object_id__in=list(self.attachments)
+            ).values(*self.attachment_columns):
+                self.attachments[attachment['object_id']].append(self.attachment_representation(attachment))
+        return super().serialize(rows)
+
+    def attachment_representation(self, row):
+        """与 AttachmentSerializer 的输出一致"""
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'file_url': row['file_url'],
+            'file_type': row['file_type'],
+            'file_type_display': self.file_type_labels.get(row['file_type'], row['file_type']),
+            'description': row['description'],
+            'created_at': self.format_datetime(row['created_at']),
+            'updated_at': self.format_datetime(row['updated_at']),
+        }
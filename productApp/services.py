@@ -0,0 +1,434 @@
+"""
+产品批量业务操作，供API、后台和异步任务复用
+尽量使用集合操作(单条UPDATE/INSERT)代替逐行读取和保存
+"""
+import csv
+import io
+import secrets
+from datetime import datetime, time
+from itertools import islice
+
+from django.db import connection, transaction, IntegrityError, NotSupportedError
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import User, Product, ProductType, OperationRecord, CodeBlock
+from .utils.product_cache import invalidate_products
+from .utils.qrcode_filter import register_qrcodes
+from .utils.codes import CHARSET, CODE_LENGTH, random_codes
+
+# 激活时写入的客户信息字段
+CUSTOMER_FIELDS = ('name', 'phone', 'email', 'city', 'country', 'installer')
+# 批量导入每批的二维码数量，每批一个事务
+IMPORT_CHUNK_SIZE = 5000
+# 批量发货每批的二维码数量，另外受数据库单条语句参数个数限制
+SHIP_CHUNK_SIZE = 50000
+# 批量导入结果中最多返回的重复/无效明细条数
+IMPORT_REPORT_LIMIT = 1000
+# 出货清单每个代理商每批发货的数量，以及所有代理商合计最多缓存的行数
+MANIFEST_CHUNK_SIZE = 5000
+MANIFEST_BUFFER_LIMIT = 20000
+# 生成二维码时每批的数量，每批一次IN查询排除已存在的二维码
+ALLOCATE_BATCH_SIZE = 10000
+# 号段前缀长度，2位共 57^2=3249 个号段
+BLOCK_PREFIX_LENGTH = 2
+# Postgres导入时COPY使用的临时表
+IMPORT_TABLE = 'product_import'
+
+
+def _warranty_end_sql():
+    """保修结束日期 = 激活时间 + 产品类型保修天数，在数据库中计算"""
+    if connection.vendor == 'postgresql':
+        return "%s + {product_type}.warranty_period * INTERVAL '1 day'"
+    if connection.vendor == 'sqlite':
+        return "strftime('%%Y-%%m-%%d %%H:%%M:%%f', %s, '+' || {product_type}.warranty_period || ' days')"
+    raise NotSupportedError(f'不支持的数据库: {connection.vendor}')
+
+
+def _activation_sql(count):
+    qn = connection.ops.quote_name
+    product = qn(Product._meta.db_table)
+    product_type = qn(ProductType._meta.db_table)
+    warranty_end = _warranty_end_sql().format(product_type=product_type)
+    customer_columns = ', '.join(f'{qn(field)} = %s' for field in CUSTOMER_FIELDS)
+    placeholders = ', '.join(['%s'] * count)
+    return (
+        f"UPDATE {product} SET status = 3, activation_date = %s, warranty_start_date = %s, "
+        f"warranty_end_date = (SELECT {warranty_end} FROM {product_type} "
+        f"WHERE {product_type}.id = {product}.product_type_id), "
+        f"{customer_columns}, updated_at = %s "
+        f"WHERE qrcode_id IN ({placeholders}) AND status = 2 AND product_type_id IS NOT NULL "
+        f"RETURNING *"
+    )
+
+
+def activate_products(qrcode_ids, customer, operator):
+    """
+    激活产品：一条条件UPDATE把"已出货"改为"已激活"并返回更新后的行，同一事务内写入操作记录
+    并发的重复激活只会有一个成功
+    :param qrcode_ids: 二维码ID列表
+    :param customer: 客户信息，键为 CUSTOMER_FIELDS
+    :param operator: 操作人
+    :return: 激活成功的产品列表
+    """
+    qrcode_ids = list(dict.fromkeys(qrcode_ids))
+    if not qrcode_ids:
+        return []
+
+    now = timezone.now()
+    params = [now, now, now, *[customer.get(field) for field in CUSTOMER_FIELDS], now]
+    products = []
+    with transaction.atomic():
+        for chunk in chunked(qrcode_ids, _param_chunk_size(len(qrcode_ids), reserved=len(params))):
+            products += Product.objects.raw(_activation_sql(len(chunk)), [*params, *chunk])
+        OperationRecord.objects.bulk_create([
+            OperationRecord(
+                product=product,
+                operator=operator,
+                operation_type=3,  # 产品激活
+                description=f"产品被客户 {product.name} 激活"
+            ) for product in products
+        ])
+        invalidate_products([product.qrcode_id for product in products])
+    return products
+
+
+def bulk_activate_products(qrcode_ids, customer, operator):
+    """
+    批量激活：同一客户和安装人员信息激活多个产品(如一个站点的多台设备)
+    :return: {'activated': 激活成功的产品列表, 'skipped': [{'qrcode_id', 'reason'}]}
+    """
+    qrcode_ids = list(dict.fromkeys(qrcode_ids))
+    status_display = dict(Product.STATUS_CHOICES)
+    with transaction.atomic():
+        products = activate_products(qrcode_ids, customer, operator)
+        activated = {product.qrcode_id for product in products}
+        rest = [qrcode_id for qrcode_id in qrcode_ids if qrcode_id not in activated]
+        found = {}
+        for chunk in chunked(rest, _param_chunk_size(len(rest))):
+            found.update({
+                qrcode_id: (product_status, product_type_id)
+                for qrcode_id, product_status, product_type_id in Product.objects.filter(
+                    qrcode_id__in=chunk
+                ).values_list('qrcode_id', 'status', 'product_type_id')
+            })
+
+    skipped = []
+    for qrcode_id in rest:
+        if qrcode_id not in found:
+            reason = '产品不存在'
+        elif found[qrcode_id][0] != 2:  # 只能激活状态为"已出货"的产品
+            reason = f'当前状态为{status_display[found[qrcode_id][0]]}，只能激活已出货的产品'
+        else:
+            reason = '产品未设置产品类型，无法计算保修期'
+        skipped.append({'qrcode_id': qrcode_id, 'reason': reason})
+    return {'activated': products, 'skipped': skipped}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _supports_copy():
+    """Postgres且驱动为psycopg2(copy_expert)时使用COPY"""
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return not is_psycopg3
+
+
+def _import_chunk_copy(qrcode_ids, product_type, remark, operator):
+    """
+    Postgres: COPY到临时表，一条语句完成 INSERT ... ON CONFLICT DO NOTHING 和操作记录写入
+    :return: 新建的二维码ID列表
+    """
+    qn = connection.ops.quote_name
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([qrcode_id] for qrcode_id in qrcode_ids)
+    buffer.seek(0)
+    now = timezone.now()
+    # 临时表的列类型与产品表一致(如 varchar(16))
+    qrcode_type = Product._meta.get_field('qrcode_id').db_type(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {IMPORT_TABLE} (qrcode_id {qrcode_type}) ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert(f"COPY {IMPORT_TABLE} (qrcode_id) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(
+            f"WITH inserted AS ("
+            f"INSERT INTO {qn(Product._meta.db_table)} "
+            f"(qrcode_id, product_type_id, factory_remark, status, created_at, updated_at) "
+            f"SELECT qrcode_id, %s, %s, 1, %s, %s FROM {IMPORT_TABLE} "
+            f"ON CONFLICT (qrcode_id) DO NOTHING RETURNING id, qrcode_id"
+            f"), records AS ("
+            f"INSERT INTO {qn(OperationRecord._meta.db_table)} "
+            f"(product_id, operator, operation_type, description, created_at) "
+            f"SELECT id, %s, 1, %s || qrcode_id, %s FROM inserted"
+            f") SELECT qrcode_id FROM inserted",
+            [product_type.id, remark, now, now, operator, '批量创建产品 ', now]
+        )
+        created = [row[0] for row in cursor.fetchall()]
+    register_qrcodes(created)
+    return created
+
+
+def _import_chunk_generic(qrcode_ids, product_type, remark, operator):
+    """其他数据库：一次IN查询排除已存在的二维码，再批量插入"""
+    existing = set(Product.objects.filter(qrcode_id__in=qrcode_ids).values_list('qrcode_id', flat=True))
+    products = Product.objects.bulk_create([
+        Product(qrcode_id=qrcode_id, product_type=product_type, factory_remark=remark)
+        for qrcode_id in qrcode_ids if qrcode_id not in existing
+    ])
+    OperationRecord.objects.bulk_create([
+        OperationRecord(
+            product=product,
+            operator=operator,
+            operation_type=1,  # 创建产品
+            description=f"批量创建产品 {product.qrcode_id}"
+        ) for product in products
+    ])
+    return [product.qrcode_id for product in products]
+
+
+def import_products(qrcode_ids, product_type, remark, operator, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    批量导入产品：按批插入，每批一个事务，已存在的二维码跳过并返回，不影响其他二维码
+    Postgres使用COPY，其他数据库使用 IN 预查询 + bulk_create
+    :param qrcode_ids: 二维码ID可迭代对象，可以是流式读取的生成器
+    :param progress: 每批完成后以已处理数量调用，用于后台任务进度
+    :return: {'created': 新建数量, 'duplicates': 已存在或重复提交的二维码ID列表}
+    """
+    import_chunk = _import_chunk_copy if _supports_copy() else _import_chunk_generic
+    created_count = 0
+    processed = 0
+    duplicates = []
+    for chunk in chunked(qrcode_ids, chunk_size):
+        unique = list(dict.fromkeys(chunk))
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    created = import_chunk(unique, product_type, remark, operator)
+                break
+            except IntegrityError:
+                # 并发导入了相同的二维码，重新预查询后再试一次
+                if attempt:
+                    raise
+        created_set = set(created)
+        # 同一批内重复的二维码只创建一次，其余计为重复
+        seen = set()
+        for qrcode_id in chunk:
+            if qrcode_id in created_set and qrcode_id not in seen:
+                seen.add(qrcode_id)
+            else:
+                duplicates.append(qrcode_id)
+        created_count += len(created)
+        processed += len(chunk)
+        if progress:
+            progress(processed)
+    return {'created': created_count, 'duplicates': duplicates}
+
+
+def import_report(result, invalid=()):
+    """批量导入结果，重复和无效的明细最多返回 IMPORT_REPORT_LIMIT 条"""
+    return {
+        'created': result['created'],
+        'duplicate_count': len(result['duplicates']),
+        'duplicates': result['duplicates'][:IMPORT_REPORT_LIMIT],
+        'invalid_count': len(invalid),
+        'invalid': list(invalid[:IMPORT_REPORT_LIMIT]),
+    }
+
+
+def _param_chunk_size(size, reserved=10):
+    """单条语句的IN参数个数不超过数据库限制(SQLite为999)"""
+    max_params = connection.features.max_query_params
+    return min(size, max_params - reserved) if max_params else size
+
+
+def ship_products(qrcode_ids, agent, shipping_date, operator, progress=None):
+    """
+    批量发货：锁定并一次性取出目标产品的id和状态，按id更新为"已出货"，
+    操作记录用 INSERT ... SELECT 在数据库中生成
+    :param progress: 每批更新后以已处理数量调用，用于后台任务进度
+    :return: {'shipped': 发货成功的二维码ID列表, 'skipped': [{'qrcode_id', 'reason'}]}
+    """
+    qrcode_ids = list(dict.fromkeys(qrcode_ids))
+    chunk_size = _param_chunk_size(SHIP_CHUNK_SIZE)
+    status_display = dict(Product.STATUS_CHOICES)
+    qn = connection.ops.quote_name
+    now = timezone.now()
+    shipped, skipped = [], []
+
+    with transaction.atomic():
+        ids = []
+        for chunk in chunked(qrcode_ids, chunk_size):
+            found = {
+                qrcode_id: (product_id, product_status)
+                for product_id, qrcode_id, product_status in Product.objects.select_for_update().filter(
+                    qrcode_id__in=chunk
+                ).values_list('id', 'qrcode_id', 'status')
+            }
+            for qrcode_id in chunk:
+                if qrcode_id not in found:
+                    skipped.append({'qrcode_id': qrcode_id, 'reason': '产品不存在'})
+                elif found[qrcode_id][1] != 1:  # 只能发货状态为"已生成"的产品
+                    skipped.append({
+                        'qrcode_id': qrcode_id,
+                        'reason': f'当前状态为{status_display[found[qrcode_id][1]]}，只能发货已生成的产品'
+                    })
+                else:
+                    ids.append(found[qrcode_id][0])
+                    shipped.append(qrcode_id)
+
+        description = f"产品出货给代理商 {agent.username}"
+        processed = len(skipped)
+        for chunk in chunked(ids, chunk_size):
+            Product.objects.filter(id__in=chunk).update(
+                agent=agent,
+                shipping_date=shipping_date,
+                status=2,  # 更新状态为"已出货"
+                updated_at=now
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {qn(OperationRecord._meta.db_table)} "
+                    f"(product_id, operator, operation_type, description, created_at) "
+                    f"SELECT id, %s, 2, %s, %s FROM {qn(Product._meta.db_table)} "
+                    f"WHERE id IN ({', '.join(['%s'] * len(chunk))})",
+                    [operator, description, now, *chunk]
+                )
+            processed += len(chunk)
+            if progress:
+                progress(processed)
+        # update()不会调用save，需要手动清除扫码缓存
+        invalidate_products(shipped)
+    return {'shipped': shipped, 'skipped': skipped}
+
+
+def reserve_code_block(node, code_length=CODE_LENGTH, prefix_length=BLOCK_PREFIX_LENGTH):
+    """
+    为生产节点预留一个号段(随机的唯一前缀)，节点已有同样长度的号段时直接复用
+    前缀的唯一约束保证并发预留时不会分到同一个号段
+    """
+    block = CodeBlock.objects.filter(node=node, code_length=code_length).order_by('id').first()
+    if block:
+        return block
+    for _ in range(20):
+        prefix = ''.join(secrets.choice(CHARSET) for _ in range(prefix_length))
+        try:
+            with transaction.atomic():
+                return CodeBlock.objects.create(prefix=prefix, node=node, code_length=code_length)
+        except IntegrityError:
+            continue
+    raise RuntimeError('没有可用的号段，请增加前缀长度')
+
+
+def allocate_codes(count, block=None, length=CODE_LENGTH, exclude=()):
+    """
+    生成count个不重复且数据库中不存在的二维码ID
+    每批先在内存中去重，再用一次IN查询排除已存在的二维码；指定号段时所有二维码使用号段前缀，
+    不同号段之间不会重复，多个节点可以同时生成
+    :param exclude: 需要额外排除的二维码(如本节点已生成但还未入库的)
+    """
+    prefix, length = (block.prefix, block.code_length) if block else ('', length)
+    batch_size = _param_chunk_size(ALLOCATE_BATCH_SIZE)
+    seen = set(exclude)
+    codes = []
+    while len(codes) < count:
+        batch = [code for code in dict.fromkeys(random_codes(min(batch_size, count - len(codes)), length, prefix))
+                 if code not in seen]
+        existing = set(Product.objects.filter(qrcode_id__in=batch).values_list('qrcode_id', flat=True))
+        fresh = [code for code in batch if code not in existing]
+        seen.update(fresh)
+        codes.extend(fresh)
+    if block:
+        CodeBlock.objects.filter(id=block.id).update(issued=F('issued') + len(codes), updated_at=timezone.now())
+    return codes
+
+
+def _parse_shipping_date(value):
+    """出货日期，支持日期或日期时间，为空返回None"""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed_date = parse_date(value)
+        if parsed_date is None:
+            raise ValueError(value)
+        parsed = datetime.combine(parsed_date, time.min)
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+# 出货清单逐行结果的列
+MANIFEST_RESULT_COLUMNS = ['line', 'qrcode_id', 'agent', 'result', 'message']
+
+
+def ship_manifest(rows, operator, chunk_size=MANIFEST_CHUNK_SIZE):
+    """
+    按出货清单批量发货：按(代理商, 出货日期)分组，每组攒够 chunk_size 行调用一次 ship_products，
+    缓存的总行数超过 MANIFEST_BUFFER_LIMIT 时先处理最大的分组，内存占用与清单行数无关
+    :param rows: (行号, {'qrcode_id', 'agent', 'shipping_date'}) 可迭代对象
+    :return: 生成器，逐行返回 {'line', 'qrcode_id', 'agent', 'result', 'message'}，顺序按分组处理的顺序
+    """
+    max_length = Product._meta.get_field('qrcode_id').max_length
+    agents = {}
+    groups = {}
+    buffered = 0
+
+    def resolve_agent(value):
+        if value not in agents:
+            lookup = {'id': int(value)} if value.isdigit() else {'username': value}
+            agents[value] = User.objects.filter(user_type=User.AGENT, **lookup).first()
+        return agents[value]
+
+    def result(line, row, outcome, message=''):
+        return {'line': line, 'qrcode_id': row.get('qrcode_id', ''), 'agent': row.get('agent', ''),
+                'result': outcome, 'message': message}
+
+    def flush(key):
+        nonlocal buffered
+        agent, shipping_date, entries = groups.pop(key)
+        buffered -= len(entries)
+        outcome = ship_products([row['qrcode_id'] for _, row in entries], agent,
+                                shipping_date or timezone.now(), operator)
+        shipped = set(outcome['shipped'])
+        reasons = {item['qrcode_id']: item['reason'] for item in outcome['skipped']}
+        reported = set()
+        for line, row in entries:
+            qrcode_id = row['qrcode_id']
+            if qrcode_id in reported:
+                yield result(line, row, 'skipped', '清单中重复的二维码')
+            elif qrcode_id in shipped:
+                yield result(line, row, 'shipped')
+            else:
+                yield result(line, row, 'skipped', reasons.get(qrcode_id, ''))
+            reported.add(qrcode_id)
+
+    for line, row in rows:
+        qrcode_id, agent_value = row.get('qrcode_id', ''), row.get('agent', '')
+        if not qrcode_id or len(qrcode_id) > max_length:
+            yield result(line, row, 'error', f'二维码ID不能为空且不超过{max_length}个字符')
+            continue
+        agent = resolve_agent(agent_value) if agent_value else None
+        if agent is None:
+            yield result(line, row, 'error', '代理商不存在')
+            continue
+        try:
+            shipping_date = _parse_shipping_date(row.get('shipping_date'))
+        except ValueError:
+            yield result(line, row, 'error', '出货日期格式错误')
+            continue
+
+        key = (agent.id, shipping_date)
+        groups.setdefault(key, (agent, shipping_date, []))[2].append((line, row))
+        buffered += 1
+        if len(groups[key][2]) >= chunk_size:
+            yield from flush(key)
+        elif buffered >= MANIFEST_BUFFER_LIMIT:
+            yield from flush(max(groups, key=lambda group: len(groups[group][2])))
+
+    while groups:
+        yield from flush(next(iter(groups)))
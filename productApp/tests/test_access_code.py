@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from productApp.models import AccessCode
+from productApp.utils.access_code import access_code_validator
+
+
+class AccessCodeValidatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.code = AccessCode.objects.create(code='OPEN2025', is_active=True)
+
+    def check_code(self, code):
+        return self.client.post(reverse('productApp:check_code_api'), {'access_code': code}, format='json').data
+
+    def test_valid_code_without_query(self):
+        """访问码加载后校验不再查询数据库"""
+        self.assertEqual(self.check_code('OPEN2025')['status'], 'success')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(access_code_validator.is_valid('OPEN2025'))
+            self.assertFalse(access_code_validator.is_valid('UNKNOWN'))
+        self.assertEqual(len(queries), 0)
+
+    def test_expired_code_rejected(self):
+        """超过有效期的访问码无效"""
+        with self.captureOnCommitCallbacks(execute=True):
+            expired = AccessCode.objects.create(code='OLD2024', is_active=True, validity_period=30)
+            AccessCode.objects.filter(pk=expired.pk).update(created_at=timezone.now() - timedelta(days=31))
+            expired.save(update_fields=['validity_period'])
+        self.assertEqual(self.check_code('OLD2024')['status'], 'error')
+
+    def test_admin_edit_refreshes_codes(self):
+        """修改访问码后立即生效"""
+        self.assertTrue(access_code_validator.is_valid('OPEN2025'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.code.is_active = False
+            self.code.save()
+        self.assertEqual(self.check_code('OPEN2025')['status'], 'error')
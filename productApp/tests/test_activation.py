@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from productApp.models import Product, ProductType, OperationRecord
+
+
+class ProductActivationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product_type = ProductType.objects.create(name='储能电池', model_number='B100', warranty_period=730)
+        Product.objects.create(qrcode_id='ACT001', product_type=self.product_type, status=2)
+        self.url = reverse('productApp:activate_product')
+        self.data = {'qrcode_id': 'ACT001', 'name': '张三', 'phone': '13800000000', 'installer': '李四'}
+
+    def test_activate_in_one_update(self):
+        """激活只执行一条UPDATE和一条操作记录INSERT"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self.data, format='json')
+        self.assertEqual(response.status_code, 200)
+        statements = [q['sql'] for q in queries if not q['sql'].upper().startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(statements), 2)
+
+        product = Product.objects.get(qrcode_id='ACT001')
+        self.assertEqual(product.status, 3)
+        self.assertEqual(product.name, '张三')
+        self.assertEqual(product.installer, '李四')
+        self.assertAlmostEqual(product.warranty_end_date - product.warranty_start_date, timedelta(days=730),
+                               delta=timedelta(seconds=1))
+        self.assertTrue(response.data['data']['under_warranty'])
+        self.assertEqual(OperationRecord.objects.filter(product=product, operation_type=3).count(), 1)
+
+    def test_second_activation_rejected(self):
+        self.client.post(self.url, self.data, format='json')
+        response = self.client.post(self.url, self.data, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(OperationRecord.objects.filter(operation_type=3).count(), 1)
+
+    def test_idempotency_key_replays_first_result(self):
+        """相同幂等键的重复提交返回第一次的结果"""
+        first = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='tap-1')
+        second = self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='tap-1')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(OperationRecord.objects.filter(operation_type=3).count(), 1)
+
+    def test_browser_retry_with_same_key(self):
+        """页面重试时带同一个幂等键：跨域预检允许该请求头，两次提交都返回200且只激活一次"""
+        preflight = self.client.options(self.url, HTTP_ORIGIN='https://qr.yayaxueqin.cn',
+                                        HTTP_ACCESS_CONTROL_REQUEST_METHOD='POST',
+                                        HTTP_ACCESS_CONTROL_REQUEST_HEADERS='content-type,idempotency-key')
+        self.assertIn('idempotency-key', preflight['Access-Control-Allow-Headers'])
+
+        key = '3f0c6f0e-8c1d-4c55-9a57-3c1f2d7f9b10'
+        responses = [self.client.post(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+                     for _ in range(2)]
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        self.assertEqual(responses[0].data, responses[1].data)
+        self.assertEqual(OperationRecord.objects.filter(operation_type=3).count(), 1)
@@ -0,0 +1,37 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from productApp.models import User, Product, ProductType, OperationRecord
+
+
+class AdminBulkCreateTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='pwd')
+        self.client.force_login(self.admin)
+        self.product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        Product.objects.create(qrcode_id='ADM000', product_type=self.product_type)
+        self.url = reverse('admin:product_bulk_create')
+
+    def test_textarea_and_file(self):
+        codes = '\n'.join(f'ADM{index:03d}' for index in range(300))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                'product_type': self.product_type.id,
+                'factory_remark': '批次A',
+                'qrcode_ids': codes,
+                'qrcode_file': SimpleUploadedFile('codes.csv', b'qrcode_id\nADM500\nADM000\n'),
+            })
+        self.assertRedirects(response, reverse('admin:productApp_product_changelist'))
+        self.assertEqual(Product.objects.count(), 301)
+        self.assertEqual(OperationRecord.objects.filter(operation_type=1).count(), 300)
+        self.assertEqual(Product.objects.get(qrcode_id='ADM500').factory_remark, '批次A')
+        # 与行数无关的固定查询数
+        self.assertLess(len(queries), 20)
+
+    def test_invalid_product_type(self):
+        response = self.client.post(self.url, {'product_type': 'abc', 'qrcode_ids': 'ADM001'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Product.objects.filter(qrcode_id='ADM001').exists())
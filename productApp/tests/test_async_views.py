@@ -0,0 +1,46 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, AsyncRequestFactory
+
+from productApp import async_views
+from productApp.models import AccessCode, Product, ProductType, OperationRecord
+
+
+class AsyncPublicViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        with self.captureOnCommitCallbacks(execute=True):
+            AccessCode.objects.create(code='ASYNC2025', is_active=True)
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100', warranty_period=365)
+        Product.objects.create(qrcode_id='ASYNC001', product_type=product_type, status=2)
+
+    def post(self, data):
+        return self.factory.post('/', json.dumps(data), content_type='application/json')
+
+    async def test_check_code(self):
+        response = await async_views.check_code_api(self.post({'access_code': 'ASYNC2025'}))
+        self.assertEqual(json.loads(response.content)['status'], 'success')
+        response = await async_views.check_code_api(self.post({'access_code': 'WRONG'}))
+        self.assertEqual(json.loads(response.content)['status'], 'error')
+
+    async def test_warranty_registration_api(self):
+        response = await async_views.warranty_registration_api(
+            self.post({'access_code': 'ASYNC2025', 'qrcode_id': 'https://qr.example.com/wr?id=ASYNC001'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['data']['product']['product_type'], '储能电池')
+
+        response = await async_views.warranty_registration_api(
+            self.post({'access_code': 'ASYNC2025', 'qrcode_id': 'MISSING'}))
+        self.assertEqual(response.status_code, 400)
+
+    async def test_activate_product(self):
+        data = {'qrcode_id': 'ASYNC001', 'name': '张三', 'installer': '李四'}
+        response = await async_views.activate_product(self.post(data))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(response.content)['data']['under_warranty'])
+        self.assertEqual(await OperationRecord.objects.filter(operation_type=3).acount(), 1)
+
+        response = await async_views.activate_product(self.post(data))
+        self.assertEqual(response.status_code, 404)
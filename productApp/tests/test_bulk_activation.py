@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from productApp.models import User, Product, ProductType, OperationRecord
+
+
+class BulkActivationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='installer', password='pwd'))
+        battery = ProductType.objects.create(name='储能电池', model_number='B100', warranty_period=365)
+        inverter = ProductType.objects.create(name='逆变器', model_number='I200', warranty_period=730)
+        Product.objects.bulk_create([
+            Product(qrcode_id=f'ACT{index:04d}', product_type=battery if index % 2 else inverter, status=2)
+            for index in range(1100)
+        ])
+        Product.objects.filter(qrcode_id='ACT0001').update(status=1)
+        Product.objects.filter(qrcode_id='ACT0002').update(product_type=None)
+        self.url = reverse('productApp:product-bulk-activate')
+        self.customer = {'name': '张三', 'phone': '13800000000', 'installer': '李四'}
+
+    def test_outcomes_per_code(self):
+        response = self.client.post(self.url, {
+            **self.customer, 'qrcode_ids': ['ACT0003', 'ACT0004', 'ACT0001', 'ACT0002', 'NOPE', 'ACT0003']
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(item['qrcode_id'] for item in response.data['data']['activated']),
+                         ['ACT0003', 'ACT0004'])
+        self.assertEqual({item['qrcode_id']: item['reason'] for item in response.data['data']['skipped']}, {
+            'ACT0001': '当前状态为已生成，只能激活已出货的产品',
+            'ACT0002': '产品未设置产品类型，无法计算保修期',
+            'NOPE': '产品不存在',
+        })
+
+        battery, inverter = Product.objects.get(qrcode_id='ACT0003'), Product.objects.get(qrcode_id='ACT0004')
+        self.assertEqual((battery.status, battery.name, battery.installer), (3, '张三', '李四'))
+        # SQLite中计算的日期精确到毫秒
+        self.assertAlmostEqual(battery.warranty_end_date - battery.warranty_start_date, timedelta(days=365),
+                               delta=timedelta(seconds=1))
+        self.assertAlmostEqual(inverter.warranty_end_date - inverter.warranty_start_date, timedelta(days=730),
+                               delta=timedelta(seconds=1))
+        self.assertEqual(OperationRecord.objects.filter(operation_type=3).count(), 2)
+
+    def test_large_site_is_set_based(self):
+        """超过SQLite参数上限时分批，查询数与产品数无关"""
+        qrcode_ids = [f'ACT{index:04d}' for index in range(3, 1100)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {**self.customer, 'qrcode_ids': qrcode_ids}, format='json')
+        self.assertEqual(len(response.data['data']['activated']), 1097)
+        self.assertEqual(Product.objects.filter(status=3).count(), 1097)
+        self.assertLessEqual(len(queries), 12)
+
+    def test_nothing_to_activate(self):
+        response = self.client.post(self.url, {**self.customer, 'qrcode_ids': ['ACT0001']}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['data']['skipped'][0]['qrcode_id'], 'ACT0001')
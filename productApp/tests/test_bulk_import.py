@@ -0,0 +1,88 @@
+import json
+from unittest import skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from productApp.models import User, Product, ProductType, OperationRecord
+from productApp.services import IMPORT_TABLE, import_products
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='factory', password='pwd')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        Product.objects.create(qrcode_id='IMP000', product_type=self.product_type)
+        self.url = reverse('productApp:product-bulk-import')
+
+    def test_csv_stream_skips_duplicates(self):
+        """CSV导入：已存在和文件内重复的二维码跳过，无效行单独报告"""
+        body = 'qrcode_id,batch\nIMP000,1\nIMP001,1\nIMP002,1\nIMP001,1\n,1\nTOO-LONG-QRCODE-ID-1,1\n'
+        response = self.client.generic(
+            'POST', f'{self.url}?product_type_id={self.product_type.id}&remark=R1', body,
+            content_type='text/csv'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.data['data']
+        self.assertEqual(data['created'], 2)
+        self.assertEqual(data['duplicates'], ['IMP000', 'IMP001'])
+        self.assertEqual([item['line'] for item in data['invalid']], [6, 7])
+        self.assertEqual(Product.objects.get(qrcode_id='IMP002').factory_remark, 'R1')
+        self.assertEqual(OperationRecord.objects.filter(operation_type=1).count(), 2)
+
+    def test_ndjson_upload(self):
+        content = b'{"qrcode_id": "IMP010"}\n"IMP011"\nnot json\n'
+        response = self.client.post(self.url, {
+            'product_type_id': self.product_type.id,
+            'file': SimpleUploadedFile('codes.ndjson', content, content_type='application/octet-stream'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['created'], 2)
+        self.assertEqual(response.data['data']['invalid_count'], 1)
+
+    def test_unsupported_format(self):
+        response = self.client.generic('POST', f'{self.url}?product_type_id={self.product_type.id}',
+                                       'IMP020', content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 400)
+
+    def test_chunks(self):
+        codes = [f'IMP1{index:02d}' for index in range(7)] + ['IMP000']
+        result = import_products(iter(codes), self.product_type, '', operator='test', chunk_size=3)
+        self.assertEqual(result, {'created': 7, 'duplicates': ['IMP000']})
+
+    @skipUnless(connection.vendor == 'postgresql', '需要Postgres(COPY导入)')
+    def test_copy_chunks(self):
+        """Postgres COPY导入：临时表按模型长度创建，最长的二维码ID也能导入"""
+        max_length = Product._meta.get_field('qrcode_id').max_length
+        longest = 'L' * max_length
+        codes = [f'IMP2{index:02d}' for index in range(5)] + [longest, 'IMP000', 'IMP200']
+        result = import_products(iter(codes), self.product_type, 'R2', operator='test', chunk_size=3)
+        self.assertEqual(result, {'created': 6, 'duplicates': ['IMP000', 'IMP200']})
+        self.assertEqual(Product.objects.get(qrcode_id=longest).factory_remark, 'R2')
+        self.assertEqual(OperationRecord.objects.filter(operation_type=1, operator='test').count(), 6)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT character_maximum_length FROM information_schema.columns WHERE table_name = %s',
+                           [IMPORT_TABLE])
+            self.assertEqual(cursor.fetchone()[0], max_length)
+
+    def test_bulk_create_tolerates_existing(self):
+        """JSON批量创建遇到已存在的二维码不再整批失败"""
+        response = self.client.post(reverse('productApp:product-bulk-create'), json.dumps({
+            'product_type_id': self.product_type.id, 'qrcode_ids': ['IMP000', 'IMP030']
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['duplicates'], ['IMP000'])
+        self.assertTrue(Product.objects.filter(qrcode_id='IMP030').exists())
+
+    def test_bulk_create_rejects_overlong_qrcode(self):
+        """超过数据库列长度的二维码ID在校验时返回400"""
+        response = self.client.post(reverse('productApp:product-bulk-create'), json.dumps({
+            'product_type_id': self.product_type.id, 'qrcode_ids': ['IMP031', 'X' * 17]
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Product.objects.filter(qrcode_id='IMP031').exists())
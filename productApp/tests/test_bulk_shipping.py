@@ -0,0 +1,50 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from productApp.models import User, Product, ProductType, OperationRecord
+
+
+class BulkShippingTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='agent', password='pwd', user_type=User.AGENT)
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='warehouse', password='pwd'))
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        Product.objects.bulk_create([
+            Product(qrcode_id=f'SHIP{index:04d}', product_type=product_type) for index in range(1200)
+        ])
+        Product.objects.filter(qrcode_id='SHIP0001').update(status=3)
+        self.url = reverse('productApp:product-bulk-shipping')
+
+    def test_shipped_and_skipped(self):
+        response = self.client.post(self.url, {
+            'qrcode_ids': ['SHIP0000', 'SHIP0001', 'NOPE', 'SHIP0002', 'SHIP0000'], 'agent_id': self.agent.id
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['shipped'], ['SHIP0000', 'SHIP0002'])
+        self.assertEqual([item['qrcode_id'] for item in response.data['data']['skipped']], ['SHIP0001', 'NOPE'])
+
+        records = OperationRecord.objects.filter(operation_type=2)
+        self.assertEqual(sorted(records.values_list('product__qrcode_id', flat=True)), ['SHIP0000', 'SHIP0002'])
+        self.assertEqual(records.first().description, '产品出货给代理商 agent')
+        self.assertEqual(records.first().operator, 'user-warehouse')
+        self.assertEqual(Product.objects.get(qrcode_id='SHIP0002').agent, self.agent)
+
+    def test_large_batch_is_set_based(self):
+        """超过SQLite参数上限时分批，每批固定几条语句"""
+        qrcode_ids = [f'SHIP{index:04d}' for index in range(2, 1200)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'qrcode_ids': qrcode_ids, 'agent_id': self.agent.id},
+                                        format='json')
+        self.assertEqual(len(response.data['data']['shipped']), 1198)
+        self.assertEqual(Product.objects.filter(status=2).count(), 1198)
+        self.assertEqual(OperationRecord.objects.filter(operation_type=2).count(), 1198)
+        self.assertLessEqual(len(queries), 12)
+
+    def test_nothing_to_ship(self):
+        response = self.client.post(self.url, {'qrcode_ids': ['SHIP0001'], 'agent_id': self.agent.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['data']['skipped'][0]['qrcode_id'], 'SHIP0001')
@@ -0,0 +1,56 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from productApp.models import Product, ProductType, CodeBlock
+from productApp.services import allocate_codes, reserve_code_block
+from productApp.utils.codes import CHARSET, random_codes
+
+
+class CodeAllocatorTests(TestCase):
+    def setUp(self):
+        self.product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+
+    def test_random_codes(self):
+        codes = random_codes(2000, length=8, prefix='AB')
+        self.assertEqual(len(codes), 2000)
+        self.assertTrue(all(len(code) == 8 and code.startswith('AB') for code in codes))
+        self.assertTrue(set(''.join(codes)) <= set(CHARSET))
+
+    def test_existing_and_repeated_codes_skipped(self):
+        """每批一次IN查询，已存在和批内重复的二维码被跳过"""
+        Product.objects.create(qrcode_id='EXIST001', product_type=self.product_type)
+        batches = iter([['EXIST001', 'NEW00001', 'NEW00001'], ['NEW00002']])
+        with mock.patch('productApp.services.random_codes', side_effect=lambda *args: next(batches)):
+            with CaptureQueriesContext(connection) as queries:
+                codes = allocate_codes(2)
+        self.assertEqual(codes, ['NEW00001', 'NEW00002'])
+        self.assertEqual(len(queries), 2)
+
+    def test_blocks_are_unique_per_node(self):
+        first = reserve_code_block('line-1')
+        second = reserve_code_block('line-2')
+        self.assertNotEqual(first.prefix, second.prefix)
+        self.assertEqual(reserve_code_block('line-1'), first)
+
+        codes = allocate_codes(500, block=first)
+        self.assertEqual(len(set(codes)), 500)
+        self.assertTrue(all(code.startswith(first.prefix) for code in codes))
+        first.refresh_from_db()
+        self.assertEqual(first.issued, 500)
+
+    def test_command_creates_products(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'codes.csv')
+            call_command('allocate_codes', '--count', '300', '--node', 'line-9', '--create',
+                         '--product-type', str(self.product_type.id), '-o', path, stderr=io.StringIO())
+            with open(path) as file:
+                codes = file.read().split()[1:]
+        prefix = CodeBlock.objects.get(node='line-9').prefix
+        self.assertEqual(Product.objects.filter(qrcode_id__in=codes, qrcode_id__startswith=prefix).count(), 300)
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from productApp.models import User, Product, ProductType, OperationRecord, RepairRecord
+from productApp.renderers import ORJSONRenderer
+from productApp.serializers import ProductSerializer, OperationRecordSerializer, RepairRecordSerializer
+
+
+class FastSerializationTests(TestCase):
+    """快速序列化 + orjson 的输出与 ModelSerializer + JSONRenderer 逐字节一致"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='staff', password='pwd'))
+        agent = User.objects.create_user(username='代理商A', password='pwd', user_type=User.AGENT)
+        technician = User.objects.create_user(username='tech', password='pwd', user_type=User.EMPLOYEE)
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        now = timezone.now()
+        products = [
+            Product.objects.create(qrcode_id='FAST001', product_type=product_type),
+            Product.objects.create(qrcode_id='FAST002', product_type=None, factory_remark='行\u2028分隔'),
+            Product.objects.create(
+                qrcode_id='FAST003', product_type=product_type, agent=agent, status=3, name='张三',
+                email='a@example.com', shipping_date=now - timedelta(days=3), activation_date=now,
+                warranty_start_date=now, warranty_end_date=now + timedelta(days=365)
+            ),
+        ]
+        for product in products:
+            OperationRecord.objects.create(product=product, operator='user-staff', operation_type=1,
+                                           description=f'创建产品 {product.qrcode_id}')
+        record = RepairRecord.objects.create(product=products[2], technician=technician, repair_reason='无法开机')
+        record.attachments.create(name='照片', file_url='https://example.com/a.jpg', file_type=1)
+        RepairRecord.objects.create(product=products[0], repair_reason='外壳破损', repair_date=now)
+
+    def assert_identical(self, url_name, serializer_class, queryset, params=None):
+        response = self.client.get(reverse(url_name), params or {})
+        self.assertEqual(response.status_code, 200)
+        expected = serializer_class(queryset, many=True, context={'request': APIRequestFactory().get('/')}).data
+        self.assertEqual(response.content, JSONRenderer().render(dict(response.data, results=expected)))
+
+    def test_products(self):
+        self.assert_identical('productApp:product-list', ProductSerializer,
+                              Product.objects.order_by('-created_at', '-id'), {'pagination': 'cursor'})
+
+    def test_operation_records(self):
+        self.assert_identical('productApp:operationrecord-list', OperationRecordSerializer,
+                              OperationRecord.objects.order_by('-created_at', '-id'))
+
+    def test_repair_records(self):
+        self.assert_identical('productApp:repairrecord-list', RepairRecordSerializer, RepairRecord.objects.all())
+
+    def test_renderer_matches_json_renderer(self):
+        data = {'中文': '\u2028\u2029', 'none': None, 'flag': True, 'when': timezone.now(), 'nested': [{'a': 1}]}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render({1: 'int key'}), JSONRenderer().render({1: 'int key'}))
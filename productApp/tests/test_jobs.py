@@ -0,0 +1,77 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from productApp.jobs import claim_next_job, enqueue, run_job, set_progress
+from productApp.models import User, Product, ProductType, Job
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='warehouse', password='pwd')
+        self.agent = User.objects.create_user(username='agent', password='pwd', user_type=User.AGENT)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+
+    def run_jobs(self):
+        call_command('run_jobs', '--once', stdout=StringIO())
+
+    def test_background_import_and_shipping(self):
+        """批量操作提交后台任务后立即返回，由run_jobs执行，可以查询进度和结果"""
+        response = self.client.post(f"{reverse('productApp:product-bulk-create')}?background=true", {
+            'product_type_id': self.product_type.id, 'qrcode_ids': ['JOB001', 'JOB002']
+        }, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Product.objects.exists())
+
+        response = self.client.post(f"{reverse('productApp:product-bulk-shipping')}?background=1", {
+            'qrcode_ids': ['JOB001', 'JOB002'], 'agent_id': self.agent.id
+        }, format='json')
+        ship_url = response.data['data']['url']
+        self.assertEqual(self.client.get(ship_url).data['status'], Job.PENDING)
+
+        self.run_jobs()
+        self.assertEqual(Product.objects.filter(status=2, agent=self.agent).count(), 2)
+        data = self.client.get(ship_url).data
+        self.assertEqual(data['status'], Job.SUCCEEDED)
+        self.assertEqual(data['progress'], 100)
+        self.assertEqual(data['result']['shipped'], ['JOB001', 'JOB002'])
+
+        # 其他用户看不到
+        other = APIClient()
+        other.force_authenticate(user=User.objects.create_user(username='other', password='pwd'))
+        self.assertEqual(other.get(ship_url).status_code, 404)
+
+    def test_failed_job_records_error(self):
+        job = enqueue('import_products', {'product_type_id': 0, 'qrcode_ids': ['JOB003'], 'operator': 'test'})
+        self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('DoesNotExist', job.error)
+
+    def test_stale_running_job_reclaimed(self):
+        """执行进程退出后，超时的任务可以被重新领取"""
+        job = enqueue('import_products', {'product_type_id': self.product_type.id, 'qrcode_ids': ['JOB004'],
+                                          'operator': 'test'}, total=1)
+        self.assertEqual(claim_next_job(), job)
+        self.assertIsNone(claim_next_job())
+
+        # 开始时间早但仍在更新进度的任务不会被重新领取
+        Job.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+        set_progress(job.id, 0)
+        self.assertIsNone(claim_next_job())
+
+        Job.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        reclaimed = claim_next_job()
+        self.assertEqual(reclaimed.attempts, 2)
+
+        # 原来的执行进程结束时任务已被重新领取，不覆盖新的执行
+        run_job(job)
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.RUNNING)
+        self.assertEqual(run_job(reclaimed).status, Job.SUCCEEDED)
@@ -0,0 +1,64 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from productApp.models import User, Product, ProductType
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='staff', password='pwd'))
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        Product.objects.bulk_create([
+            Product(qrcode_id=f'PAGE{index:03d}', product_type=product_type) for index in range(25)
+        ])
+        # 同一时间创建的行按id区分先后
+        Product.objects.filter(qrcode_id__lt='PAGE010').update(created_at=timezone.now())
+        self.url = reverse('productApp:product-list')
+        self.expected = list(Product.objects.order_by('-created_at', '-id').values_list('qrcode_id', flat=True))
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_walk_forward_and_back(self):
+        response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 7})
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        seen, pages = [], []
+        while True:
+            pages.append(response)
+            seen += [item['qrcode_id'] for item in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 4)
+
+        previous = self.client.get(pages[-1].data['previous'])
+        self.assertEqual(previous.data['results'], pages[-2].data['results'])
+
+    def test_no_count_query(self):
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data['next'])
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+
+    def test_page_size_cap_and_invalid_cursor(self):
+        response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 100000})
+        self.assertEqual(len(response.data['results']), 25)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code, 404)
+
+    def test_cursor_rejects_ordering(self):
+        """游标分页不能静默忽略 ?ordering=，页码分页照常排序"""
+        response = self.client.get(self.url, {'pagination': 'cursor', 'ordering': 'warranty_end_date'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.data)
+        response = self.client.get(self.url, {'ordering': 'created_at'})
+        self.assertEqual(response.data['results'][0]['qrcode_id'], self.expected[-1])
@@ -0,0 +1,75 @@
+from django.contrib.admin import site
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from productApp.admin import ProductAdmin, ProductTypeAdmin
+from productApp.models import User, Product, ProductType
+from productApp.views import get_product_info
+
+
+class ProductScanCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        self.product = Product.objects.create(qrcode_id='CACHE001', product_type=self.product_type, status=2)
+
+    def test_scan_served_from_cache(self):
+        """第二次扫码不查询数据库"""
+        first = get_product_info('CACHE001')
+        self.assertEqual(first['data']['product']['product_type'], '储能电池')
+
+        with CaptureQueriesContext(connection) as queries:
+            second = get_product_info('CACHE001')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(first, second)
+
+    def test_save_invalidates_cache(self):
+        """保存产品后缓存失效"""
+        get_product_info('CACHE001')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.status = 5
+            self.product.save()
+        self.assertEqual(get_product_info('CACHE001')['status'], 'error')
+
+    def test_bulk_shipping_invalidates_cache(self):
+        """批量发货后缓存失效"""
+        Product.objects.create(qrcode_id='CACHE002', product_type=self.product_type)
+        self.assertEqual(get_product_info('CACHE002')['status'], 'error')
+
+        agent = User.objects.create_user(username='agent', password='pwd', user_type=User.AGENT)
+        client = APIClient()
+        client.force_authenticate(user=agent)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse('productApp:product-bulk-shipping'),
+                                   {'qrcode_ids': ['CACHE002'], 'agent_id': agent.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(get_product_info('CACHE002')['data']['is_activated'])
+
+    def test_product_type_change_invalidates_cache(self):
+        """修改或删除产品类型后该类型下产品的缓存失效"""
+        get_product_info('CACHE001')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product_type.name = '储能电池二代'
+            self.product_type.save()
+        self.assertEqual(get_product_info('CACHE001')['data']['product']['product_type'], '储能电池二代')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product_type.delete()
+        self.assertEqual(get_product_info('CACHE001')['status'], 'error')
+
+    def test_admin_bulk_delete_invalidates_cache(self):
+        """后台批量删除产品或产品类型后缓存失效"""
+        other = Product.objects.create(qrcode_id='CACHE002', product_type=self.product_type, status=2)
+        get_product_info('CACHE001')
+        get_product_info('CACHE002')
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductAdmin(Product, site).delete_queryset(None, Product.objects.filter(pk=other.pk))
+        self.assertEqual(get_product_info('CACHE002')['status'], 'error')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductTypeAdmin(ProductType, site).delete_queryset(None, ProductType.objects.all())
+        self.assertEqual(get_product_info('CACHE001')['status'], 'error')
@@ -0,0 +1,56 @@
+import csv
+import io
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from productApp.models import User, Product, ProductType
+
+
+class ProductExportTests(TestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(username='agent', password='pwd', user_type=User.AGENT)
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='warehouse', password='pwd'))
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        Product.objects.bulk_create([
+            Product(qrcode_id=f'EXP{index:03d}', product_type=product_type) for index in range(30)
+        ])
+        Product.objects.filter(qrcode_id__in=['EXP001', 'EXP002']).update(status=2, agent=self.agent)
+        self.url = reverse('productApp:product-export')
+
+    def export(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params or {})
+            content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return response, list(csv.DictReader(io.StringIO(content))), queries
+
+    def test_export_all_in_one_query(self):
+        response, rows, queries = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(len([query for query in queries if 'productApp_product' in query['sql']]), 1)
+        row = next(row for row in rows if row['qrcode_id'] == 'EXP001')
+        self.assertEqual((row['product_type'], row['model_number'], row['status'], row['agent']),
+                         ('储能电池', 'B100', '已出货', 'agent'))
+
+    def test_export_honours_filters(self):
+        _, rows, _ = self.export({'status': 2, 'agent': self.agent.id})
+        self.assertEqual(sorted(row['qrcode_id'] for row in rows), ['EXP001', 'EXP002'])
+        _, rows, _ = self.export({'search': 'EXP01'})
+        self.assertEqual(len(rows), 10)
+
+    @override_settings(TIME_ZONE='Asia/Shanghai')
+    def test_export_dates_in_local_time(self):
+        """日期列按本地时区输出"""
+        Product.objects.filter(qrcode_id='EXP001').update(
+            shipping_date=datetime(2025, 1, 1, 16, 30, tzinfo=dt_timezone.utc)
+        )
+        _, rows, _ = self.export({'qrcode_id': 'EXP001'})
+        self.assertEqual(rows[0]['shipping_date'], '2025-01-02 00:30:00')
+        self.assertEqual(rows[0]['activation_date'], '')
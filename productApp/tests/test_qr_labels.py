@@ -0,0 +1,59 @@
+import csv
+import io
+import os
+import tempfile
+import zipfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from productApp.models import User, Product, ProductType
+from productApp.utils.qr_labels import stream_label_zip
+
+
+class QrLabelTests(TestCase):
+    def test_stream_label_zip(self):
+        """并行渲染的标签按输入顺序写入ZIP，末尾附带manifest"""
+        codes = [f'LBL{index:03d}' for index in range(7)]
+        content = b''.join(stream_label_zip(iter(codes), url_template='https://example.com/wr?id={qrcode_id}',
+                                            workers=2, batch_size=3))
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertEqual(archive.namelist(), [f'{code}.png' for code in codes] + ['manifest.csv'])
+        image = Image.open(io.BytesIO(archive.read('LBL000.png')))
+        self.assertEqual(image.format, 'PNG')
+        self.assertGreater(image.height, image.width)
+
+        manifest = list(csv.reader(io.StringIO(archive.read('manifest.csv').decode('utf-8-sig'))))
+        self.assertEqual(manifest[0], ['qrcode_id', 'file_name', 'data'])
+        self.assertEqual(manifest[1], ['LBL000', 'LBL000.png', 'https://example.com/wr?id=LBL000'])
+
+    def test_command_and_admin_action(self):
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        Product.objects.bulk_create([Product(qrcode_id=f'LBL1{index:02d}', product_type=product_type, status=1)
+                                     for index in range(3)])
+        Product.objects.filter(qrcode_id='LBL100').update(status=2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'labels.zip')
+            call_command('generate_qr_labels', '--status', '1', '--workers', '1', '-o', path, stderr=io.StringIO())
+            with zipfile.ZipFile(path) as archive:
+                self.assertEqual(archive.namelist(), ['LBL101.png', 'LBL102.png', 'manifest.csv'])
+
+        self.client.force_login(User.objects.create_superuser(username='admin', password='pwd'))
+        response = self.client.post(reverse('admin:productApp_product_changelist'), {
+            'action': 'download_labels',
+            '_selected_action': list(Product.objects.values_list('id', flat=True)),
+        })
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), 4)
+
+        with override_settings(QR_LABEL_ADMIN_LIMIT=2):
+            response = self.client.post(reverse('admin:productApp_product_changelist'), {
+                'action': 'download_labels',
+                '_selected_action': list(Product.objects.values_list('id', flat=True)),
+            }, follow=True)
+        self.assertNotEqual(response['Content-Type'], 'application/zip')
+        self.assertContains(response, 'generate_qr_labels')
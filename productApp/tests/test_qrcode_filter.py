@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from productApp.models import Product, ProductType
+from productApp.utils.qrcode_filter import BloomFilter, QrcodeFilter, qrcode_filter
+from productApp.views import get_product_info
+
+
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(5000)
+        codes = [f'QR{index:08d}' for index in range(5000)]
+        for code in codes:
+            bloom.add(code)
+        self.assertTrue(all(code in bloom for code in codes))
+        false_positives = sum(f'XX{index:08d}' in bloom for index in range(5000))
+        self.assertLess(false_positives, 5000 * 0.03)
+
+
+# 测试中进程内缓存模拟共享缓存
+@override_settings(QRCODE_FILTER_ENABLED=True)
+class QrcodeFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        Product.objects.create(qrcode_id='BLOOM001', product_type=self.product_type, status=2)
+        qrcode_filter.rebuild()
+
+    def test_unknown_code_rejected_without_query(self):
+        """过滤器判定不存在的二维码不查询数据库"""
+        with CaptureQueriesContext(connection) as queries:
+            response = get_product_info('NOTEXIST')
+        self.assertEqual(response['status'], 'error')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(get_product_info('BLOOM001')['status'], 'success')
+
+    def test_bulk_create_visible_to_other_workers(self):
+        """其他进程通过共享缓存中的快照和版本号看到新增的二维码"""
+        other_worker = QrcodeFilter()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(other_worker.might_exist('BLOOM001'))
+        self.assertEqual(len(queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.bulk_create([
+                Product(qrcode_id=f'BLOOM1{index:02d}', product_type=self.product_type) for index in range(3)
+            ])
+        self.assertTrue(qrcode_filter.might_exist('BLOOM100'))
+        self.assertTrue(other_worker.might_exist('BLOOM102'))
+
+    def test_changed_qrcode_id_registered(self):
+        product = Product.objects.get(qrcode_id='BLOOM001')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.qrcode_id = 'BLOOM002'
+            product.save()
+        self.assertEqual(get_product_info('BLOOM002')['status'], 'success')
+
+    def test_stale_filter_rebuilt_out_of_band(self):
+        """过滤器过期时请求继续使用旧的过滤器，全量重建在后台线程中进行"""
+        with override_settings(QRCODE_FILTER_REBUILD_INTERVAL=0), \
+                mock.patch.object(QrcodeFilter, 'rebuild') as rebuild, \
+                CaptureQueriesContext(connection) as queries:
+            self.assertFalse(qrcode_filter.might_exist('NOTEXIST'))
+            self.assertTrue(qrcode_filter.might_exist('BLOOM001'))
+            qrcode_filter._rebuild_thread.join()
+        self.assertEqual(len(queries), 0)
+        rebuild.assert_called_once()
+
+    def test_missing_filter_lets_requests_through(self):
+        """还没有可用的过滤器时放行，不在请求中扫描产品表"""
+        cache.clear()
+        new_worker = QrcodeFilter()
+        with mock.patch.object(QrcodeFilter, 'rebuild') as rebuild, \
+                CaptureQueriesContext(connection) as queries:
+            self.assertTrue(new_worker.might_exist('NOTEXIST'))
+            new_worker._rebuild_thread.join()
+        self.assertEqual(len(queries), 0)
+        rebuild.assert_called_once()
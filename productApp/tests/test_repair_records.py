@@ -0,0 +1,57 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from productApp.models import User, Product, ProductType, RepairRecord, Attachment
+
+
+class RepairRecordListQueryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='staff', password='pwd'))
+        self.technician = User.objects.create_user(username='tech', password='pwd', user_type=User.EMPLOYEE)
+        self.product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        self.url = reverse('productApp:repairrecord-list')
+
+    def add_records(self, count):
+        start = RepairRecord.objects.count()
+        for index in range(start, start + count):
+            product = Product.objects.create(qrcode_id=f'REP{index:03d}', product_type=self.product_type)
+            record = RepairRecord.objects.create(product=product, technician=self.technician, repair_reason='故障')
+            for number in range(2):
+                record.attachments.create(name=f'照片{number}', file_url=f'https://example.com/{index}-{number}.jpg')
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_list_queries_do_not_grow_with_records(self):
+        self.add_records(2)
+        _, few = self.list_queries()
+        self.add_records(6)
+        response, many = self.list_queries()
+        self.assertEqual(few, many)
+
+        record = response.data['results'][0]
+        self.assertEqual(record['technician_name'], 'tech')
+        self.assertEqual(len(record['attachments']), 2)
+        self.assertTrue(record['product_qrcode'].startswith('REP'))
+
+    def test_attachments_are_deleted_with_record(self):
+        """删除维修记录或产品时同时删除维修记录的附件，其他对象的附件不受影响"""
+        self.add_records(3)
+        records = list(RepairRecord.objects.order_by('id'))
+        # 关联到其他模型、object_id与维修记录相同的附件
+        other = Attachment.objects.create(name='说明书', file_url='https://example.com/manual.pdf',
+                                          content_type=ContentType.objects.get_for_model(Product),
+                                          object_id=records[0].id)
+
+        records[0].delete()
+        records[1].product.delete()
+        RepairRecord.objects.filter(pk=records[2].pk).delete()
+        self.assertEqual(list(Attachment.objects.all()), [other])
@@ -0,0 +1,50 @@
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresWrapper
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from productApp.models import User, Product, ProductType, RepairRecord
+
+
+class TrigramSearchTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='pwd', email='admin@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        technician = User.objects.create_user(username='TechWang', password='pwd', user_type=User.EMPLOYEE)
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        first = Product.objects.create(qrcode_id='SRCH001', product_type=product_type, name='Alice',
+                                       email='alice@example.com')
+        second = Product.objects.create(qrcode_id='SRCH002', product_type=product_type, phone='13912345678')
+        RepairRecord.objects.create(product=first, technician=technician, repair_reason='电池 Overheating')
+        RepairRecord.objects.create(product=second, repair_reason='屏幕不亮', repair_solution='更换 100% 新屏幕')
+
+    def search(self, url_name, term):
+        response = self.client.get(reverse(url_name), {'search': term})
+        return sorted(item['product_qrcode' if 'repair' in url_name else 'qrcode_id']
+                      for item in response.data['results'])
+
+    def test_api_search_is_case_insensitive_across_fields(self):
+        self.assertEqual(self.search('productApp:repairrecord-list', 'overheat'), ['SRCH001'])
+        self.assertEqual(self.search('productApp:repairrecord-list', 'srch002'), ['SRCH002'])
+        self.assertEqual(self.search('productApp:product-list', 'srch'), ['SRCH001', 'SRCH002'])
+
+    def test_like_wildcards_are_escaped(self):
+        self.assertEqual(self.search('productApp:repairrecord-list', '100%'), ['SRCH002'])
+        self.assertEqual(self.search('productApp:repairrecord-list', '%'), ['SRCH002'])
+
+    def test_admin_search(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin:productApp_repairrecord_changelist'), {'q': 'techwang'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get(reverse('admin:productApp_product_changelist'), {'q': 'ALICE@'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_postgres_uses_ilike(self):
+        postgres = PostgresWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'})
+        queryset = RepairRecord.objects.filter(repair_reason__ilike='50%')
+        sql, params = queryset.query.get_compiler(connection=postgres).as_sql()
+        self.assertIn('"productApp_repairrecord"."repair_reason" ILIKE %s', sql)
+        self.assertNotIn('UPPER', sql)
+        self.assertEqual(params, ('%50\\%%',))
@@ -0,0 +1,119 @@
+import csv
+import io
+import unittest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from productApp.models import User, Product, ProductType, OperationRecord, Job
+from productApp.services import ship_manifest
+from productApp.utils.manifest import openpyxl
+
+
+class ShippingManifestTests(TestCase):
+    def setUp(self):
+        self.north = User.objects.create_user(username='north', password='pwd', user_type=User.AGENT)
+        self.south = User.objects.create_user(username='south', password='pwd', user_type=User.AGENT)
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='warehouse', password='pwd'))
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        Product.objects.bulk_create([
+            Product(qrcode_id=f'MAN{index:03d}', product_type=product_type) for index in range(10)
+        ])
+        Product.objects.filter(qrcode_id='MAN009').update(status=3)
+        self.url = reverse('productApp:product-shipping-manifest')
+
+    def upload(self, content, name='manifest.csv', content_type='text/csv'):
+        return self.client.post(self.url, {'file': SimpleUploadedFile(name, content, content_type=content_type)},
+                                format='multipart')
+
+    def results(self, response):
+        rows = csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig')))
+        return {row['line']: row for row in rows}
+
+    def test_csv_manifest(self):
+        content = '\n'.join([
+            '二维码,代理商,出货日期',
+            'MAN000,north,2026-01-05',
+            'MAN001,south,',
+            f'MAN002,{self.south.id},',
+            'MAN000,north,2026-01-05',
+            'MAN009,north,',
+            'NOPE,north,',
+            'MAN003,nobody,',
+            'MAN004,north,yesterday',
+        ]).encode('utf-8-sig')
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        results = self.results(response)
+
+        self.assertEqual({line: row['result'] for line, row in results.items()}, {
+            '2': 'shipped', '3': 'shipped', '4': 'shipped', '5': 'skipped', '6': 'skipped', '7': 'skipped',
+            '8': 'error', '9': 'error',
+        })
+        self.assertEqual(results['5']['message'], '清单中重复的二维码')
+        self.assertEqual(results['8']['message'], '代理商不存在')
+        self.assertEqual(results['9']['message'], '出货日期格式错误')
+
+        man000 = Product.objects.get(qrcode_id='MAN000')
+        self.assertEqual(man000.agent, self.north)
+        self.assertEqual(timezone.localtime(man000.shipping_date).date().isoformat(), '2026-01-05')
+        self.assertEqual(Product.objects.get(qrcode_id='MAN002').agent, self.south)
+        self.assertEqual(OperationRecord.objects.filter(operation_type=2).count(), 3)
+
+    def test_applied_before_response(self):
+        """响应返回前已全部发货，读取结果之前断开连接也不会只发货一部分"""
+        response = self.upload(b'qrcode_id,agent\nMAN000,north\nMAN001,north\n')
+        self.assertEqual(Product.objects.filter(agent=self.north, status=2).count(), 2)
+        self.assertEqual(len(self.results(response)), 2)
+
+    def test_background(self):
+        response = self.client.post(f'{self.url}?background=true', {'file': SimpleUploadedFile(
+            'manifest.csv', b'qrcode_id,agent\nMAN000,north\nMAN009,north\nMAN001,nobody\n', content_type='text/csv'
+        )}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Product.objects.filter(agent=self.north).exists())
+
+        call_command('run_jobs', '--once', stdout=io.StringIO())
+        job = Job.objects.get(id=response.data['data']['job_id'])
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual((job.result['shipped'], job.result['skipped'], job.result['error']), (1, 1, 1))
+        self.assertEqual([item['line'] for item in job.result['results']], [2, 3, 4])
+        self.assertEqual(Product.objects.get(qrcode_id='MAN000').agent, self.north)
+
+    def test_missing_column(self):
+        response = self.upload(b'qrcode_id\nMAN000\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('agent', response.data['message'])
+
+    def test_unsupported_format(self):
+        response = self.upload(b'\x00', name='manifest.pdf', content_type='application/pdf')
+        self.assertEqual(response.status_code, 400)
+
+    def test_groups_are_shipped_in_chunks(self):
+        rows = ((index + 2, {'qrcode_id': f'MAN{index:03d}', 'agent': 'north'}) for index in range(9))
+        results = list(ship_manifest(rows, operator='test', chunk_size=4))
+        self.assertEqual([item['line'] for item in results], list(range(2, 11)))
+        self.assertEqual(Product.objects.filter(agent=self.north, status=2).count(), 9)
+
+    @unittest.skipUnless(openpyxl, 'openpyxl未安装')
+    def test_xlsx_manifest(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['qrcode_id', 'agent_username'])
+        sheet.append(['MAN005', 'south'])
+        sheet.append([None, None])
+        sheet.append(['MAN006', 'south'])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        response = self.upload(buffer.getvalue(), name='manifest.xlsx',
+                               content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self.assertEqual(response.status_code, 200)
+        results = self.results(response)
+        self.assertEqual({line: row['result'] for line, row in results.items()}, {'2': 'shipped', '4': 'shipped'})
+        self.assertEqual(Product.objects.filter(agent=self.south).count(), 2)
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from productApp.models import User, Product, ProductType, OperationRecord, RepairRecord
+from productApp.serializers import ProductSerializer, OperationRecordSerializer, RepairRecordSerializer
+
+
+class SparseFieldsTests(TestCase):
+    """?fields= 只返回部分字段、?expand= 展开关联对象，列表(快速序列化)与详情(ModelSerializer)输出一致"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='staff', password='pwd'))
+        agent = User.objects.create_user(username='代理商A', password='pwd', user_type=User.AGENT,
+                                         email='agent@example.com')
+        technician = User.objects.create_user(username='tech', password='pwd', user_type=User.EMPLOYEE)
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        now = timezone.now()
+        self.products = [
+            Product.objects.create(qrcode_id='SPARSE001', product_type=None),
+            Product.objects.create(
+                qrcode_id='SPARSE002', product_type=product_type, agent=agent, status=3, name='张三',
+                email='a@example.com', warranty_start_date=now, warranty_end_date=now + timedelta(days=365)
+            ),
+        ]
+        for product in self.products:
+            OperationRecord.objects.create(product=product, operator='user-staff', operation_type=1)
+        record = RepairRecord.objects.create(product=self.products[1], technician=technician, repair_reason='无法开机')
+        record.attachments.create(name='照片', file_url='https://example.com/a.jpg', file_type=1)
+        RepairRecord.objects.create(product=self.products[0], repair_reason='外壳破损')
+
+    def assert_identical(self, url_name, serializer_class, queryset, params):
+        params = {'pagination': 'cursor', **params}
+        response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        request = APIRequestFactory().get('/', params)
+        expected = serializer_class(queryset, many=True, context={'request': request}).data
+        self.assertEqual(response.content, JSONRenderer().render(dict(response.data, results=expected)))
+        return response.json()['results']
+
+    def test_fields(self):
+        results = self.assert_identical('productApp:product-list', ProductSerializer,
+                                        Product.objects.order_by('-created_at', '-id'),
+                                        {'fields': 'qrcode_id,id,under_warranty,unknown'})
+        self.assertEqual(list(results[0]), ['id', 'qrcode_id', 'under_warranty'])
+        self.assertEqual(results[0], {'id': self.products[1].id, 'qrcode_id': 'SPARSE002', 'under_warranty': True})
+
+    def test_expand(self):
+        results = self.assert_identical('productApp:product-list', ProductSerializer,
+                                        Product.objects.order_by('-created_at', '-id'),
+                                        {'expand': 'product_type,agent'})
+        self.assertEqual(results[0]['agent']['email'], 'agent@example.com')
+        self.assertEqual(results[0]['product_type']['model_number'], 'B100')
+        self.assertIsNone(results[1]['agent'])
+        self.assertIsNone(results[1]['product_type'])
+
+        self.assert_identical('productApp:operationrecord-list', OperationRecordSerializer,
+                              OperationRecord.objects.order_by('-created_at', '-id'),
+                              {'fields': 'id,product', 'expand': 'product'})
+        self.assert_identical('productApp:repairrecord-list', RepairRecordSerializer,
+                              RepairRecord.objects.order_by('-created_at', '-id'),
+                              {'fields': 'id,technician,attachments', 'expand': 'technician'})
+
+    def test_retrieve_matches_list(self):
+        params = {'fields': 'id,qrcode_id,agent,status_display', 'expand': 'agent'}
+        listed = self.client.get(reverse('productApp:product-list'), params).json()['results']
+        for item in listed:
+            response = self.client.get(reverse('productApp:product-detail', args=[item['id']]), params)
+            self.assertEqual(response.json(), item)
+
+    def test_narrowed_queries(self):
+        """只查询需要的列，不JOIN未请求的关联表，不查询未请求的附件"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('productApp:product-list'), {'fields': 'id,qrcode_id'})
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"email"', sql)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('productApp:product-detail', args=[self.products[1].id]), {'fields': 'id,name'})
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"email"', sql)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('productApp:repairrecord-list'), {'fields': 'id,repair_reason'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('attachment' in query['sql'] for query in queries.captured_queries))
@@ -0,0 +1,117 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from productApp.models import User
+from productApp.throttling import TokenBucket, get_throttle_metrics
+
+RATES = {
+    'ip': {'capacity': 3, 'refill_rate': 0.01},
+    'access_code': {'capacity': 100, 'refill_rate': 1},
+}
+
+
+@override_settings(SCAN_THROTTLE_RATES=RATES)
+class ScanBurstThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_burst_rejected_before_database(self):
+        """超过突发上限后直接返回429，不查询数据库"""
+        url = reverse('productApp:check_code_api')
+        for _ in range(3):
+            self.assertEqual(self.client.post(url, {'access_code': 'X'}, format='json').status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'access_code': 'X'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(len(queries), 0)
+
+        # 其他IP不受影响
+        response = self.client.post(url, {'access_code': 'X'}, format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+        metrics = get_throttle_metrics()
+        self.assertEqual(metrics['ip']['rejected'], 1)
+        self.assertEqual(metrics['ip']['checked'], 5)
+
+    def test_forwarded_for_spoofing(self):
+        """客户端每次填写不同的 X-Forwarded-For 不能绕过限流，只使用nginx追加的客户端IP"""
+        url = reverse('productApp:check_code_api')
+        statuses = [
+            self.client.post(url, {'access_code': 'X'}, format='json', REMOTE_ADDR='172.18.0.2',
+                             HTTP_X_FORWARDED_FOR=f'10.9.9.{index}, 203.0.113.7').status_code
+            for index in range(5)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429, 429])
+
+        # 代理后面的其他客户端不受影响
+        response = self.client.post(url, {'access_code': 'X'}, format='json', REMOTE_ADDR='172.18.0.2',
+                                    HTTP_X_FORWARDED_FOR='203.0.113.8')
+        self.assertEqual(response.status_code, 200)
+
+    def test_access_code_bucket(self):
+        """同一访问码在不同IP之间共享令牌桶"""
+        rates = {'ip': {'capacity': 100, 'refill_rate': 1}, 'access_code': {'capacity': 2, 'refill_rate': 0.01}}
+        url = reverse('productApp:check_code_api')
+        with self.settings(SCAN_THROTTLE_RATES=rates):
+            for index in range(2):
+                response = self.client.post(url, {'access_code': 'SHARED'}, format='json',
+                                            REMOTE_ADDR=f'10.0.1.{index}')
+                self.assertEqual(response.status_code, 200)
+            response = self.client.post(url, {'access_code': 'SHARED'}, format='json', REMOTE_ADDR='10.0.1.9')
+            self.assertEqual(response.status_code, 429)
+
+    def test_metrics_endpoint_requires_admin(self):
+        url = reverse('productApp:throttle_metrics')
+        self.client.force_authenticate(User.objects.create_user(username='staff', password='pwd'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(User.objects.create_superuser(username='admin', password='pwd'))
+        self.assertEqual(self.client.get(url).data['data']['ip']['rejected'], 0)
+
+
+def concurrent_allowed(bucket, requests):
+    """多个线程同时从同一个桶取令牌，返回放行的请求数"""
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        waits = list(executor.map(bucket.consume, ['10.0.0.1'] * requests))
+    return sum(1 for wait in waits if not wait)
+
+
+class TokenBucketConcurrencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_burst(self):
+        """并发请求时放行的数量不超过桶容量"""
+        self.assertEqual(concurrent_allowed(TokenBucket('ip', capacity=5, refill_rate=0.001), 100), 5)
+
+
+@skipUnless(os.environ.get('TEST_REDIS_URL'), '设置 TEST_REDIS_URL 后使用redis测试')
+class RedisTokenBucketTests(TestCase):
+    """redis中的令牌桶由Lua脚本原子地更新"""
+
+    def setUp(self):
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                              'LOCATION': os.environ.get('TEST_REDIS_URL')}}
+        settings_override = override_settings(CACHES=caches)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.delete('throttle:tokens:ip:10.0.0.1')
+
+    def test_concurrent_burst(self):
+        self.assertEqual(concurrent_allowed(TokenBucket('ip', capacity=5, refill_rate=0.001), 100), 5)
+
+    def test_refill(self):
+        bucket = TokenBucket('ip', capacity=1, refill_rate=1000)
+        self.assertEqual(bucket.consume('10.0.0.1'), 0)
+        wait = bucket.consume('10.0.0.1')
+        self.assertTrue(0 <= wait <= 0.001)
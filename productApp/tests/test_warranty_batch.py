@@ -0,0 +1,60 @@
+import json
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from productApp.models import User, Product, ProductType
+
+
+class WarrantyBatchCheckTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='callcenter', password='pwd')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        now = timezone.now()
+        Product.objects.create(qrcode_id='WB001', product_type=product_type, status=3, phone='13800000000',
+                               warranty_start_date=now - timedelta(days=10),
+                               warranty_end_date=now + timedelta(days=100))
+        Product.objects.create(qrcode_id='WB002', product_type=product_type, status=3, email='a@example.com',
+                               warranty_start_date=now - timedelta(days=400),
+                               warranty_end_date=now - timedelta(days=35))
+
+    def test_batch_check(self):
+        """批量查询返回每个输入的结果，包括未找到的"""
+        url = reverse('productApp:product-check-warranty-batch')
+        data = {'qrcode_ids': ['WB001', 'MISSING'], 'customer_emails': ['a@example.com'],
+                'customer_phones': ['13800000000']}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data, format='json')
+            body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(body['status'], 'success')
+
+        results = {(item['query'], item['value']): item for item in body['data']}
+        self.assertEqual(len(results), 4)
+        self.assertTrue(results[('qrcode_id', 'WB001')]['products'][0]['under_warranty'])
+        self.assertFalse(results[('qrcode_id', 'MISSING')]['found'])
+        self.assertFalse(results[('customer_email', 'a@example.com')]['products'][0]['under_warranty'])
+        self.assertEqual(results[('customer_phone', '13800000000')]['products'][0]['qrcode_id'], 'WB001')
+
+    def test_requires_input(self):
+        response = self.client.post(reverse('productApp:product-check-warranty-batch'), {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_email_is_case_insensitive(self):
+        """邮箱按 LOWER(email) 匹配，与 product_email_lower_idx 索引一致"""
+        response = self.client.post(reverse('productApp:product-check-warranty-batch'),
+                                    {'customer_emails': ['A@Example.com']}, format='json')
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body['data'][0]['value'], 'A@Example.com')
+        self.assertEqual(body['data'][0]['products'][0]['qrcode_id'], 'WB002')
+
+        response = self.client.post(reverse('productApp:product-check-warranty'),
+                                    {'customer_email': 'A@EXAMPLE.COM'}, format='json')
+        self.assertEqual(response.data['data'][0]['qrcode_id'], 'WB002')
@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import TestCase
+from django.urls import reverse
+
+from productApp.models import AccessCode
+
+
+class WarrantyPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            AccessCode.objects.create(code='PAGE2025', is_active=True)
+        self.url = reverse('productApp:warranty')
+
+    def test_prerendered_page_matches_template(self):
+        """预渲染结果与直接渲染模板一致"""
+        response = self.client.get(self.url, {'access_code': 'PAGE2025', 'id': 'QR<1>'})
+        self.assertEqual(response.status_code, 200)
+        expected = render_to_string('warranty-registration.html', {'access_code': True, 'qrcode_id': 'QR<1>'})
+        self.assertEqual(response.content.decode(), expected)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.content.decode(), render_to_string('warranty-registration.html',
+                                                                     {'access_code': False}))
+
+    def test_conditional_get(self):
+        """重复访问返回304，二维码ID或访问码变化时ETag不同"""
+        response = self.client.get(self.url, {'access_code': 'PAGE2025', 'id': 'QR001'})
+        etag = response.headers['ETag']
+        self.assertIn('Last-Modified', response.headers)
+
+        response = self.client.get(self.url, {'access_code': 'PAGE2025', 'id': 'QR001'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, {'access_code': 'PAGE2025', 'id': 'QR002'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, {'access_code': 'WRONG', 'id': 'QR001'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from productApp.models import User, Product, ProductType
+
+
+class WarrantyStateTests(TestCase):
+    """保修状态由数据库计算(with_warranty_state)，支持筛选和排序"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='staff', password='pwd'))
+        product_type = ProductType.objects.create(name='储能电池', model_number='B100')
+        now = timezone.now()
+        for qrcode_id, end_days in (('WS010', 10), ('WS100', 100), ('WSOLD', -5)):
+            Product.objects.create(qrcode_id=qrcode_id, product_type=product_type, status=3,
+                                   warranty_start_date=now - timedelta(days=400),
+                                   warranty_end_date=now + timedelta(days=end_days))
+        Product.objects.create(qrcode_id='WSNEW', product_type=product_type)
+
+    def qrcode_ids(self, params):
+        response = self.client.get(reverse('productApp:product-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [item['qrcode_id'] for item in response.json()['results']]
+
+    def test_annotation_matches_python(self):
+        for product in Product.objects.with_warranty_state():
+            self.assertEqual(product.under_warranty, Product.objects.get(pk=product.pk).is_under_warranty())
+
+    def test_filters(self):
+        self.assertCountEqual(self.qrcode_ids({'under_warranty': 'true'}), ['WS010', 'WS100'])
+        self.assertCountEqual(self.qrcode_ids({'under_warranty': 'false'}), ['WSOLD', 'WSNEW'])
+        self.assertEqual(self.qrcode_ids({'warranty_expires_within': '30d'}), ['WS010'])
+        self.assertCountEqual(self.qrcode_ids({'warranty_expires_within': '365'}), ['WS010', 'WS100'])
+
+        response = self.client.get(reverse('productApp:product-list'), {'warranty_expires_within': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_ordering(self):
+        self.assertEqual(self.qrcode_ids({'under_warranty': 'true', 'ordering': '-warranty_end_date'}),
+                         ['WS100', 'WS010'])
+        self.assertEqual(self.qrcode_ids({'ordering': 'under_warranty,warranty_end_date'})[2:], ['WS010', 'WS100'])
+
+    def test_serializers_use_annotation(self):
+        results = {item['qrcode_id']: item['under_warranty'] for item in
+                   self.client.get(reverse('productApp:product-list')).json()['results']}
+        self.assertEqual(results, {'WS010': True, 'WS100': True, 'WSOLD': False, 'WSNEW': False})
+        product = Product.objects.get(qrcode_id='WS010')
+        response = self.client.get(reverse('productApp:product-detail', args=[product.id]))
+        self.assertTrue(response.json()['under_warranty'])
+
+    def test_get_by_qrcode_uses_annotation(self):
+        url = reverse('productApp:product-get-by-qrcode')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'qrcode_id': 'WSOLD'})
+        self.assertFalse(response.json()['data']['under_warranty'])
+        self.assertTrue(any('CASE WHEN' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(self.client.get(url, {'qrcode_id': 'MISSING'}).status_code, 404)
@@ -0,0 +1,166 @@
+"""
+公开扫码接口限流
+按客户端IP和访问码分别使用令牌桶，桶状态保存在共享缓存(redis)中，所有gunicorn worker共用，
+在视图做任何数据库查询之前拒绝超限请求，并记录每类限流的检查次数和拒绝次数
+"""
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+BUCKET_KEY = 'throttle:tokens:{scope}:{ident}'
+METRICS_KEY = 'throttle:metrics:{scope}:{result}'
+SCOPES = ('ip', 'access_code')
+
+# redis中原子地补充并取出一个令牌，返回需要等待的秒数(字符串，避免小数被截断为整数)
+TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / refill_rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    """
+    令牌桶：容量为允许的突发请求数，按固定速率补充令牌
+    使用redis时通过Lua脚本原子地读改写，多个worker并发请求时也不会多放行；
+    进程内缓存(开发环境)用锁保证同一进程内的读改写是原子的
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, scope, capacity, refill_rate):
+        self.scope = scope
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        # 桶完全补满后状态没有意义，让缓存自动过期
+        self.timeout = math.ceil(capacity / refill_rate) + 1
+
+    def _key(self, ident):
+        return BUCKET_KEY.format(scope=self.scope, ident=ident[:64])
+
+    def _take(self, state, now):
+        """返回(新状态, 需要等待的秒数)，等待秒数为0表示放行"""
+        tokens, updated_at = state if state else (self.capacity, now)
+        tokens = min(self.capacity, tokens + max(0, now - updated_at) * self.refill_rate)
+        if tokens >= 1:
+            return (tokens - 1, now), 0
+        return (tokens, now), (1 - tokens) / self.refill_rate
+
+    def consume(self, ident):
+        key = self._key(ident)
+        backend = caches['default']
+        if isinstance(backend, RedisCache):
+            key = backend.make_and_validate_key(key)
+            client = backend._cache.get_client(key, write=True)
+            wait = client.register_script(TAKE_TOKEN_SCRIPT)(
+                keys=[key], args=[self.capacity, self.refill_rate, time.time(), self.timeout]
+            )
+            return float(wait)
+        with self._lock:
+            state, wait = self._take(cache.get(key), time.time())
+            cache.set(key, state, self.timeout)
+        return wait
+
+    async def aconsume(self, ident):
+        # 与Django缓存的异步方法一样在线程中执行同步实现
+        return await sync_to_async(self.consume, thread_sensitive=True)(ident)
+
+
+def get_buckets():
+    return {
+        scope: TokenBucket(scope, **settings.SCAN_THROTTLE_RATES[scope])
+        for scope in SCOPES
+    }
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+async def _aincr(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        await cache.aincr(key)
+
+
+def _idents(ip, access_code):
+    idents = {'ip': ip}
+    if access_code:
+        idents['access_code'] = str(access_code)
+    return idents
+
+
+def check_scan_rate(ip, access_code=None):
+    """
+    检查扫码请求是否超限
+    :return: 需要等待的秒数，None表示放行
+    """
+    buckets = get_buckets()
+    for scope, ident in _idents(ip, access_code).items():
+        _incr(METRICS_KEY.format(scope=scope, result='checked'))
+        wait = buckets[scope].consume(ident)
+        if wait:
+            _incr(METRICS_KEY.format(scope=scope, result='rejected'))
+            return wait
+    return None
+
+
+async def acheck_scan_rate(ip, access_code=None):
+    """check_scan_rate的异步版本"""
+    buckets = get_buckets()
+    for scope, ident in _idents(ip, access_code).items():
+        await _aincr(METRICS_KEY.format(scope=scope, result='checked'))
+        wait = await buckets[scope].aconsume(ident)
+        if wait:
+            await _aincr(METRICS_KEY.format(scope=scope, result='rejected'))
+            return wait
+    return None
+
+
+def get_throttle_metrics():
+    """各类限流的检查次数和拒绝次数"""
+    keys = {(scope, result): METRICS_KEY.format(scope=scope, result=result)
+            for scope in SCOPES for result in ('checked', 'rejected')}
+    values = cache.get_many(list(keys.values()))
+    return {
+        scope: {result: values.get(keys[(scope, result)], 0) for result in ('checked', 'rejected')}
+        for scope in SCOPES
+    }
+
+
+class ScanBurstThrottle(BaseThrottle):
+    """公开扫码接口的令牌桶限流"""
+
+    def allow_request(self, request, view):
+        access_code = request.query_params.get('access_code')
+        if not access_code and request.method == 'POST' and isinstance(request.data, dict):
+            access_code = request.data.get('access_code')
+        self._wait = check_scan_rate(self.get_ident(request), access_code)
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
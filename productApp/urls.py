@@ -4,7 +4,11 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenVerifyView,
 )
-from . import views
+from django.conf import settings
+from . import views, async_views
+
+# ASGI部署时公开扫码接口使用原生异步视图
+public_views = async_views if settings.ASYNC_PUBLIC_VIEWS else views
 
 # 创建路由器
 router = DefaultRouter()
@@ -17,6 +21,7 @@ router.register(r'products', views.ProductViewSet)
 router.register(r'operation-records', views.OperationRecordViewSet)
 router.register(r'repair-records', views.RepairRecordViewSet)
 router.register(r'attachments', views.AttachmentViewSet)
+router.register(r'jobs', views.JobViewSet)
 
 
 urlpatterns = [
@@ -25,9 +30,10 @@ urlpatterns = [
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/verify/', TokenVerifyView.as_view(), name='token_verify'),
     path('wr', views.warranty_registration, name='warranty'),
-    path('wr_api', views.warranty_registration_api, name='warranty_api'),
-    path('code_api', views.check_code_api, name='check_code_api'),
-    path('activate-product/', views.activate_product, name='activate_product'),
+    path('wr_api', public_views.warranty_registration_api, name='warranty_api'),
+    path('code_api', public_views.check_code_api, name='check_code_api'),
+    path('activate-product/', public_views.activate_product, name='activate_product'),
+    path('metrics/throttle/', views.throttle_metrics, name='throttle_metrics'),
     # API 路由
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+File: 访问码校验，进程内保存全部有效访问码，公开接口校验时无需查询数据库
+"""
+import threading
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+VERSION_CACHE_KEY = 'access_code:version'
+
+
+class AccessCodeValidator:
+    """
+    访问码校验器
+    每个进程加载一次有效访问码及其过期时间(created_at + validity_period)，
+    管理员修改访问码时更新共享缓存中的版本号，各worker发现版本变化后重新加载
+    """
+
+    def __init__(self):
+        self._expires = {}
+        self._version = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def is_valid(self, code):
+        """访问码存在、已启用且未过期"""
+        if not code:
+            return False
+        self._ensure_loaded()
+        return self._check(code)
+
+    async def ais_valid(self, code):
+        """is_valid的异步版本，仅在需要重新加载时访问数据库"""
+        if not code:
+            return False
+        version = await cache.aget(VERSION_CACHE_KEY)
+        if self._is_stale(version):
+            await sync_to_async(self.reload)(version)
+        return self._check(code)
+
+    def _check(self, code):
+        if code not in self._expires:
+            return False
+        expires_at = self._expires[code]
+        return expires_at is None or timezone.now() < expires_at
+
+    def _is_stale(self, version):
+        if self._loaded_at is None or version != self._version:
+            return True
+        return time.monotonic() - self._loaded_at > settings.ACCESS_CODE_REFRESH_INTERVAL
+
+    def _ensure_loaded(self):
+        version = cache.get(VERSION_CACHE_KEY)
+        if not self._is_stale(version):
+            return
+        with self._lock:
+            if self._is_stale(version):
+                self.reload(version)
+
+    def reload(self, version=None):
+        """从数据库重新加载有效访问码"""
+        from ..models import AccessCode
+
+        now = timezone.now()
+        expires = {}
+        for access_code in AccessCode.objects.filter(is_active=True).only('code', 'validity_period', 'created_at'):
+            expires_at = access_code.expires_at
+            if expires_at is None or expires_at > now:
+                expires[access_code.code] = expires_at
+        self._expires = expires
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+
+def invalidate_access_codes():
+    """访问码变更后通知所有进程重新加载"""
+    transaction.on_commit(lambda: cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None))
+
+
+access_code_validator = AccessCodeValidator()
@@ -0,0 +1,32 @@
+"""
+File: 二维码ID随机生成
+一次读取大块随机字节，用 bytes.translate 在C层完成拒绝采样和字符映射，不逐个字符调用 secrets.choice
+"""
+import os
+
+# 定义字符集，排除容易混淆的字符
+CHARSET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+CODE_LENGTH = 8
+
+# 只使用小于 _LIMIT 的字节，保证每个字符出现的概率相同(拒绝采样)
+_LIMIT = 256 - 256 % len(CHARSET)
+_TABLE = bytes(ord(CHARSET[byte % len(CHARSET)]) if byte < _LIMIT else 0 for byte in range(256))
+_REJECTED = bytes(range(_LIMIT, 256))
+
+
+def random_chars(count):
+    """返回count个均匀分布在CHARSET上的随机字符"""
+    chars = b''
+    while len(chars) < count:
+        missing = count - len(chars)
+        chars += os.urandom(missing * 256 // _LIMIT + 16).translate(_TABLE, _REJECTED)
+    return chars[:count].decode('ascii')
+
+
+def random_codes(count, length=CODE_LENGTH, prefix=''):
+    """批量生成随机二维码ID，prefix为预留号段的前缀，批内可能有重复"""
+    suffix_length = length - len(prefix)
+    if suffix_length <= 0:
+        raise ValueError('前缀长度必须小于二维码ID长度')
+    chars = random_chars(count * suffix_length)
+    return [prefix + chars[start:start + suffix_length] for start in range(0, len(chars), suffix_length)]
@@ -0,0 +1,41 @@
+"""
+File: 幂等键处理，客户端重复提交(如H5表单连续点击)时直接返回第一次的处理结果
+"""
+import hashlib
+
+from django.core.cache import cache
+
+# 处理结果保留时间(秒)
+RESULT_TIMEOUT = 24 * 3600
+# 处理中标记的最长保留时间(秒)，防止进程异常退出后一直占用
+PENDING_TIMEOUT = 60
+PENDING = 'pending'
+
+
+def _cache_key(scope, key):
+    digest = hashlib.sha256(f"{scope}:{key}".encode()).hexdigest()
+    return f"idempotency:{digest}"
+
+
+def claim(scope, key):
+    """
+    尝试占用幂等键
+    :return: (是否由本次请求处理, 已保存的结果(status_code, data))
+             未占用且结果为None表示第一次请求仍在处理中
+    """
+    cache_key = _cache_key(scope, key)
+    if cache.add(cache_key, PENDING, PENDING_TIMEOUT):
+        return True, None
+    stored = cache.get(cache_key)
+    if stored is None or stored == PENDING:
+        return False, None
+    return False, stored
+
+
+def save_result(scope, key, status_code, data):
+    cache.set(_cache_key(scope, key), (status_code, data), RESULT_TIMEOUT)
+
+
+def release(scope, key):
+    """处理失败时释放幂等键，允许客户端重试"""
+    cache.delete(_cache_key(scope, key))
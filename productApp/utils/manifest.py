@@ -0,0 +1,95 @@
+"""
+File: 出货清单(CSV/XLSX)的流式解析
+逐行读取，XLSX使用openpyxl的只读模式。openpyxl未安装时(如只安装了部分依赖的环境)只支持CSV
+"""
+import csv
+from datetime import date, datetime
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+CSV = 'csv'
+XLSX = 'xlsx'
+
+# 表头别名 -> 字段
+COLUMN_ALIASES = {
+    'qrcode_id': 'qrcode_id',
+    'qrcode': 'qrcode_id',
+    '二维码id': 'qrcode_id',
+    '二维码': 'qrcode_id',
+    'agent': 'agent',
+    'agent_id': 'agent',
+    'agent_username': 'agent',
+    '代理商': 'agent',
+    'shipping_date': 'shipping_date',
+    '出货日期': 'shipping_date',
+}
+REQUIRED_COLUMNS = ('qrcode_id', 'agent')
+
+
+class ManifestError(ValueError):
+    """清单格式错误(缺少必需的列、格式不支持等)"""
+
+
+def detect_manifest_format(file_name=None, content_type=None):
+    name = (file_name or '').lower()
+    if name.endswith('.xlsx') or content_type == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet':
+        return XLSX
+    if name.endswith('.csv') or name.endswith('.txt') or (content_type or '').startswith('text/'):
+        return CSV
+    return None
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Excel把纯数字的二维码存成浮点数
+        value = int(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def _csv_rows(file):
+    lines = (line.decode('utf-8-sig' if index == 0 else 'utf-8', errors='replace') if isinstance(line, bytes)
+             else line for index, line in enumerate(file))
+    reader = csv.reader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _xlsx_rows(file):
+    if openpyxl is None:
+        raise ManifestError('服务器未安装openpyxl，请上传CSV格式的清单')
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ManifestError('无法读取XLSX文件')
+    try:
+        for line_number, row in enumerate(workbook.active.iter_rows(values_only=True), start=1):
+            yield line_number, row
+    finally:
+        workbook.close()
+
+
+def iter_manifest(file, fmt):
+    """
+    逐行返回 (行号, {'qrcode_id', 'agent', 'shipping_date'})，第一行必须是表头
+    """
+    rows = _xlsx_rows(file) if fmt == XLSX else _csv_rows(file)
+    columns = None
+    for line_number, row in rows:
+        values = [_cell_text(value) for value in row]
+        if not any(values):
+            continue
+        if columns is None:
+            columns = {COLUMN_ALIASES[name.lower()]: index for index, name in enumerate(values)
+                       if name.lower() in COLUMN_ALIASES}
+            missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+            if missing:
+                raise ManifestError(f'清单缺少必需的列: {", ".join(missing)}')
+            continue
+        yield line_number, {field: values[index] if index < len(values) else '' for field, index in columns.items()}
@@ -0,0 +1,57 @@
+"""
+File: 预渲染页面，每个进程只渲染一次模板，请求时替换动态部分并支持条件GET
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.html import escape
+
+QRCODE_PLACEHOLDER = '__PRERENDERED_QRCODE_ID__'
+
+
+class PrerenderedPage:
+    """
+    保修登记页面的预渲染变体
+    按 (访问码是否有效, 是否带二维码ID) 渲染4个变体，二维码ID用占位符代替，请求时做字符串替换，
+    ETag由变体内容和二维码ID计算，Last-Modified取模板文件修改时间(即部署时间)
+    """
+
+    def __init__(self, template_name):
+        self.template_name = template_name
+        self._variants = {}
+        self._mtime = None
+
+    def _template_mtime(self):
+        template = get_template(self.template_name)
+        return os.path.getmtime(template.origin.name)
+
+    def _variant(self, access_code_valid, has_qrcode_id):
+        # 开发环境修改模板后重新渲染
+        if self._mtime is None or settings.DEBUG:
+            mtime = self._template_mtime()
+            if mtime != self._mtime:
+                self._variants = {}
+                self._mtime = mtime
+
+        key = (access_code_valid, has_qrcode_id)
+        if key not in self._variants:
+            context = {'access_code': access_code_valid}
+            if has_qrcode_id:
+                context['qrcode_id'] = QRCODE_PLACEHOLDER
+            content = get_template(self.template_name).render(context)
+            self._variants[key] = (content, hashlib.md5(content.encode()).hexdigest())
+        return self._variants[key]
+
+    def render(self, access_code_valid, qrcode_id=None):
+        """
+        返回页面内容及缓存校验信息
+        :return: (content, etag, last_modified时间戳)
+        """
+        content, digest = self._variant(bool(access_code_valid), bool(qrcode_id))
+        if qrcode_id:
+            # 与模板自动转义保持一致
+            content = content.replace(QRCODE_PLACEHOLDER, escape(qrcode_id))
+            digest = hashlib.md5(f"{digest}:{qrcode_id}".encode()).hexdigest()
+        return content, f'"{digest}"', self._mtime
@@ -0,0 +1,44 @@
+"""
+File: 扫码查询产品信息的读穿透缓存
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_KEY_PREFIX = 'product:scan:'
+
+
+def product_cache_key(qrcode_id):
+    return f"{CACHE_KEY_PREFIX}{qrcode_id}"
+
+
+def get_cached_product(qrcode_id):
+    """读取缓存的产品快照，未命中返回None"""
+    return cache.get(product_cache_key(qrcode_id))
+
+
+def set_cached_product(qrcode_id, snapshot, timeout=None):
+    if timeout is None:
+        timeout = settings.PRODUCT_CACHE_TIMEOUT
+    cache.set(product_cache_key(qrcode_id), snapshot, timeout)
+
+
+async def aget_cached_product(qrcode_id):
+    return await cache.aget(product_cache_key(qrcode_id))
+
+
+async def aset_cached_product(qrcode_id, snapshot, timeout=None):
+    if timeout is None:
+        timeout = settings.PRODUCT_CACHE_TIMEOUT
+    await cache.aset(product_cache_key(qrcode_id), snapshot, timeout)
+
+
+def invalidate_products(qrcode_ids):
+    """
+    清除产品缓存
+    在事务提交后再删除，避免并发请求在提交前把旧数据重新写回缓存
+    :param qrcode_ids: 二维码ID列表
+    """
+    keys = [product_cache_key(qrcode_id) for qrcode_id in qrcode_ids if qrcode_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,94 @@
+"""
+File: 批量导入二维码ID的流式解析，支持CSV和NDJSON
+逐行读取，不把整个上传内容加载到内存
+"""
+import csv
+import json
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+
+# 请求Content-Type或上传文件扩展名对应的格式
+CONTENT_TYPE_FORMATS = {
+    'text/csv': CSV,
+    'application/csv': CSV,
+    'application/x-ndjson': NDJSON,
+    'application/ndjson': NDJSON,
+    'application/jsonl': NDJSON,
+}
+EXTENSION_FORMATS = {
+    '.csv': CSV,
+    '.ndjson': NDJSON,
+    '.jsonl': NDJSON,
+    '.txt': CSV,
+}
+
+
+def detect_format(content_type=None, file_name=None):
+    """根据Content-Type或文件名判断导入格式，无法判断时返回None"""
+    if file_name:
+        for extension, fmt in EXTENSION_FORMATS.items():
+            if file_name.lower().endswith(extension):
+                return fmt
+    if content_type:
+        return CONTENT_TYPE_FORMATS.get(content_type.split(';')[0].strip().lower())
+    return None
+
+
+class QrcodeReader:
+    """
+    逐行解析二维码ID
+    CSV: 有 qrcode_id 表头时取该列，否则取第一列
+    NDJSON: 每行一个 {"qrcode_id": "..."} 对象或一个字符串
+    无法解析或长度不合法的行记录在 invalid 中，不中断导入
+    """
+
+    def __init__(self, lines, fmt, max_length=16):
+        self.lines = lines
+        self.fmt = fmt
+        self.max_length = max_length
+        self.invalid = []
+
+    def _decoded(self):
+        for index, line in enumerate(self.lines):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8-sig' if index == 0 else 'utf-8', errors='replace')
+            yield line.rstrip('\r\n')
+
+    def _csv_values(self):
+        column = 0
+        reader = csv.reader(self._decoded())
+        for row in reader:
+            line_number = reader.line_num
+            if not row:
+                continue
+            if line_number == 1 and 'qrcode_id' in row:
+                column = row.index('qrcode_id')
+                continue
+            yield line_number, row[column] if column < len(row) else ''
+
+    def _ndjson_values(self):
+        for line_number, line in enumerate(self._decoded(), start=1):
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError:
+                self.invalid.append({'line': line_number, 'value': line[:100], 'error': '不是有效的JSON'})
+                continue
+            if isinstance(value, dict):
+                value = value.get('qrcode_id')
+            if not isinstance(value, str):
+                self.invalid.append({'line': line_number, 'value': line[:100], 'error': '缺少qrcode_id'})
+                continue
+            yield line_number, value
+
+    def __iter__(self):
+        values = self._csv_values() if self.fmt == CSV else self._ndjson_values()
+        for line_number, value in values:
+            value = value.strip()
+            if not value or len(value) > self.max_length:
+                self.invalid.append({'line': line_number, 'value': value[:100],
+                                     'error': f'二维码ID不能为空且不超过{self.max_length}个字符'})
+                continue
+            yield value
@@ -0,0 +1,230 @@
+"""
+File: 二维码ID存在性过滤(布隆过滤器)
+进程内保存全部二维码ID的布隆过滤器，判定不存在的二维码一定不存在，扫码接口直接拒绝而不查询数据库；
+判定存在的继续按原流程查询(约1%误判)。
+构建结果保存在共享缓存中，新启动的worker直接加载，不需要每次扫描产品表。
+新增产品或修改二维码ID后更新共享缓存中的版本号，各worker在判定"不存在"之前发现版本变化会增量加载。
+需要全量重建时(过期、容量不足)在后台线程中扫描产品表，重建完成前请求继续使用旧的过滤器。
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'qrcode_filter:version'
+SNAPSHOT_CACHE_KEY = 'qrcode_filter:snapshot'
+# 误判率
+ERROR_RATE = 0.01
+# 最小容量，产品数超过容量后下次刷新时按新的数量重建
+MIN_CAPACITY = 100000
+# 增量加载时向前多回看的时间，覆盖上次加载时尚未提交的事务
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """布隆过滤器，位数组保存在bytearray中，可以序列化后放入缓存"""
+
+    def __init__(self, capacity, error_rate=ERROR_RATE, bits=None, count=0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def _positions(self, item):
+        # 一次哈希得到两个64位整数，用 h1 + i*h2 生成k个位置
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class QrcodeFilter:
+    """
+    二维码ID过滤器
+    过滤器判定存在时直接放行；判定不存在时先确认过滤器是最新的(版本号未变化、未超过重建间隔)再拒绝，
+    所以正常扫码不增加任何开销，只有不存在的二维码多一次缓存读取。
+    请求中只做增量加载，全量重建交给后台线程；还没有可用的过滤器时全部放行
+    """
+
+    def __init__(self):
+        self._bloom = None
+        self._version = None
+        self._synced_at = None
+        self._built_at = None
+        self._lock = threading.RLock()
+        self._rebuild_thread = None
+
+    def might_exist(self, qrcode_id):
+        """二维码ID可能存在时返回True，返回False表示一定不存在"""
+        if not settings.QRCODE_FILTER_ENABLED:
+            return True
+        bloom = self._bloom
+        if bloom is not None and qrcode_id in bloom:
+            return True
+        version = cache.get(VERSION_CACHE_KEY)
+        if self._is_stale(version):
+            self._refresh_in_request(version)
+        bloom = self._bloom
+        return bloom is None or qrcode_id in bloom
+
+    async def amight_exist(self, qrcode_id):
+        """might_exist的异步版本，仅在需要增量加载时访问数据库"""
+        if not settings.QRCODE_FILTER_ENABLED:
+            return True
+        bloom = self._bloom
+        if bloom is not None and qrcode_id in bloom:
+            return True
+        version = await cache.aget(VERSION_CACHE_KEY)
+        if self._is_stale(version):
+            await sync_to_async(self._refresh_in_request)(version)
+        bloom = self._bloom
+        return bloom is None or qrcode_id in bloom
+
+    def add(self, qrcode_ids):
+        """把本进程新增的二维码ID立即加入过滤器"""
+        bloom = self._bloom
+        if bloom is not None:
+            for qrcode_id in qrcode_ids:
+                bloom.add(qrcode_id)
+
+    def warm_up(self):
+        """worker启动时加载过滤器，失败时由第一次查询触发后台重建"""
+        try:
+            self._refresh_locked(cache.get(VERSION_CACHE_KEY))
+        except Exception:
+            logger.exception('二维码过滤器加载失败')
+
+    def _needs_rebuild(self):
+        bloom = self._bloom
+        return (bloom is None or bloom.count > bloom.capacity
+                or time.time() - self._built_at > settings.QRCODE_FILTER_REBUILD_INTERVAL)
+
+    def _is_stale(self, version):
+        return self._bloom is None or version != self._version or self._needs_rebuild()
+
+    def _refresh_locked(self, version):
+        with self._lock:
+            if self._is_stale(version):
+                self.refresh(version)
+
+    def _refresh_in_request(self, version):
+        """请求中只加载快照和增量加载，需要全量重建时交给后台线程"""
+        with self._lock:
+            if self._bloom is None:
+                self._load_snapshot()
+            if self._bloom is not None and version != self._version:
+                self._sync(version)
+                self._save_snapshot()
+        if self._needs_rebuild():
+            self.schedule_rebuild()
+
+    def schedule_rebuild(self):
+        """在后台线程中全量重建，同一时间只有一个重建线程"""
+        with self._lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return
+            self._rebuild_thread = threading.Thread(target=self._rebuild_in_background,
+                                                    name='qrcode-filter-rebuild', daemon=True)
+            self._rebuild_thread.start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild(cache.get(VERSION_CACHE_KEY))
+        except Exception:
+            logger.exception('二维码过滤器重建失败')
+        finally:
+            connections.close_all()
+
+    def refresh(self, version=None):
+        """优先加载共享缓存中的快照，之后只增量加载变化的产品，过期或容量不足时全量重建"""
+        if self._bloom is None:
+            self._load_snapshot()
+        if self._needs_rebuild():
+            self.rebuild(version)
+            return
+        if version != self._version:
+            self._sync(version)
+            self._save_snapshot()
+
+    def rebuild(self, version=None):
+        """从产品表全量构建过滤器"""
+        from ..models import Product
+
+        synced_at = timezone.now()
+        qrcode_ids = Product.objects.values_list('qrcode_id', flat=True)
+        bloom = BloomFilter(max(MIN_CAPACITY, qrcode_ids.count() * 2))
+        for qrcode_id in qrcode_ids.iterator(chunk_size=10000):
+            bloom.add(qrcode_id)
+        with self._lock:
+            self._bloom = bloom
+            self._version = version
+            self._synced_at = synced_at
+            self._built_at = time.time()
+            self._save_snapshot()
+
+    def _sync(self, version):
+        """增量加载上次同步以来新增或修改过的产品(updated_at)"""
+        from ..models import Product
+
+        synced_at = timezone.now()
+        changed = Product.objects.filter(updated_at__gte=self._synced_at - SYNC_OVERLAP)
+        for qrcode_id in changed.values_list('qrcode_id', flat=True).iterator(chunk_size=10000):
+            self._bloom.add(qrcode_id)
+        self._version = version
+        self._synced_at = synced_at
+
+    def _load_snapshot(self):
+        snapshot = cache.get(SNAPSHOT_CACHE_KEY)
+        if snapshot is None:
+            return
+        self._bloom = BloomFilter(snapshot['capacity'], snapshot['error_rate'], snapshot['bits'], snapshot['count'])
+        self._version = snapshot['version']
+        self._synced_at = snapshot['synced_at']
+        self._built_at = snapshot['built_at']
+
+    def _save_snapshot(self):
+        bloom = self._bloom
+        cache.set(SNAPSHOT_CACHE_KEY, {
+            'capacity': bloom.capacity,
+            'error_rate': bloom.error_rate,
+            'bits': bytes(bloom.bits),
+            'count': bloom.count,
+            'version': self._version,
+            'synced_at': self._synced_at,
+            'built_at': self._built_at,
+        }, settings.QRCODE_FILTER_REBUILD_INTERVAL)
+
+
+qrcode_filter = QrcodeFilter()
+
+
+def register_qrcodes(qrcode_ids):
+    """
+    新增二维码ID：本进程立即加入过滤器，事务提交后通知其他进程增量加载
+    """
+    qrcode_ids = [qrcode_id for qrcode_id in qrcode_ids if qrcode_id]
+    if not qrcode_ids:
+        return
+    qrcode_filter.add(qrcode_ids)
+    transaction.on_commit(lambda: cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None))
@@ -1,110 +1,218 @@
+import csv
+import json
+
 from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
-from rest_framework.decorators import api_view, permission_classes, action, authentication_classes
+from rest_framework.decorators import (
+    api_view, permission_classes, action, authentication_classes, throttle_classes
+)
 from django.contrib.auth import authenticate
-from rest_framework import status, viewsets, filters
+from rest_framework import status, viewsets
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from django.db import transaction
-from django.shortcuts import get_object_or_404, render
-from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.db.models import Q
+from django.db.models.functions import Lower
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.utils.encoders import JSONEncoder
 
 from .models import (
-    User, ProductType, Product, OperationRecord, RepairRecord, AccessCode, Attachment
+    User, ProductType, Product, OperationRecord, RepairRecord, Attachment, Job, is_within_warranty
 )
 from .serializers import (
     UserSerializer, UserLoginSerializer, ProductTypeSerializer, ProductSerializer,
-    ProductCreateSerializer, ProductBulkCreateSerializer, ProductShippingSerializer,
-    ProductActivationSerializer, OperationRecordSerializer, RepairRecordSerializer,
-    RepairRecordCreateSerializer, WarrantyCheckSerializer, AttachmentSerializer,
-    AttachmentCreateSerializer
+    ProductCreateSerializer, ProductBulkCreateSerializer, ProductImportSerializer, ProductShippingSerializer,
+    ProductActivationSerializer, ProductBulkActivationSerializer, OperationRecordSerializer, RepairRecordSerializer,
+    RepairRecordCreateSerializer, WarrantyCheckSerializer, WarrantyBatchCheckSerializer, AttachmentSerializer,
+    AttachmentCreateSerializer, JobSerializer, ProductFastSerializer, OperationRecordFastSerializer,
+    RepairRecordFastSerializer, requested_fields
 )
 from django.contrib.contenttypes.models import ContentType
+from .utils.product_cache import get_cached_product, set_cached_product, invalidate_products
+from .utils.access_code import access_code_validator
+from .utils.prerender import PrerenderedPage
+from .utils.qrcode_filter import qrcode_filter
+from .utils import idempotency
+from .utils.product_import import QrcodeReader, detect_format
+from .utils.manifest import ManifestError, detect_manifest_format, iter_manifest
+from .services import (
+    activate_products, bulk_activate_products, import_products, import_report, ship_products, ship_manifest,
+    MANIFEST_RESULT_COLUMNS
+)
+from . import jobs
+from .throttling import ScanBurstThrottle, get_throttle_metrics
+from .pagination import OptionalCursorPagination
+from .renderers import ORJSONRenderer
+from .search import TrigramSearchFilter
+from .filters import ProductFilter
+
+
+# 扫码查询需要的产品字段，product_type__name 通过join一次取回
+PRODUCT_SCAN_FIELDS = (
+    'qrcode_id', 'name', 'email', 'phone', 'status', 'installer', 'activation_date',
+    'warranty_start_date', 'warranty_end_date', 'product_type__name',
+)
+PRODUCT_STATUS_DISPLAY = dict(Product.STATUS_CHOICES)
+
+
+def load_product_snapshot(qrcode_id):
+    """读取扫码需要的产品快照，优先从缓存读取，未命中时查询数据库并写入缓存"""
+    if not qrcode_id or len(qrcode_id) > Product._meta.get_field('qrcode_id').max_length:
+        return None
+    if not qrcode_filter.might_exist(qrcode_id):
+        return None
+    snapshot = get_cached_product(qrcode_id)
+    if snapshot is None:
+        snapshot = Product.objects.filter(qrcode_id=qrcode_id).values(*PRODUCT_SCAN_FIELDS).first()
+        if snapshot is None:
+            return None
+        set_cached_product(qrcode_id, snapshot)
+    return snapshot
+
+
+def wants_background(request):
+    """查询参数 background=true 时批量操作放到后台任务执行"""
+    return request.query_params.get('background', '').lower() in ('1', 'true', 'yes')
+
+
+def job_accepted(job):
+    """后台任务已提交，返回任务ID和进度查询地址"""
+    return Response({
+        'status': 'success',
+        'message': '任务已提交，正在后台执行',
+        'data': {'job_id': job.id, 'url': reverse('productApp:job-detail', args=[job.id])}
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def format_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def stream_json_list(items):
+    """把结果逐条编码为 {"status": "success", "data": [...]} 格式的JSON流"""
+    yield '{"status":"success","data":['
+    for index, item in enumerate(items):
+        yield (',' if index else '') + json.dumps(item, cls=JSONEncoder, ensure_ascii=False)
+    yield ']}'
+
+
+class Echo:
+    """csv.writer的写入目标，直接返回写入的内容，用于逐行生成CSV流"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    """把行逐条编码为CSV流，带BOM方便Excel直接打开"""
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def lookup_key(field, value):
+    """批量保修查询的匹配键，邮箱不区分大小写"""
+    return value.lower() if field == 'email_lower' else value
 
 
 def get_product_info(qrcode_id):
     """获取产品信息"""
     # 查询产品信息
-    try:
-        product = Product.objects.get(qrcode_id=qrcode_id)
-        # 检查产品状态
-        if product.status == 3:  # 已激活
-            return {
-                'status': 'success',
-                'message': '产品已激活',
-                'message_en': 'Product has been activated',
-                'data': {
-                    'is_activated': True,
-                    'product': {
-                        'qrcode_id': product.qrcode_id,
-                        'name': product.name,
-                        'email': product.email,
-                        'phone': product.phone,
-                        'activation_date': product.activation_date.strftime(
-                            '%Y-%m-%d %H:%M:%S') if product.activation_date else None,
-                        'warranty_start': product.warranty_start_date.strftime(
-                            '%Y-%m-%d %H:%M:%S') if product.warranty_start_date else None,
-                        'warranty_end': product.warranty_end_date.strftime(
-                            '%Y-%m-%d %H:%M:%S') if product.warranty_end_date else None,
-                        'under_warranty': product.is_under_warranty(),
-                        'status': product.get_status_display(),
-                        'installer': product.installer
-                    }
+    return build_product_info(load_product_snapshot(qrcode_id))
+
+
+def build_product_info(product):
+    """根据产品快照生成扫码返回信息"""
+    if product is None:
+        return {
+            'status': 'error',
+            'message': '未找到该产品',
+            'message_en': 'Product not found'
+        }
+
+    # 检查产品状态
+    if product['status'] == 3:  # 已激活
+        return {
+            'status': 'success',
+            'message': '产品已激活',
+            'message_en': 'Product has been activated',
+            'data': {
+                'is_activated': True,
+                'product': {
+                    'qrcode_id': product['qrcode_id'],
+                    'name': product['name'],
+                    'email': product['email'],
+                    'phone': product['phone'],
+                    'activation_date': format_datetime(product['activation_date']),
+                    'warranty_start': format_datetime(product['warranty_start_date']),
+                    'warranty_end': format_datetime(product['warranty_end_date']),
+                    # 保修状态随时间变化，不放入缓存，每次读取时计算
+                    'under_warranty': is_within_warranty(product['warranty_start_date'],
+                                                         product['warranty_end_date']),
+                    'status': PRODUCT_STATUS_DISPLAY[product['status']],
+                    'installer': product['installer']
                 }
             }
-        elif product.status == 2:  # 已出货，可以激活
-            return {
-                'status': 'success',
-                'message': '产品未激活',
-                'message_en': 'Product has not been activated',
-                'data': {
-                    'is_activated': False,
-                    'product': {
-                        'qrcode_id': product.qrcode_id,
-                        'product_type': product.product_type.name if product.product_type else None
-                    }
+        }
+    elif product['status'] == 2:  # 已出货，可以激活
+        return {
+            'status': 'success',
+            'message': '产品未激活',
+            'message_en': 'Product has not been activated',
+            'data': {
+                'is_activated': False,
+                'product': {
+                    'qrcode_id': product['qrcode_id'],
+                    'product_type': product['product_type__name']
                 }
             }
-        else:
-            return {
-                'status': 'error',
-                'message_en': 'Product is not available',
-                'message': '产品状态异常，无法激活'
-            }
-
-    except Product.DoesNotExist:
+        }
+    else:
         return {
             'status': 'error',
-            'message': '未找到该产品',
-            'message_en': 'Product not found'
+            'message_en': 'Product is not available',
+            'message': '产品状态异常，无法激活'
         }
 
+
+warranty_page = PrerenderedPage('warranty-registration.html')
+
+
 @csrf_exempt
 @api_view(['GET', 'POST'])
 @authentication_classes([])  # 禁用JWT认证
 @permission_classes([AllowAny])
+@throttle_classes([ScanBurstThrottle])
 def warranty_registration(request):
     """产品保修登记-表单"""
 
     if request.method == 'GET':
         # GET请求，需要增加一层校验，防止直接访问，url带access_code参数，然后查询AccessCode模型，检验access_code是否有效
         # 如果有效，可以进行产品信息登记，否则返回错误信息，转跳一个错误页面
-        content = {'access_code': False}
         access_code = request.GET.get('access_code')
         # 若url带了id参数
         qrcode_id = request.GET.get('id')
-        if access_code:
-            try:
-                access_code = AccessCode.objects.get(code=access_code)
-                content['access_code'] = access_code.is_active
-            except AccessCode.DoesNotExist:
-                content['access_code'] = False
-        if qrcode_id:
-            content['qrcode_id'] = qrcode_id
-        return render(request, 'warranty-registration.html', content)
+        access_code_valid = access_code_validator.is_valid(access_code) if access_code else False
+
+        # 页面每个进程只渲染一次，内容未变化时返回304
+        content, etag, last_modified = warranty_page.render(access_code_valid, qrcode_id)
+        response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+        if response is None:
+            response = HttpResponse(content)
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
 
     elif request.method == 'POST':
         qrcode_id = request.data.get('qrcode_id')
@@ -121,14 +229,11 @@ def warranty_registration(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([ScanBurstThrottle])
 def warranty_registration_api(request):
     qrcode_id = request.data.get('qrcode_id')
     access_code = request.data.get('access_code')
-    try:
-        access_code = AccessCode.objects.get(code=access_code)
-        if not access_code.is_active:
-            return Response({'status': 'error', 'message': '无效的访问码', 'message_en': 'Invalid access code'})
-    except AccessCode.DoesNotExist:
+    if not access_code_validator.is_valid(access_code):
         return Response({'status': 'error', 'message': '无效的访问码', 'message_en': 'Invalid access code'})
 
     if "http" in qrcode_id:
@@ -144,75 +249,93 @@ def warranty_registration_api(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([ScanBurstThrottle])
 def check_code_api(request):
     access_code = request.data.get('access_code')
+    if access_code_validator.is_valid(access_code):
+        return Response({'status': 'success'})
+    return Response({'status': 'error', 'message': '无效的访问码', 'message_en': 'Invalid access code'})
+
+
+
+
+def get_idempotency_key(request, data):
+    return request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+
+
+def process_activation(data, operator, idempotency_key=None):
+    """
+    激活单个产品并生成响应，带幂等键时重复请求直接返回第一次的结果
+    :param data: ProductActivationSerializer 校验后的数据
+    :param operator: 操作人
+    :param idempotency_key: 客户端提供的幂等键
+    :return: (status_code, 响应数据)
+    """
+    scope = f"activate:{data['qrcode_id']}"
+    if idempotency_key:
+        claimed, stored = idempotency.claim(scope, idempotency_key)
+        if stored is not None:
+            return stored
+        if not claimed:
+            return status.HTTP_409_CONFLICT, {
+                'status': 'error',
+                'message': '请求正在处理中，请稍后',
+                'message_en': 'Request is being processed'
+            }
+
     try:
-        access_code = AccessCode.objects.get(code=access_code)
-        if access_code.is_active:
-            return Response({'status': 'success'})
-        return Response({'status': 'error', 'message': '无效的访问码', 'message_en': 'Invalid access code'})
-    except AccessCode.DoesNotExist:
-        return Response({'status': 'error', 'message': '无效的访问码', 'message_en': 'Invalid access code'})
+        products = activate_products([data['qrcode_id']], customer=data, operator=operator)
+    except Exception:
+        if idempotency_key:
+            idempotency.release(scope, idempotency_key)
+        raise
+
+    if products:
+        result = status.HTTP_200_OK, {
+            'status': 'success',
+            'message': '产品激活成功',
+            'message_en': 'Product activated successfully',
+            'data': activation_result(products[0])
+        }
+    else:
+        # 只能激活状态为"已出货"的产品
+        result = status.HTTP_404_NOT_FOUND, {
+            'status': 'error',
+            'message': '未找到该产品',
+            'message_en': 'Product not found'
+        }
+    if idempotency_key:
+        idempotency.save_result(scope, idempotency_key, *result)
+    return result
 
 
+def activation_result(product):
+    """激活成功后返回给客户的产品信息"""
+    return {
+        'qrcode_id': product.qrcode_id,
+        'name': product.name,
+        'email': product.email,
+        'activation_date': format_datetime(product.activation_date),
+        'warranty_start': format_datetime(product.warranty_start_date),
+        'warranty_end': format_datetime(product.warranty_end_date),
+        'under_warranty': product.is_under_warranty(),
+        'installer': product.installer,
+    }
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([ScanBurstThrottle])
 def activate_product(request):
     """产品激活API"""
     serializer = ProductActivationSerializer(data=request.data)
     if serializer.is_valid():
-        try:
-            product = get_object_or_404(
-                Product,
-                qrcode_id=serializer.validated_data['qrcode_id'],
-                status=2  # 只能激活状态为"已出货"的产品
-            )
-            
-            # 更新产品的客户信息
-            product.name = serializer.validated_data['name']
-            product.phone = serializer.validated_data.get('phone')
-            product.email = serializer.validated_data.get('email')
-            product.city = serializer.validated_data.get('city')
-            product.country = serializer.validated_data.get('country')
-            product.installer = serializer.validated_data.get('installer')
-            
-            if product.activate():
-                product.save()  # 保存客户信息
-                # 创建操作记录
-                OperationRecord.objects.create(
-                    product=product,
-                    operator=f"client-{product.name}",
-                    operation_type=3,  # 产品激活
-                    description=f"产品被客户 {product.name} 激活"
-                )
-                return Response({
-                    'status': 'success',
-                    'message': '产品激活成功',
-                    'message_en': 'Product activated successfully',
-                    'data': {
-                        'qrcode_id': product.qrcode_id,
-                        'name': product.name,
-                        'email': product.email,
-                        'activation_date': product.activation_date.strftime('%Y-%m-%d %H:%M:%S') if product.activation_date else None,
-                        'warranty_start': product.warranty_start_date.strftime('%Y-%m-%d %H:%M:%S') if product.warranty_start_date else None,
-                        'warranty_end': product.warranty_end_date.strftime('%Y-%m-%d %H:%M:%S') if product.warranty_end_date else None,
-                        'under_warranty': product.is_under_warranty(),
-                        'installer': product.installer,
-                    }
-                })
-            return Response({
-                'status': 'error',
-                'message': '产品无法激活',
-                'message_en': 'Product cannot be activated'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        except Product.DoesNotExist:
-            return Response({
-                'status': 'error',
-                'message': '未找到该产品',
-                'message_en': 'Product not found'
-            }, status=status.HTTP_404_NOT_FOUND)
+        status_code, data = process_activation(
+            serializer.validated_data,
+            operator=f"client-{serializer.validated_data['name']}",
+            idempotency_key=get_idempotency_key(request, serializer.validated_data)
+        )
+        return Response(data, status=status_code)
     return Response({
         'status': 'error',
         'message': '输入数据验证失败',
@@ -221,6 +344,16 @@ def activate_product(request):
     }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def throttle_metrics(request):
+    """扫码接口限流统计：各类限流的检查次数和拒绝次数"""
+    return Response({
+        'status': 'success',
+        'data': get_throttle_metrics()
+    })
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login_view(request):
@@ -262,7 +395,7 @@ class UserViewSet(viewsets.ModelViewSet):
     """用户管理视图集"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
     filterset_fields = ['username', 'email', 'is_active']
     search_fields = ['username', 'email', 'first_name', 'last_name']
 
@@ -299,7 +432,7 @@ class ProductTypeViewSet(viewsets.ModelViewSet):
     """产品类型管理视图集"""
     queryset = ProductType.objects.all()
     serializer_class = ProductTypeSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
     filterset_fields = ['name', 'model_number']
     search_fields = ['name', 'model_number', 'description']
     permission_classes = [IsAuthenticated]
@@ -313,14 +446,81 @@ class ProductTypeViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+# 产品导出的列：(表头, 字段)，关联表的字段通过JOIN在同一条查询中取出
+PRODUCT_EXPORT_COLUMNS = [
+    ('qrcode_id', 'qrcode_id'),
+    ('product_type', 'product_type__name'),
+    ('model_number', 'product_type__model_number'),
+    ('status', 'status'),
+    ('agent', 'agent__username'),
+    ('shipping_date', 'shipping_date'),
+    ('activation_date', 'activation_date'),
+    ('warranty_start', 'warranty_start_date'),
+    ('warranty_end', 'warranty_end_date'),
+    ('name', 'name'),
+    ('phone', 'phone'),
+    ('city', 'city'),
+    ('country', 'country'),
+    ('email', 'email'),
+    ('installer', 'installer'),
+    ('factory_remark', 'factory_remark'),
+    ('created_at', 'created_at'),
+]
+# 服务端游标每次取回的行数
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_product_rows(queryset):
+    """按PRODUCT_EXPORT_COLUMNS逐行返回导出的值，只执行一条查询，日期转换为本地时间(TIME_ZONE)"""
+    fields = [field for _, field in PRODUCT_EXPORT_COLUMNS]
+    status_index = fields.index('status')
+    date_indexes = [index for index, field in enumerate(fields) if field.endswith(('_date', '_at'))]
+    status_names = dict(Product.STATUS_CHOICES)
+    for row in queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = list(row)
+        row[status_index] = status_names.get(row[status_index], row[status_index])
+        for index in date_indexes:
+            row[index] = format_datetime(timezone.localtime(row[index])) if row[index] else None
+        yield row
+
+
+class FastListMixin:
+    """
+    列表使用 fast_serializer_class 从 values() 直接生成结果，输出与 serializer_class 一致；
+    列表和详情支持 ?fields= 只返回部分字段、?expand= 展开关联对象，只查询需要的列和关联表；
+    其他操作(创建、更新)不变
+    """
+    fast_serializer_class = None
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            requested = requested_fields(self.request)
+            if requested['fields'] is not None or requested['expand']:
+                queryset = self.fast_serializer_class(**requested).narrow(queryset)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.fast_serializer_class(**requested_fields(request))
+        queryset = serializer.prepare(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(queryset))
+
+
+class ProductViewSet(FastListMixin, viewsets.ModelViewSet):
     """产品管理视图集"""
-    queryset = Product.objects.all()
+    # 保修状态由数据库计算，可以筛选和排序(?under_warranty=true&ordering=warranty_end_date)
+    queryset = Product.objects.with_warranty_state()
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['qrcode_id', 'product_type', 'status', 'agent']
+    fast_serializer_class = ProductFastSerializer
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
+    filterset_class = ProductFilter
     search_fields = ['qrcode_id']
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -345,40 +545,92 @@ class ProductViewSet(viewsets.ModelViewSet):
             description=f"创建产品 {product.qrcode_id}"
         )
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        导出产品CSV，支持与列表相同的筛选和搜索参数(qrcode_id、product_type、status、agent、search)
+        使用服务端游标逐批读取并以流的形式返回，导出百万行时内存占用不变
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by('-created_at', '-id')
+        response = StreamingHttpResponse(
+            stream_csv([header for header, _ in PRODUCT_EXPORT_COLUMNS], export_product_rows(queryset)),
+            content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="products-{timezone.now():%Y%m%d%H%M%S}.csv"'
+        return response
+
     @action(detail=False, methods=['post'])
     def bulk_create(self, request):
         """批量创建产品"""
         serializer = ProductBulkCreateSerializer(data=request.data)
         if serializer.is_valid():
             product_type = get_object_or_404(ProductType, id=serializer.validated_data['product_type_id'])
-            remark = serializer.validated_data.get('remark', '')
-            products = []
-            for qrcode_id in serializer.validated_data['qrcode_ids']:
-                products.append(Product(
-                    qrcode_id=qrcode_id,
-                    product_type=product_type,
-                    factory_remark=remark
-                ))
-            
-            with transaction.atomic():
-                created_products = Product.objects.bulk_create(products)
-                # 批量创建操作记录
-                operation_records = [
-                    OperationRecord(
-                        product=product,
-                        operator=f"user-{self.request.user.username}",
-                        operation_type=1,
-                        description=f"批量创建产品 {product.qrcode_id}"
-                    ) for product in created_products
-                ]
-                OperationRecord.objects.bulk_create(operation_records)
-            
+            if wants_background(request):
+                qrcode_ids = serializer.validated_data['qrcode_ids']
+                return job_accepted(jobs.enqueue('import_products', {
+                    'product_type_id': product_type.id,
+                    'remark': serializer.validated_data.get('remark', ''),
+                    'operator': f"user-{self.request.user.username}",
+                    'qrcode_ids': qrcode_ids,
+                }, user=request.user, total=len(qrcode_ids)))
+            # 已存在的二维码跳过，不影响其他二维码的创建
+            result = import_products(
+                serializer.validated_data['qrcode_ids'],
+                product_type,
+                serializer.validated_data.get('remark', ''),
+                operator=f"user-{self.request.user.username}"
+            )
             return Response({
                 'status': 'success',
-                'message': f'成功创建 {len(created_products)} 个产品'
+                'message': f'成功创建 {result["created"]} 个产品',
+                'data': import_report(result)
             })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        批量导入产品(CSV或NDJSON)，流式读取并分批插入，适合一次导入十万级二维码
+        请求体直接是文件内容(Content-Type: text/csv 或 application/x-ndjson)，product_type_id、remark 放在查询参数中；
+        也可以用multipart表单上传file字段
+        """
+        upload = request.FILES.get('file') if request.content_type.startswith('multipart/') else None
+        serializer = ProductImportSerializer(data=request.data if upload else request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        product_type = get_object_or_404(ProductType, id=serializer.validated_data['product_type_id'])
+
+        if upload:
+            fmt, lines = detect_format(upload.content_type, upload.name), upload
+        else:
+            stream = request.stream
+            fmt, lines = detect_format(request.content_type), iter(stream.readline, b'') if stream else []
+        if fmt is None:
+            return Response({
+                'status': 'error',
+                'message': '不支持的文件格式，请上传CSV或NDJSON'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        reader = QrcodeReader(lines, fmt, max_length=Product._meta.get_field('qrcode_id').max_length)
+        if wants_background(request):
+            qrcode_ids = list(reader)
+            return job_accepted(jobs.enqueue('import_products', {
+                'product_type_id': product_type.id,
+                'remark': serializer.validated_data['remark'],
+                'operator': f"user-{self.request.user.username}",
+                'qrcode_ids': qrcode_ids,
+                'invalid': reader.invalid,
+            }, user=request.user, total=len(qrcode_ids)))
+        result = import_products(
+            reader, product_type, serializer.validated_data['remark'],
+            operator=f"user-{self.request.user.username}"
+        )
+        return Response({
+            'status': 'success',
+            'message': f'成功创建 {result["created"]} 个产品，跳过 {len(result["duplicates"])} 个已存在的二维码',
+            'data': import_report(result, reader.invalid)
+        })
+
     @action(detail=False, methods=['post'])
     def bulk_shipping(self, request):
         """批量发货"""
@@ -386,78 +638,115 @@ class ProductViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             agent = get_object_or_404(User, id=serializer.validated_data['agent_id'], user_type=User.AGENT)
             shipping_date = serializer.validated_data.get('shipping_date', timezone.now())
-            
-            with transaction.atomic():
-                # 更新产品信息
-                products = Product.objects.filter(
-                    qrcode_id__in=serializer.validated_data['qrcode_ids'],
-                    status=1  # 只能发货状态为"已生成"的产品
-                )
-                if not products.exists():
-                    return Response({
-                        'status': 'error',
-                        'message': '未找到可发货的产品'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                products.update(
-                    agent=agent,
-                    shipping_date=shipping_date,
-                    status=2  # 更新状态为"已出货"
-                )
-                
-                # 创建操作记录
-                operation_records = [
-                    OperationRecord(
-                        product=product,
-                        operator=f"user-{self.request.user.username}",
-                        operation_type=2,  # 产品出货
-                        description=f"产品出货给代理商 {agent.username}"
-                    ) for product in products
-                ]
-                OperationRecord.objects.bulk_create(operation_records)
-            
+            if wants_background(request):
+                qrcode_ids = list(dict.fromkeys(serializer.validated_data['qrcode_ids']))
+                return job_accepted(jobs.enqueue('ship_products', {
+                    'agent_id': agent.id,
+                    'shipping_date': shipping_date.isoformat(),
+                    'operator': f"user-{self.request.user.username}",
+                    'qrcode_ids': qrcode_ids,
+                }, user=request.user, total=len(qrcode_ids)))
+            result = ship_products(
+                serializer.validated_data['qrcode_ids'], agent, shipping_date,
+                operator=f"user-{self.request.user.username}"
+            )
+            if not result['shipped']:
+                return Response({
+                    'status': 'error',
+                    'message': '未找到可发货的产品',
+                    'data': result
+                }, status=status.HTTP_400_BAD_REQUEST)
+
             return Response({
                 'status': 'success',
-                'message': f'成功发货 {products.count()} 个产品给代理商 {agent.username}'
+                'message': f'成功发货 {len(result["shipped"])} 个产品给代理商 {agent.username}',
+                'data': result
             })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def shipping_manifest(self, request):
+        """
+        按出货清单批量发货，上传file字段(CSV或XLSX)，表头包含 qrcode_id、agent(代理商ID或用户名)，可选 shipping_date
+        按代理商分批发货，全部处理完成后返回逐行结果的CSV(line, qrcode_id, agent, result, message)；
+        加 ?background=true 时放到后台任务执行，逐行结果保存在任务结果中
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'status': 'error',
+                'message': '请上传出货清单文件(file)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        fmt = detect_manifest_format(upload.name, upload.content_type)
+        if fmt is None:
+            return Response({
+                'status': 'error',
+                'message': '不支持的文件格式，请上传CSV或XLSX'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # 先读出整个清单，格式有问题时直接返回400，不会发货到一半才出错
+            rows = list(iter_manifest(upload, fmt))
+        except ManifestError as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        operator = f"user-{self.request.user.username}"
+        if wants_background(request):
+            return job_accepted(jobs.enqueue('ship_manifest', {
+                'operator': operator,
+                'rows': rows,
+            }, user=request.user, total=len(rows)))
+        # 全部发货完成后再返回结果(按清单行号排序)，避免响应发送途中断开时只发货了一部分而客户端收到不完整的结果
+        results = sorted(ship_manifest(rows, operator=operator), key=lambda item: item['line'])
+        response = StreamingHttpResponse(stream_csv(
+            MANIFEST_RESULT_COLUMNS, ([item[column] for column in MANIFEST_RESULT_COLUMNS] for item in results)
+        ), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = (
+            f'attachment; filename="shipping-result-{timezone.now():%Y%m%d%H%M%S}.csv"'
+        )
+        return response
+
     @action(detail=False, methods=['post'])
     def activate(self, request):
         """激活产品"""
         serializer = ProductActivationSerializer(data=request.data)
         if serializer.is_valid():
-            product = get_object_or_404(
-                Product,
-                qrcode_id=serializer.validated_data['qrcode_id'],
-                status=2  # 只能激活状态为"已出货"的产品
+            status_code, data = process_activation(
+                serializer.validated_data,
+                operator=f"user-{self.request.user.username}",
+                idempotency_key=get_idempotency_key(request, serializer.validated_data)
             )
-            
-            # 更新产品的客户信息
-            product.name = serializer.validated_data['name']
-            product.phone = serializer.validated_data['phone']
-            product.email = serializer.validated_data.get('email')
-            product.city = serializer.validated_data.get('city')
-            product.country = serializer.validated_data.get('country')
-            product.installer = serializer.validated_data.get('installer')
-            
-            if product.activate():
-                product.save()  # 保存客户信息
-                # 创建操作记录
-                OperationRecord.objects.create(
-                    product=product,
-                    operator=f"user-{self.request.user.username}",
-                    operation_type=3,  # 产品激活
-                    description=f"产品被客户 {product.name} 激活"
-                )
+            return Response(data, status=status_code)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'])
+    def bulk_activate(self, request):
+        """批量激活：安装人员调试整个站点时，用同一客户信息一次激活多台设备"""
+        serializer = ProductBulkActivationSerializer(data=request.data)
+        if serializer.is_valid():
+            result = bulk_activate_products(
+                serializer.validated_data['qrcode_ids'], customer=serializer.validated_data,
+                operator=f"user-{self.request.user.username}"
+            )
+            data = {
+                'activated': [activation_result(product) for product in result['activated']],
+                'skipped': result['skipped']
+            }
+            if not result['activated']:
                 return Response({
-                    'status': 'success',
-                    'message': '产品激活成功'
-                })
+                    'status': 'error',
+                    'message': '未找到可激活的产品',
+                    'data': data
+                }, status=status.HTTP_400_BAD_REQUEST)
+
             return Response({
-                'status': 'error',
-                'message': '产品无法激活'
-            }, status=status.HTTP_400_BAD_REQUEST)
+                'status': 'success',
+                'message': f'成功激活 {len(result["activated"])} 个产品',
+                'data': data
+            })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['post'])
@@ -469,11 +758,14 @@ class ProductViewSet(viewsets.ModelViewSet):
             if qrcode_id := serializer.validated_data.get('qrcode_id'):
                 filters['qrcode_id'] = qrcode_id
             if customer_email := serializer.validated_data.get('customer_email'):
-                filters['email'] = customer_email
+                # 邮箱不区分大小写，使用 LOWER(email) 索引
+                filters['email_lower'] = customer_email.lower()
             if customer_phone := serializer.validated_data.get('customer_phone'):
                 filters['phone'] = customer_phone
             
-            products = Product.objects.filter(**filters)
+            products = Product.objects.alias(email_lower=Lower('email')).filter(**filters).select_related(
+                'product_type'
+            ).with_warranty_state()
             if not products.exists():
                 return Response({
                     'status': 'error',
@@ -485,7 +777,7 @@ class ProductViewSet(viewsets.ModelViewSet):
                 results.append({
                     'qrcode_id': product.qrcode_id,
                     'product_type': product.product_type.name,
-                    'under_warranty': product.is_under_warranty(),
+                    'under_warranty': product.under_warranty,
                     'warranty_start': product.warranty_start_date,
                     'warranty_end': product.warranty_end_date,
                     'status': product.get_status_display()
@@ -497,6 +789,55 @@ class ProductViewSet(viewsets.ModelViewSet):
             })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
+    @action(detail=False, methods=['post'])
+    def check_warranty_batch(self, request):
+        """批量查询保修状态，一次查询取回所有匹配产品，逐条输入流式返回结果"""
+        serializer = WarrantyBatchCheckSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # (查询类型, 产品字段, 去重后的输入值)
+        lookups = [
+            ('qrcode_id', 'qrcode_id', list(dict.fromkeys(serializer.validated_data['qrcode_ids']))),
+            # 邮箱不区分大小写，使用 LOWER(email) 索引
+            ('customer_email', 'email_lower', list(dict.fromkeys(serializer.validated_data['customer_emails']))),
+            ('customer_phone', 'phone', list(dict.fromkeys(serializer.validated_data['customer_phones']))),
+        ]
+        condition = Q()
+        for _, field, values in lookups:
+            if values:
+                condition |= Q(**{f'{field}__in': [lookup_key(field, value) for value in values]})
+
+        rows = (
+            Product.objects
+            .annotate(email_lower=Lower('email'))
+            .filter(condition)
+            .with_warranty_state()
+            .values('qrcode_id', 'email_lower', 'phone', 'product_type__name', 'under_warranty',
+                    'warranty_start_date', 'warranty_end_date', 'status')
+        )
+
+        matches = {field: {} for _, field, _ in lookups}
+        for row in rows:
+            product = {
+                'qrcode_id': row['qrcode_id'],
+                'product_type': row['product_type__name'],
+                'under_warranty': row['under_warranty'],
+                'warranty_start': row['warranty_start_date'],
+                'warranty_end': row['warranty_end_date'],
+                'status': PRODUCT_STATUS_DISPLAY[row['status']],
+            }
+            for _, field, _ in lookups:
+                if row[field]:
+                    matches[field].setdefault(row[field], []).append(product)
+
+        results = (
+            {'query': query, 'value': value, 'found': lookup_key(field, value) in matches[field],
+             'products': matches[field].get(lookup_key(field, value), [])}
+            for query, field, values in lookups for value in values
+        )
+        return StreamingHttpResponse(stream_json_list(results), content_type='application/json')
+
     @action(detail=False, methods=['get'])
     def get_by_qrcode(self, request):
         """通过qrcode_id查询产品信息"""
@@ -508,7 +849,7 @@ class ProductViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            product = get_object_or_404(Product, qrcode_id=qrcode_id)
+            product = get_object_or_404(self.get_queryset(), qrcode_id=qrcode_id)
             serializer = self.get_serializer(product)
             return Response({
                 'status': 'success',
@@ -521,21 +862,37 @@ class ProductViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_404_NOT_FOUND)
 
 
-class OperationRecordViewSet(viewsets.ReadOnlyModelViewSet):
+class OperationRecordViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     """操作记录视图集 - 只读"""
     queryset = OperationRecord.objects.all()
     serializer_class = OperationRecordSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    fast_serializer_class = OperationRecordFastSerializer
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
     filterset_fields = ['product', 'operator', 'operation_type']
     search_fields = ['product__qrcode_id', 'description']
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """后台任务进度查询，普通用户只能查看自己提交的任务"""
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['job_type', 'status']
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return self.queryset
+        return self.queryset.filter(created_by=self.request.user)
 
 
 class AttachmentViewSet(viewsets.ModelViewSet):
     """附件管理视图集"""
     queryset = Attachment.objects.all()
     serializer_class = AttachmentSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
     filterset_fields = ['file_type', 'content_type', 'object_id']
     search_fields = ['name', 'description']
     permission_classes = [IsAuthenticated]
@@ -553,11 +910,13 @@ class AttachmentViewSet(viewsets.ModelViewSet):
             raise ValidationError(f"创建附件失败：{str(e)}")
 
 
-class RepairRecordViewSet(viewsets.ModelViewSet):
+class RepairRecordViewSet(FastListMixin, viewsets.ModelViewSet):
     """维修记录管理视图集"""
-    queryset = RepairRecord.objects.all()
+    # 产品、技术人员和附件在固定的几条查询中取出，列表查询数与记录数无关
+    queryset = RepairRecord.objects.select_related('product', 'technician').prefetch_related('attachments')
     serializer_class = RepairRecordSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    fast_serializer_class = RepairRecordFastSerializer
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
     filterset_fields = ['product', 'technician', 'status', 'name', 'phone', 'email']
     search_fields = ['product__qrcode_id', 'repair_reason', 'repair_solution', 'name', 'phone', 'email']
     permission_classes = [IsAuthenticated]
@@ -625,8 +984,7 @@ class RepairRecordViewSet(viewsets.ModelViewSet):
     def attachments(self, request, pk=None):
         """获取维修记录的附件"""
         repair_record = self.get_object()
-        attachments = repair_record.attachments
-        serializer = AttachmentSerializer(attachments, many=True)
+        serializer = AttachmentSerializer(repair_record.attachments.all(), many=True)
         return Response({
             'status': 'success',
             'data': serializer.data